@@ -2,18 +2,54 @@
 pragma solidity ^0.8.28;
 
 contract GiftCard {
-    // Mapping from code hash to gift card value
-    mapping(bytes32 => uint256) private giftCards;
+    // Gift card record packed into a single storage slot
+    // (16 bytes value + 8 bytes purchase time + 1 byte each for the flags)
+    struct Card {
+        uint128 value;
+        uint64 purchaseTime; // Bonus: Store purchase time
+        bool redeemed;
+        bool swept; // Expired funds reclaimed by the owner
+    }
+    
+    // Mapping from code hash to gift card record
+    mapping(bytes32 => Card) private cards;
     
-    // Mapping to track redeemed codes
-    mapping(bytes32 => bool) private redeemed;
+    // Deployer, allowed to reclaim the funds of expired gift cards
+    address public owner;
+    
+    // Merkle campaign: many cards committed as one root and funded up front
+    struct Campaign {
+        bytes32 merkleRoot;
+        uint128 balance; // Funds not yet redeemed
+        uint64 createdAt;
+        address issuer;
+    }
     
-    // Bonus: Mapping to track purchase timestamps
-    mapping(bytes32 => uint256) private purchaseTime;
+    // Campaigns by id, numbered from 1
+    mapping(uint256 => Campaign) private campaigns;
+    uint256 public campaignCount;
+    
+    // Redeemed bitmap per campaign: bit (index % 256) of word (index / 256)
+    mapping(uint256 => mapping(uint256 => uint256)) private campaignRedeemed;
+    
+    // Full status record returned by the single-call status views
+    struct GiftCardStatus {
+        uint256 value;
+        bool redeemed;
+        bool expired;
+        uint256 purchaseTime;
+        uint256 expirationTime;
+    }
     
     // Events for logging
-    event GiftCardPurchased(bytes32 indexed codeHash, uint256 value, address buyer);
-    event GiftCardRedeemed(bytes32 indexed codeHash, uint256 value, address redeemer);
+    // Purchase and expiration times are included so clients need no follow-up reads
+    event GiftCardPurchased(bytes32 indexed codeHash, uint256 value, address buyer, uint256 purchaseTime, uint256 expirationTime);
+    event GiftCardRedeemed(bytes32 indexed codeHash, uint256 value, address redeemer, uint256 purchaseTime, uint256 expirationTime);
+    event RedemptionSkipped(bytes32 indexed codeHash, address recipient, string reason);
+    event CampaignCreated(uint256 indexed campaignId, bytes32 merkleRoot, uint256 cardCount, uint256 funds, address issuer);
+    event ExpiredSwept(uint256 cardCount, uint256 amount, address to);
+    event GiftCardSwept(bytes32 indexed codeHash, uint256 value);
+    event CampaignReclaimed(uint256 indexed campaignId, uint256 amount, address to);
     
     // Minimum gift card value (0.001 ETH)
     uint256 public constant MIN_VALUE = 0.001 ether;
@@ -21,17 +57,52 @@ contract GiftCard {
     // Bonus: Expiration period (30 days in seconds)
     uint256 public constant EXPIRATION_PERIOD = 30 days;
     
+    constructor() {
+        owner = msg.sender;
+    }
+    
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Only the owner can do this");
+        _;
+    }
+    
     /**
      * @dev Buy a gift card with a unique code hash
      * @param codeHash The hash of the gift card code
      */
     function buy(bytes32 codeHash) public payable {
-        require(msg.value >= MIN_VALUE, "Gift card value must be at least 0.001 ETH");
-        require(giftCards[codeHash] == 0, "Gift card with this code already exists");
+        _issue(codeHash, msg.value);
+    }
+    
+    /**
+     * @dev Buy many gift cards in a single transaction
+     * @param codeHashes The hashes of the gift card codes
+     * @param values The value of each gift card, in the same order
+     */
+    function buyBatch(bytes32[] calldata codeHashes, uint256[] calldata values) public payable {
+        require(codeHashes.length == values.length, "Code hashes and values length mismatch");
+        require(codeHashes.length > 0, "No gift cards to buy");
+        
+        uint256 total = 0;
+        for (uint256 i = 0; i < codeHashes.length; i++) {
+            _issue(codeHashes[i], values[i]);
+            total += values[i];
+        }
+        require(msg.value == total, "Sent value does not match the sum of gift card values");
+    }
+    
+    /**
+     * @dev Record a new gift card and emit its purchase event
+     * @param codeHash The hash of the gift card code
+     * @param value The value of the gift card
+     */
+    function _issue(bytes32 codeHash, uint256 value) private {
+        require(value >= MIN_VALUE, "Gift card value must be at least 0.001 ETH");
+        require(value <= type(uint128).max, "Gift card value is too large");
+        require(cards[codeHash].value == 0, "Gift card with this code already exists");
         
-        giftCards[codeHash] = msg.value;
-        purchaseTime[codeHash] = block.timestamp; // Bonus: Store purchase time
-        emit GiftCardPurchased(codeHash, msg.value, msg.sender);
+        cards[codeHash] = Card(uint128(value), uint64(block.timestamp), false, false);
+        emit GiftCardPurchased(codeHash, value, msg.sender, block.timestamp, block.timestamp + EXPIRATION_PERIOD);
     }
     
     /**
@@ -41,17 +112,132 @@ contract GiftCard {
     function redeem(string memory code) public {
         bytes32 codeHash = keccak256(abi.encodePacked(code));
         
-        require(giftCards[codeHash] > 0, "Gift card does not exist");
-        require(!redeemed[codeHash], "Gift card has already been redeemed");
-        require(!isExpired(codeHash), "Gift card has expired"); // Bonus: Check expiration
+        Card memory card = cards[codeHash];
         
-        uint256 value = giftCards[codeHash];
-        redeemed[codeHash] = true;
+        require(card.value > 0, "Gift card does not exist");
+        require(!card.redeemed, "Gift card has already been redeemed");
+        require(block.timestamp <= card.purchaseTime + EXPIRATION_PERIOD, "Gift card has expired"); // Bonus: Check expiration
+        
+        uint256 value = card.value;
+        cards[codeHash].redeemed = true;
         
         // Transfer the gift card value to the redeemer
         payable(msg.sender).transfer(value);
         
-        emit GiftCardRedeemed(codeHash, value, msg.sender);
+        emit GiftCardRedeemed(codeHash, value, msg.sender, card.purchaseTime, card.purchaseTime + EXPIRATION_PERIOD);
+    }
+    
+    /**
+     * @dev Redeem many gift cards in one transaction on behalf of their recipients
+     * Items that fail are skipped with a RedemptionSkipped event instead of
+     * reverting the whole batch.
+     * @param codes The original gift card codes (not hashed)
+     * @param recipients The address each gift card value is paid to
+     * @param signatures Each recipient's signature over redemptionDigest(codeHash, recipient)
+     * @return redeemed Whether each item was redeemed, in input order
+     */
+    function redeemBatch(
+        string[] calldata codes,
+        address[] calldata recipients,
+        bytes[] calldata signatures
+    ) public returns (bool[] memory redeemed) {
+        require(codes.length == recipients.length && codes.length == signatures.length, "Codes, recipients and signatures length mismatch");
+        
+        redeemed = new bool[](codes.length);
+        for (uint256 i = 0; i < codes.length; i++) {
+            bytes32 codeHash = keccak256(bytes(codes[i]));
+            address recipient = recipients[i];
+            Card memory card = cards[codeHash];
+            
+            string memory reason = _redeemFailure(card);
+            if (bytes(reason).length == 0 && (recipient == address(0) || _recoverSigner(redemptionDigest(codeHash, recipient), signatures[i]) != recipient)) {
+                reason = "Invalid recipient signature";
+            }
+            if (bytes(reason).length > 0) {
+                emit RedemptionSkipped(codeHash, recipient, reason);
+                continue;
+            }
+            
+            cards[codeHash].redeemed = true;
+            
+            // send() keeps transfer()'s gas stipend but lets one failed payout be skipped
+            if (!payable(recipient).send(card.value)) {
+                cards[codeHash].redeemed = false;
+                emit RedemptionSkipped(codeHash, recipient, "Transfer to recipient failed");
+                continue;
+            }
+            
+            redeemed[i] = true;
+            emit GiftCardRedeemed(codeHash, card.value, recipient, card.purchaseTime, card.purchaseTime + EXPIRATION_PERIOD);
+        }
+    }
+    
+    /**
+     * @dev Reclaim the funds of many expired, unredeemed gift cards to the owner
+     * Cards that do not exist, are redeemed, have not expired or were already
+     * swept are skipped, so a stale candidate list cannot revert the batch.
+     * Each swept card gets a GiftCardSwept event so indexers can retire it.
+     * @param codeHashes The hashes of the gift card codes
+     * @return count The number of gift cards swept
+     * @return amount The total value reclaimed
+     */
+    function sweepExpired(bytes32[] calldata codeHashes) public onlyOwner returns (uint256 count, uint256 amount) {
+        for (uint256 i = 0; i < codeHashes.length; i++) {
+            Card storage card = cards[codeHashes[i]];
+            if (card.value == 0 || card.redeemed || card.swept || block.timestamp <= card.purchaseTime + EXPIRATION_PERIOD) {
+                continue;
+            }
+            card.swept = true;
+            amount += card.value;
+            count++;
+            emit GiftCardSwept(codeHashes[i], card.value);
+        }
+        
+        if (amount > 0) {
+            payable(owner).transfer(amount);
+        }
+        emit ExpiredSwept(count, amount, owner);
+    }
+    
+    /**
+     * @dev Digest a recipient signs (EIP-191 personal_sign) to authorize a relayed redemption
+     * @param codeHash The hash of the gift card code
+     * @param recipient The address the gift card value is paid to
+     * @return The 32-byte digest, bound to this contract and chain
+     */
+    function redemptionDigest(bytes32 codeHash, address recipient) public view returns (bytes32) {
+        return keccak256(abi.encode(address(this), block.chainid, codeHash, recipient));
+    }
+    
+    /**
+     * @dev Reason a gift card cannot be redeemed, or an empty string if it can
+     */
+    function _redeemFailure(Card memory card) private view returns (string memory) {
+        if (card.value == 0) {
+            return "Gift card does not exist";
+        }
+        if (card.redeemed) {
+            return "Gift card has already been redeemed";
+        }
+        if (block.timestamp > card.purchaseTime + EXPIRATION_PERIOD) {
+            return "Gift card has expired";
+        }
+        return "";
+    }
+    
+    /**
+     * @dev Recover the signer of an EIP-191 personal_sign signature over digest
+     * @return The signer, or address(0) if the signature is malformed
+     */
+    function _recoverSigner(bytes32 digest, bytes calldata signature) private pure returns (address) {
+        if (signature.length != 65) {
+            return address(0);
+        }
+        bytes32 r = bytes32(signature[0:32]);
+        bytes32 s = bytes32(signature[32:64]);
+        uint8 v = uint8(signature[64]);
+        bytes32 messageHash = keccak256(abi.encodePacked("\x19Ethereum Signed Message:\n32", digest));
+        return ecrecover(messageHash, v, r, s);
     }
     
     /**
@@ -60,7 +246,7 @@ contract GiftCard {
      * @return The value of the gift card (0 if doesn't exist)
      */
     function getGiftCardValue(bytes32 codeHash) public view returns (uint256) {
-        return giftCards[codeHash];
+        return cards[codeHash].value;
     }
     
     /**
@@ -69,7 +255,16 @@ contract GiftCard {
      * @return True if redeemed, false otherwise
      */
     function isRedeemed(bytes32 codeHash) public view returns (bool) {
-        return redeemed[codeHash];
+        return cards[codeHash].redeemed;
+    }
+    
+    /**
+     * @dev Check if an expired gift card's funds were reclaimed by the owner
+     * @param codeHash The hash of the gift card code
+     * @return True if swept, false otherwise
+     */
+    function isSwept(bytes32 codeHash) public view returns (bool) {
+        return cards[codeHash].swept;
     }
     
     // Bonus: Check if a gift card has expired
@@ -79,10 +274,11 @@ contract GiftCard {
      * @return True if expired, false otherwise
      */
     function isExpired(bytes32 codeHash) public view returns (bool) {
-        if (giftCards[codeHash] == 0) {
+        Card memory card = cards[codeHash];
+        if (card.value == 0) {
             return false; // Non-existent gift cards are not expired
         }
-        return block.timestamp > purchaseTime[codeHash] + EXPIRATION_PERIOD;
+        return block.timestamp > card.purchaseTime + EXPIRATION_PERIOD;
     }
     
     // Bonus: Get purchase timestamp
@@ -92,7 +288,7 @@ contract GiftCard {
      * @return The timestamp when the gift card was purchased
      */
     function getPurchaseTime(bytes32 codeHash) public view returns (uint256) {
-        return purchaseTime[codeHash];
+        return cards[codeHash].purchaseTime;
     }
     
     // Bonus: Get expiration timestamp
@@ -102,9 +298,144 @@ contract GiftCard {
      * @return The timestamp when the gift card expires
      */
     function getExpirationTime(bytes32 codeHash) public view returns (uint256) {
-        if (giftCards[codeHash] == 0) {
+        Card memory card = cards[codeHash];
+        if (card.value == 0) {
             return 0; // Non-existent gift cards don't have expiration
         }
-        return purchaseTime[codeHash] + EXPIRATION_PERIOD;
+        return card.purchaseTime + EXPIRATION_PERIOD;
+    }
+    
+    /**
+     * @dev Get the full status of a gift card in a single call
+     * @param codeHash The hash of the gift card code
+     * @return status The value, redeemed/expired flags, purchase and expiration times
+     */
+    function getGiftCardStatus(bytes32 codeHash) public view returns (GiftCardStatus memory status) {
+        Card memory card = cards[codeHash];
+        if (card.value == 0) {
+            return status; // Non-existent gift cards have an all-zero status
+        }
+        status.value = card.value;
+        status.redeemed = card.redeemed;
+        status.purchaseTime = card.purchaseTime;
+        status.expirationTime = status.purchaseTime + EXPIRATION_PERIOD;
+        status.expired = block.timestamp > status.expirationTime;
+    }
+    
+    /**
+     * @dev Get the status of many gift cards in a single call
+     * @param codeHashes The hashes of the gift card codes
+     * @return statuses One status record per code hash, in input order
+     */
+    function getStatusBatch(bytes32[] calldata codeHashes) external view returns (GiftCardStatus[] memory statuses) {
+        statuses = new GiftCardStatus[](codeHashes.length);
+        for (uint256 i = 0; i < codeHashes.length; i++) {
+            statuses[i] = getGiftCardStatus(codeHashes[i]);
+        }
+    }
+    
+    /**
+     * @dev Fund a campaign of gift cards committed as a Merkle root
+     * @param merkleRoot Root over keccak256(abi.encode(index, codeHash, value)) leaves
+     * @param cardCount The number of cards in the tree (informational)
+     * @return campaignId The id used to redeem cards from this campaign
+     */
+    function createCampaign(bytes32 merkleRoot, uint256 cardCount) public payable returns (uint256 campaignId) {
+        require(merkleRoot != bytes32(0), "Merkle root must be set");
+        require(msg.value >= MIN_VALUE, "Gift card value must be at least 0.001 ETH");
+        require(msg.value <= type(uint128).max, "Campaign funds are too large");
+        
+        campaignId = ++campaignCount;
+        campaigns[campaignId] = Campaign(merkleRoot, uint128(msg.value), uint64(block.timestamp), msg.sender);
+        emit CampaignCreated(campaignId, merkleRoot, cardCount, msg.value, msg.sender);
+    }
+    
+    /**
+     * @dev Redeem a campaign gift card using the original code and its Merkle proof
+     * @param campaignId The campaign the card belongs to
+     * @param index The position of the card's leaf in the tree
+     * @param code The original gift card code (not hashed)
+     * @param value The value of the gift card
+     * @param proof Sibling hashes from the leaf up to the root
+     */
+    function redeemWithProof(
+        uint256 campaignId,
+        uint256 index,
+        string calldata code,
+        uint256 value,
+        bytes32[] calldata proof
+    ) public {
+        Campaign storage campaign = campaigns[campaignId];
+        bytes32 codeHash = keccak256(bytes(code));
+        
+        require(campaign.merkleRoot != bytes32(0), "Campaign does not exist");
+        require(!isCampaignCardRedeemed(campaignId, index), "Gift card has already been redeemed");
+        require(block.timestamp <= campaign.createdAt + EXPIRATION_PERIOD, "Gift card has expired");
+        
+        bytes32 leaf = keccak256(abi.encode(index, codeHash, value));
+        require(_verifyProof(proof, campaign.merkleRoot, leaf), "Invalid Merkle proof");
+        require(campaign.balance >= value, "Campaign balance is too low");
+        
+        campaignRedeemed[campaignId][index / 256] |= uint256(1) << (index % 256);
+        campaign.balance -= uint128(value);
+        
+        payable(msg.sender).transfer(value);
+        
+        emit GiftCardRedeemed(codeHash, value, msg.sender, campaign.createdAt, campaign.createdAt + EXPIRATION_PERIOD);
+    }
+    
+    /**
+     * @dev Return an expired campaign's unredeemed funds to its issuer
+     * Either the issuer or the owner may trigger it; the funds always go to the issuer.
+     * @param campaignId The campaign id
+     * @return amount The funds returned
+     */
+    function reclaimCampaign(uint256 campaignId) public returns (uint256 amount) {
+        Campaign storage campaign = campaigns[campaignId];
+        
+        require(campaign.merkleRoot != bytes32(0), "Campaign does not exist");
+        require(msg.sender == campaign.issuer || msg.sender == owner, "Only the issuer or owner can do this");
+        require(block.timestamp > campaign.createdAt + EXPIRATION_PERIOD, "Campaign has not expired");
+        require(campaign.balance > 0, "Campaign has no funds left");
+        
+        amount = campaign.balance;
+        campaign.balance = 0;
+        
+        payable(campaign.issuer).transfer(amount);
+        
+        emit CampaignReclaimed(campaignId, amount, campaign.issuer);
+    }
+    
+    /**
+     * @dev Check if a campaign gift card has been redeemed
+     * @param campaignId The campaign the card belongs to
+     * @param index The position of the card's leaf in the tree
+     * @return True if redeemed, false otherwise
+     */
+    function isCampaignCardRedeemed(uint256 campaignId, uint256 index) public view returns (bool) {
+        return (campaignRedeemed[campaignId][index / 256] & (uint256(1) << (index % 256))) != 0;
+    }
+    
+    /**
+     * @dev Get a campaign's root, remaining funds, creation time and issuer
+     * @param campaignId The campaign id
+     */
+    function getCampaign(uint256 campaignId) public view returns (bytes32 merkleRoot, uint256 balance, uint256 createdAt, address issuer) {
+        Campaign memory campaign = campaigns[campaignId];
+        return (campaign.merkleRoot, campaign.balance, campaign.createdAt, campaign.issuer);
+    }
+    
+    /**
+     * @dev Walk a Merkle proof using sorted-pair hashing
+     */
+    function _verifyProof(bytes32[] calldata proof, bytes32 root, bytes32 leaf) private pure returns (bool) {
+        bytes32 computed = leaf;
+        for (uint256 i = 0; i < proof.length; i++) {
+            bytes32 sibling = proof[i];
+            computed = computed < sibling
+                ? keccak256(abi.encodePacked(computed, sibling))
+                : keccak256(abi.encodePacked(sibling, computed));
+        }
+        return computed == root;
     }
-}
\ No newline at end of file
+}
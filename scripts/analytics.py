@@ -0,0 +1,259 @@
+"""Liability, redemption and breakage analytics over the GiftCard event history.
+
+Loads the cards mirrored by the event indexer (one row per
+GiftCardPurchased, updated by GiftCardRedeemed) into columnar NumPy arrays
+and computes every aggregate with vectorized operations, so tens of
+millions of cards take seconds rather than a query per card. SQLite packs
+each column of a key range into one string or blob with group_concat, so
+no Python object is built per row; that load is bounded by SQLite's scan.
+Columns can be exported to and reloaded from Parquet when pyarrow is
+installed, which loads at close to memory speed for repeated analysis.
+
+Values are held as int64 gwei plus the int64 remainder below one gwei in
+wei, so totals in wei are exact. The 0.001 ETH minimum is 10**6 gwei, and
+int64 gwei stays exact up to about 9.2 billion ETH. Per-day tables are in
+whole gwei, each day's total rounded down.
+
+Usage:
+    python scripts/analytics.py giftcard.db
+    python scripts/analytics.py giftcard.db --parquet cards.parquet
+    python scripts/analytics.py --from-parquet cards.parquet --now 1767225600
+"""
+import argparse
+import json
+import math
+import sqlite3
+import time
+
+import numpy as np
+
+from chain_time import DAY
+from giftcard_common import EXPIRATION_PERIOD
+
+GWEI = 10 ** 9
+
+# Rows loaded from SQLite per code hash range
+FETCH_ROWS = 100_000
+
+COLUMNS = ("code_hash", "value_gwei", "value_rem_wei", "buyer", "purchase_time", "redeemed", "redeem_block")
+
+# One key range of cards, every column packed by SQLite: blobs and hex
+# concatenated, integers comma-separated. value is a decimal string of wei,
+# split into gwei and the remainder so neither overflows int64.
+COLUMNS_QUERY = """
+SELECT count(*),
+       CAST(group_concat(code_hash, '') AS BLOB),
+       group_concat(CAST(substr(value, 1, length(value) - 9) AS INTEGER)),
+       group_concat(CAST(substr(value, -9) AS INTEGER)),
+       group_concat(substr(buyer, 3), ''),
+       group_concat(purchase_time),
+       group_concat(redeemed),
+       group_concat(COALESCE(redeem_block, -1))
+FROM cards WHERE code_hash >= ? AND code_hash < ?
+"""
+
+
+def _ints(packed):
+    return np.fromstring(packed, dtype=np.int64, sep=",")
+
+
+def _key_ranges(count):
+    """Code hash ranges of about FETCH_ROWS cards each; keccak spreads hashes evenly"""
+    ranges = max(1, math.ceil(count / FETCH_ROWS))
+    bounds = [(i << 32) // ranges for i in range(ranges)]
+    # 33 0xff bytes sort after every 32-byte hash
+    return zip([b.to_bytes(4, "big") for b in bounds], [b.to_bytes(4, "big") for b in bounds[1:]] + [b"\xff" * 33])
+
+
+class CardColumns:
+    """One NumPy array per card attribute, all in the same row order"""
+
+    def __init__(self, code_hash, value_gwei, value_rem_wei, buyer, purchase_time, redeemed, redeem_block):
+        self.code_hash = code_hash  # (n, 32) uint8
+        self.value_gwei = value_gwei  # int64 whole gwei
+        self.value_rem_wei = value_rem_wei  # int64 wei below one gwei
+        self.buyer = buyer  # (n, 20) uint8
+        self.purchase_time = purchase_time  # int64 seconds
+        self.redeemed = redeemed  # bool
+        self.redeem_block = redeem_block  # int64, -1 while unredeemed
+
+    def __len__(self):
+        return len(self.value_gwei)
+
+    def value_wei(self, mask=None):
+        """Exact total value in wei of the cards selected by a boolean mask (default: all)"""
+        gwei, rem = (self.value_gwei, self.value_rem_wei) if mask is None else (self.value_gwei[mask], self.value_rem_wei[mask])
+        return int(gwei.sum()) * GWEI + int(rem.sum())
+
+    @classmethod
+    def from_indexer(cls, db_path):
+        """Load every card from an indexer SQLite database"""
+        db = sqlite3.connect(db_path)
+        count = db.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        parts = {name: [] for name in COLUMNS}
+        for low, high in _key_ranges(count):
+            rows, hashes, gwei, rem, buyers, times, redeemed, blocks = db.execute(COLUMNS_QUERY, (low, high)).fetchone()
+            if not rows:
+                continue
+            parts["code_hash"].append(np.frombuffer(hashes, dtype=np.uint8).reshape(-1, 32))
+            parts["value_gwei"].append(_ints(gwei))
+            parts["value_rem_wei"].append(_ints(rem))
+            parts["buyer"].append(np.frombuffer(bytes.fromhex(buyers), dtype=np.uint8).reshape(-1, 20))
+            parts["purchase_time"].append(_ints(times))
+            parts["redeemed"].append(_ints(redeemed).astype(bool))
+            parts["redeem_block"].append(_ints(blocks))
+        db.close()
+        if not parts["value_gwei"]:
+            return cls(np.empty((0, 32), np.uint8), np.empty(0, np.int64), np.empty(0, np.int64),
+                       np.empty((0, 20), np.uint8), np.empty(0, np.int64), np.empty(0, bool), np.empty(0, np.int64))
+        return cls(**{name: np.concatenate(chunks) for name, chunks in parts.items()})
+
+    def to_parquet(self, path):
+        """Write the columns to a Parquet file (requires pyarrow)"""
+        pa, pq = _pyarrow()
+        n = len(self)
+        table = pa.table({
+            "code_hash": pa.FixedSizeBinaryArray.from_buffers(
+                pa.binary(32), n, [None, pa.py_buffer(np.ascontiguousarray(self.code_hash).tobytes())]
+            ),
+            "value_gwei": self.value_gwei,
+            "value_rem_wei": self.value_rem_wei,
+            "buyer": pa.FixedSizeBinaryArray.from_buffers(
+                pa.binary(20), n, [None, pa.py_buffer(np.ascontiguousarray(self.buyer).tobytes())]
+            ),
+            "purchase_time": self.purchase_time,
+            "redeemed": self.redeemed,
+            "redeem_block": self.redeem_block,
+        })
+        pq.write_table(table, path)
+
+    @classmethod
+    def from_parquet(cls, path):
+        """Load columns written by to_parquet (requires pyarrow)"""
+        _, pq = _pyarrow()
+        table = pq.read_table(path)
+
+        def fixed_binary(name, width):
+            column = table.column(name).combine_chunks()
+            data = np.frombuffer(column.buffers()[1], dtype=np.uint8)
+            return data[column.offset * width:(column.offset + len(column)) * width].reshape(-1, width)
+
+        value_gwei = table.column("value_gwei").to_numpy()
+        if "value_rem_wei" in table.column_names:
+            value_rem_wei = table.column("value_rem_wei").to_numpy()
+        else:
+            value_rem_wei = np.zeros(len(value_gwei), np.int64)  # Exported before remainders were kept
+        return cls(
+            code_hash=fixed_binary("code_hash", 32),
+            value_gwei=value_gwei,
+            value_rem_wei=value_rem_wei,
+            buyer=fixed_binary("buyer", 20),
+            purchase_time=table.column("purchase_time").to_numpy(),
+            redeemed=table.column("redeemed").to_numpy(zero_copy_only=False),
+            redeem_block=table.column("redeem_block").to_numpy(),
+        )
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet support needs pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def liability(cards, now):
+    """Outstanding liability and realized breakage at chain time now, in exact wei"""
+    expired = now > cards.purchase_time + EXPIRATION_PERIOD
+    open_ = ~cards.redeemed
+    return {
+        "cards": len(cards),
+        "issued_wei": cards.value_wei(),
+        "redeemed_wei": cards.value_wei(cards.redeemed),
+        "outstanding_cards": int(np.count_nonzero(open_ & ~expired)),
+        "outstanding_wei": cards.value_wei(open_ & ~expired),
+        "breakage_cards": int(np.count_nonzero(open_ & expired)),
+        "breakage_wei": cards.value_wei(open_ & expired),
+    }
+
+
+def redemption_by_issue_day(cards):
+    """Per UTC issue day: cards and value (whole gwei, rounded down) issued and redeemed, and the redemption rates"""
+    day = cards.purchase_time // DAY
+    order = np.argsort(day, kind="stable")
+    days, starts, issued_count = np.unique(day[order], return_index=True, return_counts=True)
+    gwei = cards.value_gwei[order]
+    rem = cards.value_rem_wei[order]
+    redeemed = cards.redeemed[order]
+
+    def day_gwei(mask=None):
+        # Exact int64 sums over each day's contiguous run of sorted rows, remainders carried into gwei
+        if mask is not None:
+            return np.add.reduceat(np.where(mask, gwei, 0), starts) + np.add.reduceat(np.where(mask, rem, 0), starts) // GWEI
+        return np.add.reduceat(gwei, starts) + np.add.reduceat(rem, starts) // GWEI
+
+    if len(days):
+        redeemed_count = np.add.reduceat(redeemed.astype(np.int64), starts)
+        issued_value = day_gwei()
+        redeemed_value = day_gwei(redeemed)
+    else:
+        redeemed_count = issued_value = redeemed_value = np.empty(0, np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "day": days * DAY,
+            "issued_cards": issued_count,
+            "redeemed_cards": redeemed_count,
+            "issued_gwei": issued_value,
+            "redeemed_gwei": redeemed_value,
+            "redemption_rate": np.where(issued_count > 0, redeemed_count / issued_count, 0.0),
+            "value_redemption_rate": np.where(issued_value > 0, redeemed_value / issued_value, 0.0),
+        }
+
+
+def expected_breakage(cards, now):
+    """Breakage expected from outstanding cards, at the value-weighted rate of fully expired issue days"""
+    by_day = redemption_by_issue_day(cards)
+    matured = now > by_day["day"] + DAY + EXPIRATION_PERIOD
+    matured_issued = by_day["issued_gwei"][matured].sum()
+    rate = 1.0 - int(by_day["redeemed_gwei"][matured].sum()) / int(matured_issued) if matured_issued else 0.0
+    outstanding = liability(cards, now)["outstanding_wei"]
+    return {
+        "matured_days": int(np.count_nonzero(matured)),
+        "breakage_rate": float(rate),
+        "expected_breakage_wei": int(outstanding * rate),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gift card liability and redemption analytics")
+    parser.add_argument("db", nargs="?", help="indexer SQLite database")
+    parser.add_argument("--from-parquet", help="load columns from a Parquet file instead")
+    parser.add_argument("--parquet", help="also export the columns to this Parquet file")
+    parser.add_argument("--now", type=int, help="evaluate at this timestamp (default: current time)")
+    parser.add_argument("--days", action="store_true", help="print the per-issue-day table as JSON lines")
+    args = parser.parse_args(argv)
+    if not args.db and not args.from_parquet:
+        parser.error("give an indexer database or --from-parquet")
+
+    started = time.perf_counter()
+    cards = CardColumns.from_parquet(args.from_parquet) if args.from_parquet else CardColumns.from_indexer(args.db)
+    loaded = time.perf_counter() - started
+    if args.parquet:
+        cards.to_parquet(args.parquet)
+
+    now = args.now if args.now is not None else int(time.time())
+    started = time.perf_counter()
+    report = {**liability(cards, now), **expected_breakage(cards, now)}
+    report["load_seconds"] = round(loaded, 3)
+    report["compute_seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(report))
+
+    if args.days:
+        by_day = redemption_by_issue_day(cards)
+        for i in range(len(by_day["day"])):
+            print(json.dumps({name: column[i].item() for name, column in by_day.items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Concurrent gift card status checks with AsyncWeb3.
+
+Streams code hashes through a bounded pool of in-flight eth_calls and
+yields each card's status as soon as its call completes. Every call has a
+timeout and is retried with exponential backoff, and cards can be grouped
+into getStatusBatch calls so a nightly reconciliation of a few hundred
+thousand codes needs only a few thousand round trips.
+
+Usage:
+    python scripts/async_status.py codes.txt --concurrency 32 --batch-size 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import aiohttp
+from web3 import AsyncWeb3
+
+from giftcard_common import CONTRACT_ADDRESS, RPC_ERRORS, RPC_URL, load_abi
+from status_batch import iter_batches, read_code_hashes, status_to_dict
+
+# Errors worth retrying: timeouts, dropped connections and node-side errors
+RETRYABLE_ERRORS = (asyncio.TimeoutError, aiohttp.ClientError) + RPC_ERRORS
+
+
+def connect_async(rpc_url=RPC_URL):
+    """Connect to the JSON-RPC endpoint with an asynchronous provider"""
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url))
+
+
+def get_async_contract(w3, address=CONTRACT_ADDRESS, abi=None):
+    """Return an async contract object for a deployed GiftCard"""
+    return w3.eth.contract(address=AsyncWeb3.to_checksum_address(address), abi=abi or load_abi())
+
+
+async def with_retries(make_call, timeout=10.0, retries=3, backoff=0.25):
+    """Await make_call() with a timeout, retrying failures with jittered backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(make_call(), timeout)
+        except RETRYABLE_ERRORS:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+
+async def fetch_statuses(giftcard, code_hashes, timeout=10.0, retries=3, backoff=0.25):
+    """Fetch the status of one batch of code hashes as a list of dicts"""
+    if len(code_hashes) == 1:
+        status = await with_retries(
+            lambda: giftcard.functions.getGiftCardStatus(code_hashes[0]).call(), timeout, retries, backoff
+        )
+        statuses = [status]
+    else:
+        statuses = await with_retries(
+            lambda: giftcard.functions.getStatusBatch(code_hashes).call(), timeout, retries, backoff
+        )
+    return [status_to_dict(h, s) for h, s in zip(code_hashes, statuses)]
+
+
+async def check_statuses(giftcard, code_hashes, concurrency=32, batch_size=1, timeout=10.0, retries=3, backoff=0.25):
+    """Yield a status dict per code hash as calls complete (not in input order)
+
+    At most ``concurrency`` calls are in flight, so memory stays bounded
+    however long the input stream is. Cards whose call still fails after all
+    retries are yielded with an ``error`` field instead of status fields.
+    """
+    in_flight = {}
+    batches = iter_batches(code_hashes, batch_size)
+
+    def start(batch):
+        task = asyncio.ensure_future(fetch_statuses(giftcard, batch, timeout, retries, backoff))
+        in_flight[task] = batch
+
+    for batch in batches:
+        start(batch)
+        if len(in_flight) < concurrency:
+            continue
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            for record in _results(task, in_flight.pop(task)):
+                yield record
+
+    while in_flight:
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            for record in _results(task, in_flight.pop(task)):
+                yield record
+
+
+def _results(task, batch):
+    error = task.exception()
+    if error is None:
+        return task.result()
+    return [{"codeHash": "0x" + bytes(h).hex(), "error": repr(error)} for h in batch]
+
+
+async def run(args):
+    w3 = connect_async()
+    giftcard = get_async_contract(w3)
+    checked = failed = 0
+    started = time.perf_counter()
+
+    try:
+        with open(args.input) as f:
+            async for record in check_statuses(
+                giftcard,
+                read_code_hashes(f, args.hashes),
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                timeout=args.timeout,
+                retries=args.retries,
+            ):
+                checked += 1
+                failed += "error" in record
+                print(json.dumps(record))
+    finally:
+        # Close the provider's aiohttp session before the event loop goes away
+        await w3.provider.disconnect()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Checked {checked} cards ({failed} failed) in {elapsed:.1f}s: {checked / elapsed:.0f} cards/sec",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check gift card status concurrently with AsyncWeb3")
+    parser.add_argument("input", help="file with one code (or code hash) per line")
+    parser.add_argument("--hashes", action="store_true", help="input lines are hex code hashes")
+    parser.add_argument("--concurrency", type=int, default=32, help="maximum calls in flight")
+    parser.add_argument("--batch-size", type=int, default=1, help="cards per call (uses getStatusBatch above 1)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-call timeout in seconds")
+    parser.add_argument("--retries", type=int, default=3, help="retries per call before giving up")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
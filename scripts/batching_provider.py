@@ -0,0 +1,197 @@
+"""Web3 provider that coalesces concurrent calls into JSON-RPC batch requests.
+
+Requests made from many threads within a short window are sent together
+as one JSON-RPC batch over keep-alive connections, spread round-robin
+across one or more RPC endpoints. Counters report how many requests were
+sent, in how many round trips, and how many round trips batching saved.
+
+Status sweep benchmark (plain HTTPProvider versus batching provider):
+    python scripts/batching_provider.py --bench 10000 --threads 64
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+from giftcard_common import RPC_URL, code_hash, connect, get_contract
+
+# How long the dispatcher waits for more requests before sending a batch
+BATCH_WINDOW = 0.002
+
+# Upper bound on requests per JSON-RPC batch
+MAX_BATCH_SIZE = 500
+
+
+class BatchStats:
+    """Counters for requests, batches and round trips saved"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_size = 0
+
+    def record(self, size):
+        with self.lock:
+            self.requests += size
+            self.batches += 1
+            self.max_batch_size = max(self.max_batch_size, size)
+
+    @property
+    def round_trips_saved(self):
+        return self.requests - self.batches
+
+    @property
+    def mean_batch_size(self):
+        return self.requests / self.batches if self.batches else 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "round_trips": self.batches,
+            "round_trips_saved": self.round_trips_saved,
+            "mean_batch_size": round(self.mean_batch_size, 2),
+            "max_batch_size": self.max_batch_size,
+        }
+
+
+class _Pending:
+    def __init__(self, request_id, payload):
+        self.id = request_id
+        self.payload = payload
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class BatchingHTTPProvider(JSONBaseProvider):
+    """Coalesce concurrent make_request calls into JSON-RPC batches"""
+
+    def __init__(self, endpoint_uris=(RPC_URL,), window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE,
+                 pool_size=8, timeout=30.0):
+        super().__init__()
+        if isinstance(endpoint_uris, str):
+            endpoint_uris = (endpoint_uris,)
+        self.endpoint_uris = tuple(endpoint_uris)
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.stats = BatchStats()
+        self.endpoints = itertools.cycle(self.endpoint_uris)
+
+        # One keep-alive session per endpoint, sized for pool_size concurrent batches
+        self.sessions = {}
+        for uri in self.endpoint_uris:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.sessions[uri] = session
+        self.senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rpc-batch")
+
+        self.lock = threading.Lock()
+        self.queue = []
+        self.wakeup = threading.Condition(self.lock)
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def make_request(self, method, params):
+        payload = self.encode_rpc_request(method, params)
+        # Responses are matched by the id encode_rpc_request put in the payload
+        pending = _Pending(self.decode_rpc_response(payload)["id"], payload)
+        with self.wakeup:
+            self.queue.append(pending)
+            self.wakeup.notify()
+        if not pending.done.wait(self.timeout):
+            raise TimeoutError(f"No response to {method} within {self.timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.response
+
+    def _dispatch(self):
+        while True:
+            with self.wakeup:
+                while not self.queue:
+                    self.wakeup.wait()
+            # Give concurrent callers a moment to join this batch
+            time.sleep(self.window)
+            with self.wakeup:
+                batch = self.queue[:self.max_batch_size]
+                del self.queue[:self.max_batch_size]
+            self.senders.submit(self._send, batch)
+
+    def _post(self, batch):
+        """Send one batch and return its responses by request id"""
+        uri = next(self.endpoints)
+        response = self.sessions[uri].post(
+            uri,
+            data=b"[" + b",".join(p.payload for p in batch) + b"]",
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        results = self.decode_rpc_response(response.content)
+        if not isinstance(results, list):
+            # A node that rejects the whole batch answers with a single error object
+            error = results.get("error", results) if isinstance(results, dict) else results
+            raise ValueError(f"Batch of {len(batch)} requests to {uri} failed: {error}")
+        return {r.get("id"): r for r in results if isinstance(r, dict)}
+
+    def _send(self, batch):
+        try:
+            results = self._post(batch)
+        except Exception as error:
+            # Whatever went wrong, every caller in the batch must wake up with it
+            for pending in batch:
+                pending.error = error
+                pending.done.set()
+            return
+        self.stats.record(len(batch))
+        for pending in batch:
+            pending.response = results.get(pending.id)
+            if pending.response is None:
+                pending.error = ValueError(f"No response for request id {pending.id}")
+            pending.done.set()
+
+
+def status_sweep(giftcard, code_hashes, threads):
+    """Fetch getGiftCardStatus for every code hash from a thread pool"""
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda h: giftcard.functions.getGiftCardStatus(h).call(), code_hashes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON-RPC batching on a status sweep")
+    parser.add_argument("--bench", type=int, default=10_000, help="number of cards to check")
+    parser.add_argument("--threads", type=int, default=64, help="concurrent callers")
+    parser.add_argument("--endpoint", action="append", help="RPC endpoint (repeat for several)")
+    args = parser.parse_args(argv)
+
+    endpoints = args.endpoint or [RPC_URL]
+    code_hashes = [code_hash(f"SWEEP_{i}") for i in range(args.bench)]
+
+    plain = get_contract(connect(endpoints[0]))
+    started = time.perf_counter()
+    status_sweep(plain, code_hashes, args.threads)
+    plain_elapsed = time.perf_counter() - started
+
+    provider = BatchingHTTPProvider(endpoints)
+    batched = get_contract(Web3(provider))
+    started = time.perf_counter()
+    status_sweep(batched, code_hashes, args.threads)
+    batched_elapsed = time.perf_counter() - started
+
+    print(f"HTTPProvider:         {plain_elapsed:.2f}s ({args.bench} round trips)")
+    print(f"BatchingHTTPProvider: {batched_elapsed:.2f}s ({plain_elapsed / batched_elapsed:.1f}x)")
+    print(json.dumps(provider.stats.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
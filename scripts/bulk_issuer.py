@@ -0,0 +1,173 @@
+"""Bulk gift card issuance through GiftCard.buyBatch.
+
+Streams codes from a file (one ``CODE`` or ``CODE,VALUE_ETH`` per line,
+or 32-byte code hashes from ``code_generator.py`` with ``--hashes``),
+packs them into buyBatch transactions sized to stay under the block gas
+limit, and reports cards/sec and gas per card.
+
+Usage:
+    python scripts/bulk_issuer.py codes.txt --value 0.01
+    python scripts/bulk_issuer.py hashes.bin --hashes --value 0.01
+"""
+import argparse
+import math
+import time
+
+from web3 import Web3
+
+from giftcard_common import code_hash, connect, get_contract
+from status_batch import iter_batches
+
+# Starting guess for the gas one card adds to a buyBatch transaction,
+# refined from receipts as chunks land
+GAS_PER_CARD_ESTIMATE = 50_000
+
+# Fixed cost of a buyBatch transaction (21k base gas plus dispatch)
+BATCH_OVERHEAD_GAS = 30_000
+
+# Fraction of the block gas limit one chunk may use
+BLOCK_FILL = 0.5
+
+
+def parse_card_line(line, default_value):
+    """Split a CODE or CODE,VALUE_ETH line into (code, value in wei)"""
+    code, _, value = line.strip().partition(",")
+    value = Web3.to_wei(value.strip(), "ether") if value.strip() else default_value
+    return code.strip(), value
+
+
+def read_cards(lines, default_value):
+    """Yield (code hash, value in wei) for every non-blank input line"""
+    for line in lines:
+        if not line.strip():
+            continue
+        code, value = parse_card_line(line, default_value)
+        yield code_hash(code), value
+
+
+def read_hash_records(f, value):
+    """Yield (code hash, value in wei) for every 32-byte record in a binary file"""
+    while True:
+        h = f.read(32)
+        if not h:
+            break
+        if len(h) != 32:
+            raise ValueError("Hash file length is not a multiple of 32 bytes")
+        yield h, value
+
+
+def chunk_size(block_gas_limit, gas_per_card, fill=BLOCK_FILL):
+    """Number of cards that fit in one transaction under the block gas limit"""
+    usable = int(block_gas_limit * fill) - BATCH_OVERHEAD_GAS
+    return max(1, usable // gas_per_card)
+
+
+def drop_existing(giftcard, cards):
+    """Remove cards that are already issued or repeated within the chunk"""
+    statuses = giftcard.functions.getStatusBatch([h for h, _ in cards]).call()
+    seen = set()
+    fresh, skipped = [], []
+    for (h, value), status in zip(cards, statuses):
+        if status[0] > 0 or h in seen:
+            skipped.append(h)
+        else:
+            seen.add(h)
+            fresh.append((h, value))
+    return fresh, skipped
+
+
+class IssueReport:
+    """Running totals for an issuance run"""
+
+    def __init__(self):
+        self.cards = 0
+        self.skipped = 0
+        self.transactions = 0
+        self.gas_used = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def cards_per_sec(self):
+        return self.cards / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def gas_per_card(self):
+        return self.gas_used / self.cards if self.cards else 0.0
+
+    def summary(self):
+        return (
+            f"Issued {self.cards} cards in {self.transactions} transactions "
+            f"({self.skipped} skipped) in {self.elapsed:.1f}s: "
+            f"{self.cards_per_sec:.1f} cards/sec, {self.gas_per_card:.0f} gas/card"
+        )
+
+
+def issue_cards(w3, giftcard, cards, sender, fill=BLOCK_FILL, log=print):
+    """Issue a stream of (code hash, value) pairs with buyBatch"""
+    report = IssueReport()
+    block_gas_limit = w3.eth.get_block("latest")["gasLimit"]
+    gas_per_card = GAS_PER_CARD_ESTIMATE
+
+    pending = iter(cards)
+    while True:
+        # Re-size every chunk from the gas measured so far
+        size = chunk_size(block_gas_limit, gas_per_card, fill)
+        chunk = next(iter_batches(pending, size), None)
+        if chunk is None:
+            break
+
+        chunk, skipped = drop_existing(giftcard, chunk)
+        report.skipped += len(skipped)
+        if not chunk:
+            continue
+
+        code_hashes = [h for h, _ in chunk]
+        values = [v for _, v in chunk]
+        tx_hash = giftcard.functions.buyBatch(code_hashes, values).transact(
+            {"from": sender, "value": sum(values)}
+        )
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt["status"] != 1:
+            raise RuntimeError(f"buyBatch transaction {tx_hash.hex()} reverted")
+
+        report.cards += len(chunk)
+        report.transactions += 1
+        report.gas_used += receipt["gasUsed"]
+        # The chunk's whole cost per card, overhead included: subtracting the
+        # assumed overhead undercounts cards whenever the real overhead is
+        # smaller, and a larger next chunk then overshoots the budget
+        gas_per_card = max(1, math.ceil(receipt["gasUsed"] / len(chunk)))
+        log(f"Chunk of {len(chunk)} cards in block {receipt['blockNumber']}: {receipt['gasUsed']} gas")
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Issue gift cards in bulk with buyBatch")
+    parser.add_argument("input", help="file with one CODE or CODE,VALUE_ETH per line")
+    parser.add_argument("--hashes", action="store_true", help="input is a binary file of 32-byte code hashes")
+    parser.add_argument("--value", default="0.001", help="default card value in ETH")
+    parser.add_argument("--account", type=int, default=0, help="index into w3.eth.accounts to pay from")
+    parser.add_argument("--fill", type=float, default=BLOCK_FILL, help="fraction of the block gas limit per chunk")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    giftcard = get_contract(w3)
+    sender = w3.eth.accounts[args.account]
+
+    value = Web3.to_wei(args.value, "ether")
+    if args.hashes:
+        with open(args.input, "rb") as f:
+            report = issue_cards(w3, giftcard, read_hash_records(f, value), sender, args.fill)
+    else:
+        with open(args.input) as f:
+            report = issue_cards(w3, giftcard, read_cards(f, value), sender, args.fill)
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
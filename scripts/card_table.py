@@ -0,0 +1,214 @@
+"""Memory-mapped, fixed-width card table keyed by code hash.
+
+Each card is one 64-byte record (code hash, value, purchase time, flags) in
+an open-addressing hash table with linear probing, so 20M cards take about
+2 GB of file instead of Python objects. The slot is taken from the code
+hash's leading bytes, which keccak already spreads uniformly. Lookups read
+fields straight out of the mapping; updates from the GiftCard event stream
+are written in place. Any number of worker processes can open the same
+file read-only and share its pages through the OS page cache.
+
+Cards are never deleted, so probing needs no tombstones. The table does not
+grow: create it with room for the cards you expect (it refuses inserts past
+MAX_LOAD).
+
+Usage:
+    python scripts/card_table.py cards.tbl --create 30000000
+    python scripts/card_table.py cards.tbl --follow
+    python scripts/card_table.py cards.tbl --status HAPPYBIRTHDAY2025
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+from giftcard_common import EXPIRATION_PERIOD, code_hash, connect, get_contract
+from indexer import CHUNK_BLOCKS, EventFollower
+
+# Version 2: the header shrank from 72 bytes to one 64-byte record
+MAGIC = b"GCTABLE2"
+
+# magic, capacity, count, last indexed block (padded to one record)
+HEADER = struct.Struct("<8sQQq32x")
+
+# code hash, value (uint128, little-endian), purchase time, flags
+RECORD = struct.Struct("<32s16sQB7x")
+
+assert HEADER.size == RECORD.size == 64
+
+# Byte offset of the flags within a record
+FLAGS_OFFSET = 56
+
+OCCUPIED = 1
+REDEEMED = 2
+
+# Highest fraction of slots filled before inserts are refused
+MAX_LOAD = 0.7
+
+
+class CardTable:
+    """Open-addressing hash table of card records in a memory-mapped file"""
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.file = open(path, "r+b" if writable else "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        magic, self.capacity, _, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a card table")
+        self.mask = self.capacity - 1
+
+    @classmethod
+    def create(cls, path, expected_cards):
+        """Create an empty table sized for expected_cards and open it for writing"""
+        capacity = 1
+        while capacity * MAX_LOAD < expected_cards:
+            capacity *= 2
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, capacity, 0, -1))
+            f.truncate(HEADER.size + capacity * RECORD.size)
+        return cls(path, writable=True)
+
+    def close(self):
+        self.view.release()
+        if self.writable:
+            self.map.flush()
+        self.map.close()
+        self.file.close()
+
+    @property
+    def count(self):
+        return HEADER.unpack_from(self.map, 0)[2]
+
+    @property
+    def last_block(self):
+        return HEADER.unpack_from(self.map, 0)[3]
+
+    def _set_header(self, count, last_block):
+        HEADER.pack_into(self.map, 0, MAGIC, self.capacity, count, last_block)
+
+    def set_checkpoint(self, last_block):
+        self._set_header(self.count, last_block)
+
+    def _find(self, key):
+        """Offset of key's record, or of the empty slot where it would go"""
+        slot = int.from_bytes(key[:8], "little") & self.mask
+        while True:
+            offset = HEADER.size + slot * RECORD.size
+            if not self.map[offset + FLAGS_OFFSET] & OCCUPIED or self.view[offset:offset + 32] == key:
+                return offset
+            slot = (slot + 1) & self.mask
+
+    def get(self, code_hash_):
+        """(value, purchase time, redeemed) for a card, or None if it is not in the table"""
+        offset = self._find(bytes(code_hash_))
+        _, value, purchase_time, flags = RECORD.unpack_from(self.map, offset)
+        if not flags & OCCUPIED:
+            return None
+        return int.from_bytes(value, "little"), purchase_time, bool(flags & REDEEMED)
+
+    def put(self, code_hash_, value, purchase_time, redeemed=False):
+        """Insert a card; an existing card keeps its record. Return True if inserted"""
+        key = bytes(code_hash_)
+        offset = self._find(key)
+        if self.map[offset + FLAGS_OFFSET] & OCCUPIED:
+            return False
+        count = self.count
+        if count + 1 > self.capacity * MAX_LOAD:
+            raise ValueError(f"Card table is full ({count} cards); create a larger one")
+        # Fields first, flags last, so concurrent readers never see a half-written card
+        RECORD.pack_into(self.map, offset, key, value.to_bytes(16, "little"), purchase_time, 0)
+        self.map[offset + FLAGS_OFFSET] = OCCUPIED | (REDEEMED if redeemed else 0)
+        self._set_header(count + 1, self.last_block)
+        return True
+
+    def mark_redeemed(self, code_hash_):
+        """Set a card's redeemed flag in place; return False if the card is unknown"""
+        offset = self._find(bytes(code_hash_))
+        flags = self.map[offset + FLAGS_OFFSET]
+        if not flags & OCCUPIED:
+            return False
+        self.map[offset + FLAGS_OFFSET] = flags | REDEEMED
+        return True
+
+    def get_status(self, code_hash_, now=None):
+        """Return a card's status, shaped like getGiftCardStatus"""
+        card = self.get(code_hash_)
+        if card is None:
+            return {"value": 0, "redeemed": False, "expired": False, "purchaseTime": 0, "expirationTime": 0}
+        value, purchase_time, redeemed = card
+        expiration_time = purchase_time + EXPIRATION_PERIOD
+        now = time.time() if now is None else now
+        return {
+            "value": value,
+            "redeemed": redeemed,
+            "expired": now > expiration_time,
+            "purchaseTime": purchase_time,
+            "expirationTime": expiration_time,
+        }
+
+
+class CardTableIndexer(EventFollower):
+    """Keep a CardTable in step with GiftCard events"""
+
+    def __init__(self, w3, giftcard, table, chunk_blocks=CHUNK_BLOCKS, start_block=0):
+        super().__init__(w3, giftcard, chunk_blocks, start_block)
+        self.table = table
+
+    @property
+    def last_block(self):
+        last = self.table.last_block
+        return last if last >= 0 else self.start_block - 1
+
+    def _store(self, purchases, redemptions, sweeps, end_block):
+        # Both updates are idempotent, so replaying a chunk after a crash is harmless.
+        # Sweeps are ignored: they only follow expiry, which statuses already report
+        for h, value, _, _, purchase_time in purchases:
+            self.table.put(h, int(value), purchase_time)
+        for _, _, h in redemptions:
+            self.table.mark_redeemed(h)
+        # The checkpoint is written last
+        self.table.set_checkpoint(end_block)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror GiftCard state into a memory-mapped card table")
+    parser.add_argument("table", help="card table file")
+    parser.add_argument("--create", type=int, metavar="CARDS", help="create an empty table sized for CARDS cards")
+    parser.add_argument("--start-block", type=int, default=0, help="first block to index on a fresh table")
+    parser.add_argument("--confirmations", type=int, default=0, help="stay this many blocks behind the head")
+    parser.add_argument("--follow", action="store_true", help="keep indexing new blocks")
+    parser.add_argument("--status", metavar="CODE", help="print the status of a code from the table and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        table = CardTable(args.table)
+        print(json.dumps(table.get_status(code_hash(args.status))))
+        table.close()
+        return
+
+    if args.create:
+        if os.path.exists(args.table):
+            parser.error(f"{args.table} already exists")
+        table = CardTable.create(args.table, args.create)
+    else:
+        table = CardTable(args.table, writable=True)
+    w3 = connect()
+    indexer = CardTableIndexer(w3, get_contract(w3), table, start_block=args.start_block)
+    try:
+        if args.follow:
+            indexer.follow(confirmations=args.confirmations, log=print)
+        else:
+            print(f"Indexed {indexer.sync(confirmations=args.confirmations, log=print)} events")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
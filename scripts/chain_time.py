@@ -0,0 +1,47 @@
+"""Control chain time on development nodes.
+
+Works with hardhat (``evm_increaseTime``, ``evm_setNextBlockTimestamp``,
+``evm_mine``) and with the in-process eth-tester backend used by the test
+suite (``testing_timeTravel``), so expiry can be exercised by moving
+``block.timestamp`` forward instead of waiting or patching ``time.time``.
+"""
+from web3 import EthereumTesterProvider
+
+DAY = 24 * 60 * 60
+
+
+class ChainClock:
+    """Read and move block.timestamp on a development chain"""
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self.in_process = isinstance(w3.provider, EthereumTesterProvider)
+
+    def now(self):
+        """Timestamp of the latest mined block"""
+        return self.w3.eth.get_block("latest")["timestamp"]
+
+    def set_next_block_timestamp(self, timestamp):
+        """Make the next mined block carry exactly this timestamp"""
+        if self.in_process:
+            # eth-tester mines an empty block just before the target time
+            self.w3.testing.timeTravel(timestamp)
+        else:
+            self.w3.manager.request_blocking("evm_setNextBlockTimestamp", [timestamp])
+
+    def advance(self, seconds):
+        """Move chain time forward and mine a block so views see the new time"""
+        if self.in_process:
+            self.w3.testing.timeTravel(self.now() + seconds)
+            self.mine()
+        else:
+            self.w3.manager.request_blocking("evm_increaseTime", [seconds])
+            self.mine()
+        return self.now()
+
+    def advance_days(self, days):
+        return self.advance(days * DAY)
+
+    def mine(self, blocks=1):
+        for _ in range(blocks):
+            self.w3.manager.request_blocking("evm_mine", [])
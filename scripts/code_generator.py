@@ -0,0 +1,180 @@
+"""Generate and hash unique gift card codes across a process pool.
+
+Workers draw random human-readable codes (no 0/O/1/I look-alikes) and hash
+them with keccak256 over their UTF-8 bytes, exactly like ``hashCode()`` in
+the web page and ``code_hash`` here. The parent drops repeats with a Bloom
+filter indexed by the hashes themselves, optionally pre-loaded with every
+code hash in an indexer database, and can also ask the contract about each
+chunk with getStatusBatch. A false positive only discards a fresh code, so
+no duplicate is ever written.
+
+Codes stream to a text file for printing and their hashes, in the same
+order, to a binary file of 32-byte records that ``bulk_issuer.py --hashes``
+issues directly.
+
+Usage:
+    python scripts/code_generator.py 1000000 --codes codes.txt --hashes hashes.bin
+    python scripts/code_generator.py 1000000 --codes codes.txt --hashes hashes.bin --index giftcard.db --check-chain
+"""
+import argparse
+import math
+import os
+import sqlite3
+import time
+from collections import deque
+from multiprocessing import Pool
+
+from eth_hash.auto import keccak
+
+from giftcard_common import connect, get_contract
+from status_batch import iter_statuses
+
+# 32 symbols, so one random byte masked to 5 bits picks one without bias
+ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+# Codes generated and hashed per worker task
+CHUNK_CODES = 10_000
+
+# Chunks queued per worker process; bounds how far generation runs ahead
+# of the parent's filtering and writing
+IN_FLIGHT_PER_WORKER = 2
+
+# Bloom filter false positive rate (fresh codes discarded, never duplicates kept)
+ERROR_RATE = 1e-6
+
+
+class BloomFilter:
+    """Bloom filter over keccak hashes, whose bytes already serve as the hash functions"""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        capacity = max(1, capacity)
+        # Optimal bits m = -n ln p / (ln 2)^2 and probes k = (m / n) ln 2 for n items at rate p
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h):
+        # Enhanced double hashing from two independent 64-bit slices of the
+        # digest. With plain h1 + i*h2, two hashes with equal h2 and h1 one
+        # step apart share k - 1 bits; the cubic term breaks those runs
+        h1 = int.from_bytes(h[:8], "big")
+        h2 = int.from_bytes(h[8:16], "big")
+        return [(h1 + i * h2 + (i ** 3 - i) // 6) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, h):
+        """True if h may have been added (false positives at about error_rate once full)"""
+        return all(self.bits[p >> 3] & 1 << (p & 7) for p in self._positions(h))
+
+    def add(self, h):
+        """Add h; return True if it was (definitely) not present before"""
+        new = False
+        for p in self._positions(h):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        return new
+
+
+def format_code(symbols, group):
+    if not group:
+        return symbols
+    return "-".join(symbols[i:i + group] for i in range(0, len(symbols), group))
+
+
+def generate_chunk(task):
+    """Worker: (count, length, group, prefix) -> list of (code, code hash)"""
+    count, length, group, prefix = task
+    raw = os.urandom(count * length)
+    symbols = "".join(ALPHABET[b & 31] for b in raw)
+    chunk = []
+    for i in range(count):
+        code = prefix + format_code(symbols[i * length:(i + 1) * length], group)
+        chunk.append((code, keccak(code.encode("utf-8"))))
+    return chunk
+
+
+def preload_index(bloom, db_path):
+    """Add every code hash already in an indexer database; return how many"""
+    db = sqlite3.connect(db_path)
+    count = 0
+    for (h,) in db.execute("SELECT code_hash FROM cards"):
+        bloom.add(bytes(h))
+        count += 1
+    db.close()
+    return count
+
+
+def drop_on_chain(giftcard, chunk):
+    """Remove codes the contract already knows"""
+    statuses = iter_statuses(giftcard, [h for _, h in chunk])
+    return [item for item, status in zip(chunk, statuses) if status["value"] == 0]
+
+
+def generate_codes(count, codes_out, hashes_out, length=12, group=4, prefix="", workers=None,
+                   index_path=None, giftcard=None, error_rate=ERROR_RATE, log=print):
+    """Write count unique codes and their hashes; return generation stats"""
+    index_size = 0
+    if index_path:
+        db = sqlite3.connect(index_path)
+        index_size = db.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        db.close()
+    bloom = BloomFilter(count + index_size, error_rate)
+    if index_path:
+        log(f"Loaded {preload_index(bloom, index_path)} indexed code hashes")
+
+    # duplicates counts Bloom filter hits: real repeats and false positives alike
+    stats = {"written": 0, "generated": 0, "duplicates": 0, "on_chain": 0}
+    started = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    in_flight = deque()
+    pending = 0  # Codes requested from workers but not yet received
+    with Pool(workers) as pool:
+        while stats["written"] < count:
+            # Ask only for the codes still missing, a bounded window at a time
+            while len(in_flight) < workers * IN_FLIGHT_PER_WORKER and stats["written"] + pending < count:
+                size = min(CHUNK_CODES, count - stats["written"] - pending)
+                in_flight.append(pool.apply_async(generate_chunk, ((size, length, group, prefix),)))
+                pending += size
+            chunk = in_flight.popleft().get()
+            pending -= len(chunk)
+            stats["generated"] += len(chunk)
+            fresh = [(code, h) for code, h in chunk if bloom.add(h)]
+            stats["duplicates"] += len(chunk) - len(fresh)
+            if giftcard is not None and fresh:
+                kept = drop_on_chain(giftcard, fresh)
+                stats["on_chain"] += len(fresh) - len(kept)
+                fresh = kept
+            codes_out.write("".join(code + "\n" for code, _ in fresh))
+            hashes_out.write(b"".join(h for _, h in fresh))
+            stats["written"] += len(fresh)
+
+    elapsed = time.perf_counter() - started
+    stats["codes_per_sec"] = stats["written"] / elapsed if elapsed else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate unique gift card codes and their hashes")
+    parser.add_argument("count", type=int, help="number of codes to generate")
+    parser.add_argument("--codes", required=True, help="output text file, one code per line")
+    parser.add_argument("--hashes", required=True, help="output binary file of 32-byte code hashes")
+    parser.add_argument("--length", type=int, default=12, help="random symbols per code")
+    parser.add_argument("--group", type=int, default=4, help="symbols between dashes (0 for none)")
+    parser.add_argument("--prefix", default="", help="fixed text before every code")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--index", help="indexer SQLite database of codes already issued")
+    parser.add_argument("--check-chain", action="store_true", help="also check each chunk with getStatusBatch")
+    args = parser.parse_args(argv)
+
+    giftcard = get_contract(connect()) if args.check_chain else None
+    with open(args.codes, "w") as codes_out, open(args.hashes, "wb") as hashes_out:
+        stats = generate_codes(args.count, codes_out, hashes_out, args.length, args.group, args.prefix,
+                               args.workers, args.index, giftcard)
+    print(f"Wrote {stats['written']} codes ({stats['duplicates']} possible duplicates, {stats['on_chain']} already "
+          f"on chain dropped) at {stats['codes_per_sec']:.0f} codes/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,69 @@
+const fs = require("fs");
+const path = require("path");
 const hre = require("hardhat");
 
-async function main() {
-  console.log("Deploying GiftCard contract...");
+// Set GIFTCARD_SHARDS=N to deploy N GiftCard shards and write a shard manifest
+// for scripts/shard_router.py (to GIFTCARD_SHARD_MANIFEST, default shards.json).
+// Running again against another --network appends that network's shards, so
+// build the whole manifest before issuing: routing depends on the shard count.
+// A network that already has shards in the manifest is refused, since adding
+// more would re-route every card already issued; set GIFTCARD_SHARD_APPEND=1
+// to append anyway.
+const SHARD_COUNT = parseInt(process.env.GIFTCARD_SHARDS || "0", 10);
+const MANIFEST_PATH = process.env.GIFTCARD_SHARD_MANIFEST || path.join(__dirname, "..", "shards.json");
+const FORCE_APPEND = process.env.GIFTCARD_SHARD_APPEND === "1";
+
+async function deployGiftCard(GiftCard) {
+  const giftCard = await GiftCard.deploy();
+  await giftCard.deployed();
+  return giftCard;
+}
+
+async function deployShards(GiftCard) {
+  const manifest = fs.existsSync(MANIFEST_PATH)
+    ? JSON.parse(fs.readFileSync(MANIFEST_PATH, "utf8"))
+    : { version: 1, routing: "prefix32-range", shards: [] };
+  const { chainId } = await hre.ethers.provider.getNetwork();
+  const rpcUrl = hre.network.config.url || "http://127.0.0.1:8545";
+
+  const existing = manifest.shards.filter((shard) => shard.chainId === chainId && shard.rpcUrl === rpcUrl);
+  if (existing.length > 0 && !FORCE_APPEND) {
+    throw new Error(
+      `${MANIFEST_PATH} already has ${existing.length} shards on chain ${chainId} at ${rpcUrl}; ` +
+      "adding more changes which shard every issued card routes to. Set GIFTCARD_SHARD_APPEND=1 to append anyway."
+    );
+  }
+
+  for (let i = 0; i < SHARD_COUNT; i++) {
+    const giftCard = await deployGiftCard(GiftCard);
+    const shard = { index: manifest.shards.length, address: giftCard.address, rpcUrl, chainId };
+    manifest.shards.push(shard);
+    console.log(`Shard ${shard.index} deployed to: ${shard.address}`);
+  }
 
+  fs.writeFileSync(MANIFEST_PATH, JSON.stringify(manifest, null, 2) + "\n");
+  console.log(`\nWrote ${manifest.shards.length} shards to ${MANIFEST_PATH}`);
+  console.log("Network:", hre.network.name);
+}
+
+async function main() {
   // Get the contract factory
   const GiftCard = await hre.ethers.getContractFactory("GiftCard");
 
-  // Deploy the contract
-  const giftCard = await GiftCard.deploy();
+  if (SHARD_COUNT > 0) {
+    console.log(`Deploying ${SHARD_COUNT} GiftCard shards...`);
+    await deployShards(GiftCard);
+    return;
+  }
 
-  // Wait for deployment to complete
-  await giftCard.deployed();
+  console.log("Deploying GiftCard contract...");
+
+  // Deploy the contract and wait for deployment to complete
+  const giftCard = await deployGiftCard(GiftCard);
 
   console.log("GiftCard contract deployed to:", giftCard.address);
   console.log("Network:", hre.network.name);
-  
+
   // Save the contract address for easy access
   console.log("\n=== IMPORTANT ===");
   console.log("Copy this contract address to your webpage/app.js file.\n");
@@ -29,4 +78,4 @@ main()
   .catch((error) => {
     console.error(error);
     process.exit(1);
-  });
\ No newline at end of file
+  });
@@ -0,0 +1,197 @@
+"""Expiry scheduler fed by GiftCard events.
+
+Every purchased card is scheduled in one indexed binary heap per notice
+period, keyed on when it becomes "expiring in N days", and in one heap keyed
+on when it expires (``block.timestamp > purchaseTime + EXPIRATION_PERIOD``,
+the contract's rule). Advancing chain time pops every card that crossed a
+threshold and emits them as one batch per threshold, so holders can be
+notified in bulk without polling cards one by one. A redemption removes its
+card from every heap in O(log n) through the heap's position index.
+
+Usage (JSON lines of batches on stdout):
+    python scripts/expiry_scheduler.py --notice-days 7 --notice-days 3 --follow
+"""
+import argparse
+import json
+import time
+
+from chain_time import DAY, ChainClock
+from giftcard_common import EXPIRATION_PERIOD, connect, get_contract
+from indexer import CHUNK_BLOCKS, EventFollower
+
+# Matches the web page's "Expiring Soon" badge
+NOTICE_DAYS = (3,)
+
+
+class IndexedHeap:
+    """Binary min-heap of items by key, with O(log n) removal of any item"""
+
+    def __init__(self):
+        self.entries = []  # [key, item] pairs in heap order
+        self.positions = {}  # item -> index into entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def push(self, item, key):
+        if item in self.positions:
+            return
+        self.entries.append([key, item])
+        self.positions[item] = len(self.entries) - 1
+        self._sift_up(len(self.entries) - 1)
+
+    def remove(self, item):
+        index = self.positions.pop(item, None)
+        if index is None:
+            return False
+        last = self.entries.pop()
+        if index < len(self.entries):
+            self.entries[index] = last
+            self.positions[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self.positions[last[1]])
+        return True
+
+    def pop_until(self, limit):
+        """Remove and return (item, key) for every item whose key is <= limit, in key order"""
+        popped = []
+        while self.entries and self.entries[0][0] <= limit:
+            key, item = self.entries[0]
+            self.remove(item)
+            popped.append((item, key))
+        return popped
+
+    def _swap(self, i, j):
+        entries = self.entries
+        entries[i], entries[j] = entries[j], entries[i]
+        self.positions[entries[i][1]] = i
+        self.positions[entries[j][1]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.entries[parent][0] <= self.entries[i][0]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        size = len(self.entries)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self.entries[child][0] < self.entries[smallest][0]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+
+class ExpiryScheduler:
+    """Emit "expiring in N days" and "expired" batches as chain time advances"""
+
+    def __init__(self, notice_days=NOTICE_DAYS, on_batch=None):
+        self.notice_days = sorted(set(notice_days), reverse=True)
+        self.notices = {days: IndexedHeap() for days in self.notice_days}
+        self.expiries = IndexedHeap()
+        self.on_batch = on_batch
+        self.now = 0
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def add(self, code_hash_, purchase_time):
+        """Schedule a purchased card"""
+        key = bytes(code_hash_)
+        expiration_time = purchase_time + EXPIRATION_PERIOD
+        for days, heap in self.notices.items():
+            # A card already inside this notice window at load time still gets its notice
+            heap.push(key, expiration_time - days * DAY)
+        # isExpired is block.timestamp > expirationTime
+        self.expiries.push(key, expiration_time + 1)
+
+    def remove(self, code_hash_):
+        """Drop a redeemed card from every schedule"""
+        key = bytes(code_hash_)
+        for heap in self.notices.values():
+            heap.remove(key)
+        return self.expiries.remove(key)
+
+    def advance(self, now):
+        """Emit every batch due at or before chain time now; return them as (kind, days, cards)"""
+        self.now = max(self.now, now)
+        batches = []
+        expired = self.expiries.pop_until(self.now)
+        for card, _ in expired:
+            for heap in self.notices.values():
+                heap.remove(card)
+        for days in self.notice_days:
+            due = self.notices[days].pop_until(self.now)
+            if due:
+                batches.append(("expiring", days, [(card, key + days * DAY) for card, key in due]))
+        if expired:
+            batches.append(("expired", 0, [(card, key - 1) for card, key in expired]))
+        for kind, days, cards in batches:
+            if self.on_batch:
+                self.on_batch(kind, days, cards)
+        return batches
+
+
+class ExpiryFollower(EventFollower):
+    """Feed an ExpiryScheduler from GiftCardPurchased and GiftCardRedeemed logs"""
+
+    def __init__(self, w3, giftcard, scheduler, chunk_blocks=CHUNK_BLOCKS, start_block=0):
+        super().__init__(w3, giftcard, chunk_blocks, start_block)
+        self.scheduler = scheduler
+        self.checkpoint = start_block - 1
+
+    @property
+    def last_block(self):
+        return self.checkpoint
+
+    def _store(self, purchases, redemptions, sweeps, end_block):
+        # Sweeps only follow expiry, by which time the scheduler is done with a card
+        for h, _, _, _, purchase_time in purchases:
+            self.scheduler.add(h, purchase_time)
+        for _, _, h in redemptions:
+            self.scheduler.remove(h)
+        self.checkpoint = end_block
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emit gift card expiry notices in batches")
+    parser.add_argument("--notice-days", type=int, action="append",
+                        help="warn this many days before expiry (repeatable, default: 3)")
+    parser.add_argument("--start-block", type=int, default=0, help="first block to read events from")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between checks with --follow")
+    parser.add_argument("--follow", action="store_true", help="keep following new blocks")
+    args = parser.parse_args(argv)
+
+    def emit(kind, days, cards):
+        print(json.dumps({
+            "event": kind,
+            "days": days,
+            "cards": [{"codeHash": "0x" + card.hex(), "expirationTime": expires} for card, expires in cards],
+        }), flush=True)
+
+    w3 = connect()
+    scheduler = ExpiryScheduler(args.notice_days or NOTICE_DAYS, on_batch=emit)
+    follower = ExpiryFollower(w3, get_contract(w3), scheduler, start_block=args.start_block)
+    clock = ChainClock(w3)
+    try:
+        while True:
+            follower.sync()
+            scheduler.advance(clock.now())
+            if not args.follow:
+                break
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Gas report for every GiftCard entry point, measured from receipts.
+
+Deploys a fresh GiftCard from a compiled artifact, sends buy, buyBatch,
+redeem and every view function as transactions, and records ``gasUsed``
+from each receipt. View functions are sent as transactions too so they are
+measured the same way (their numbers include the 21k base gas).
+
+To compare two contract versions, build each one and point ``--artifact``
+at it:
+    python scripts/gas_report.py --artifact before/GiftCard.json --output before.json
+    python scripts/gas_report.py --output after.json --compare before.json
+"""
+import argparse
+import json
+
+from giftcard_common import ARTIFACT_PATH, code_hash, connect, deploy_contract, load_artifact
+
+VIEW_FUNCTIONS = (
+    "getGiftCardValue",
+    "isRedeemed",
+    "isExpired",
+    "getPurchaseTime",
+    "getExpirationTime",
+    "getGiftCardStatus",
+)
+
+BATCH_SIZE = 10
+
+
+def function_names(giftcard):
+    return {item["name"] for item in giftcard.abi if item["type"] == "function"}
+
+
+def gas_used(w3, tx_hash):
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    if receipt["status"] != 1:
+        raise RuntimeError(f"Transaction {tx_hash.hex()} reverted")
+    return receipt["gasUsed"]
+
+
+def measure_gas(w3, giftcard, buyer, redeemer, code="GAS_REPORT", value=None):
+    """Return {operation: gasUsed} for one card lifecycle"""
+    value = value or w3.to_wei(0.01, "ether")
+    names = function_names(giftcard)
+    h = code_hash(code)
+    results = {}
+
+    results["buy"] = gas_used(w3, giftcard.functions.buy(h).transact({"from": buyer, "value": value}))
+
+    for name in VIEW_FUNCTIONS:
+        if name in names:
+            results[name] = gas_used(w3, getattr(giftcard.functions, name)(h).transact({"from": buyer}))
+
+    batch = [code_hash(f"{code}_{i}") for i in range(BATCH_SIZE)]
+    if "buyBatch" in names:
+        tx_hash = giftcard.functions.buyBatch(batch, [value] * BATCH_SIZE).transact(
+            {"from": buyer, "value": value * BATCH_SIZE}
+        )
+        results[f"buyBatch[{BATCH_SIZE}]"] = gas_used(w3, tx_hash)
+    if "getStatusBatch" in names:
+        results[f"getStatusBatch[{BATCH_SIZE}]"] = gas_used(
+            w3, giftcard.functions.getStatusBatch(batch).transact({"from": buyer})
+        )
+
+    results["redeem"] = gas_used(w3, giftcard.functions.redeem(code).transact({"from": redeemer}))
+    return results
+
+
+def compare(before, after):
+    """Format a before/after table of gas per operation"""
+    lines = [f"{'operation':<24}{'before':>10}{'after':>10}{'delta':>10}{'change':>9}"]
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<24}{old or '-':>10}{new or '-':>10}")
+            continue
+        lines.append(f"{name:<24}{old:>10}{new:>10}{new - old:>+10}{(new - old) / old:>+9.1%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure GiftCard gas usage from receipts")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH, help="compiled GiftCard artifact to deploy")
+    parser.add_argument("--code", default="GAS_REPORT", help="gift card code to use")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    accounts = w3.eth.accounts
+    giftcard = deploy_contract(w3, accounts[0], load_artifact(args.artifact))
+    results = measure_gas(w3, giftcard, accounts[1], accounts[2], args.code)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), results))
+    else:
+        for name, gas in results.items():
+            print(f"{name:<24}{gas:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Resumable bulk gift card operations driven from CSV files.
+
+``issue`` and ``redeem`` stream rows from a CSV file and pipeline one
+transaction per row through tx_submitter's PipelinedSubmitter. ``status``
+streams rows into batched getStatusBatch calls. Every operation is recorded
+in an append-only write-ahead journal: a transaction's hash once it is
+signed (synced to disk before the transaction is broadcast) and again when
+it is confirmed or fails, and finished status batches as row checkpoints
+with the length of the output file. Rerunning the same command with the
+same journal skips every row the journal already finished without touching
+the chain. Only the few rows that were submitted but never confirmed are
+looked up again, and status output written after the last checkpoint is
+truncated and regenerated.
+
+Data rows are numbered from 0 in file order (blank rows and an optional
+``code`` header row are not counted), so a journal only matches an
+unchanged input file. Input rows, the pipeline and the journal's replay
+state are all bounded, so multi-million-row files run in constant memory.
+
+Input rows: ``CODE[,VALUE_ETH]`` for issue, ``CODE`` for redeem and status.
+Transactions are signed locally by GIFTCARD_PRIVATE_KEYS (default: hardhat's
+development keys). Redemptions pay out to the signing account.
+
+Usage:
+    python scripts/giftcard.py issue cards.csv --value 0.01
+    python scripts/giftcard.py redeem codes.csv --account 1
+    python scripts/giftcard.py status codes.csv --out statuses.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from giftcard_client import REDEEM_GAS
+from giftcard_common import code_hash, connect, get_contract
+from status_batch import iter_batches, iter_statuses, max_batch_size
+from tx_submitter import BUY_GAS, PipelinedSubmitter, load_accounts
+
+JOURNAL_VERSION = 1
+
+# Outcome and checkpoint records written between fsyncs; a crash loses at
+# most these, and lost records only cause a receipt lookup or a repeated
+# status batch on the next run. Submissions are synced one by one.
+FSYNC_EVERY = 1_000
+
+# Seconds to wait for a transaction found pending in the node's pool at resume
+RESUME_TIMEOUT = 120
+
+
+class Journal:
+    """Append-only JSON-lines log of finished and in-flight rows
+
+    Replay keeps only a watermark (every row at or below it is finished),
+    the finished rows above it and the rows still in flight. Rows are
+    submitted in order and the pipeline is bounded, so both sets stay small.
+    """
+
+    def __init__(self, path, command):
+        self.path = path
+        self.done_through = -1
+        self.done = set()
+        self.in_flight = {}  # row -> tx hash
+        self.out_bytes = None  # Output file length at the last checkpoint
+        self.counts = {"confirmed": 0, "failed": 0, "skipped": 0}
+        self.unsynced = 0
+        if os.path.exists(path):
+            self._replay(command)
+        self.file = open(path, "a")
+        if self.file.tell() == 0:
+            self._write({"journal": JOURNAL_VERSION, "command": command})
+
+    def _replay(self, command):
+        good = 0
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # A torn last line from a crash; everything before it stands
+                if not line.endswith(b"\n"):
+                    break
+                if number == 0:
+                    if record.get("command") != command:
+                        raise ValueError(f"{self.path} is a journal for {record.get('command')!r}, not {command!r}")
+                else:
+                    self._apply(record)
+                good += len(line)
+        # Drop the torn tail so new records start on a line of their own
+        os.truncate(self.path, good)
+
+    def _apply(self, record):
+        if "through" in record:
+            self._finish_through(record["through"])
+            self.out_bytes = record.get("out_bytes", self.out_bytes)
+            return
+        row, state = record["row"], record["state"]
+        if state == "submitted":
+            self.in_flight[row] = record["tx"]
+        else:
+            self.in_flight.pop(row, None)
+            self.counts[state] += 1
+            self.done.add(row)
+            while self.done_through + 1 in self.done:
+                self.done_through += 1
+                self.done.remove(self.done_through)
+
+    def _finish_through(self, row):
+        self.done_through = max(self.done_through, row)
+        self.done = {r for r in self.done if r > self.done_through}
+
+    def is_done(self, row):
+        return row <= self.done_through or row in self.done
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= FSYNC_EVERY:
+            self.sync()
+
+    def record(self, row, state, **fields):
+        """Append one row's new state"""
+        record = {"row": row, "state": state, **fields}
+        self._write(record)
+        self._apply(record)
+
+    def checkpoint(self, row, out_bytes=None):
+        """Mark every row up to and including row as finished, with the output length so far"""
+        record = {"through": row}
+        if out_bytes is not None:
+            record["out_bytes"] = out_bytes
+        self._write(record)
+        self._apply(record)
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+def read_rows(f):
+    """Yield (row number, cells) for every data row of a CSV file, skipping blanks and a code header"""
+    row = 0
+    for line, cells in enumerate(csv.reader(f)):
+        cells = [cell.strip() for cell in cells]
+        if not cells or not cells[0]:
+            continue
+        if line == 0 and cells[0].lower() == "code":
+            continue
+        yield row, cells
+        row += 1
+
+
+def settle_in_flight(w3, journal, log=print):
+    """Resolve rows a previous run submitted but never saw confirmed"""
+    for row, tx_hash in list(journal.in_flight.items()):
+        try:
+            receipt = w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            try:
+                w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                # Never reached the node, or dropped: submit the row again
+                log(f"Row {row}: transaction {tx_hash} not found, resubmitting")
+                del journal.in_flight[row]
+                continue
+            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=RESUME_TIMEOUT)
+        if receipt["status"] == 1:
+            journal.record(row, "confirmed", block=receipt["blockNumber"])
+        else:
+            journal.record(row, "failed", error="reverted")
+
+
+def run_transactions(w3, journal, rows, build_tx, account, max_in_flight=64, log=print):
+    """Pipeline one transaction per unfinished row, journaling each submission and outcome"""
+    settle_in_flight(w3, journal, log)
+
+    def on_signed(pending):
+        # Durable before broadcast: after a crash the row is settled by this
+        # hash rather than resent, which would revert on the first attempt's success
+        journal.record(pending.tag, "submitted", tx="0x" + bytes(pending.tx_hash).hex())
+        journal.sync()
+
+    def on_done(pending):
+        if pending.ok:
+            journal.record(pending.tag, "confirmed", block=pending.receipt["blockNumber"])
+        else:
+            error = str(pending.error) if pending.error is not None else "reverted"
+            journal.record(pending.tag, "failed", error=error)
+
+    submitter = PipelinedSubmitter(w3, max_in_flight=max_in_flight, on_done=on_done, on_signed=on_signed)
+    started = time.perf_counter()
+    sent = 0
+    for row, cells in rows:
+        if journal.is_done(row) or row in journal.in_flight:
+            continue
+        tx = build_tx(cells)
+        if tx is None:
+            journal.record(row, "skipped", error="invalid row")
+            continue
+        submitter.submit(account, tx, tag=row)
+        sent += 1
+        if sent % 1000 == 0:
+            log(f"{sent} transactions sent ({sent / (time.perf_counter() - started):.1f}/sec)")
+    submitter.wait_all()
+    return sent
+
+
+def issue_builder(giftcard, default_value, account, gas_price, chain_id):
+    def build(cells):
+        try:
+            value = Web3.to_wei(cells[1], "ether") if len(cells) > 1 and cells[1] else default_value
+        except (ValueError, ArithmeticError):
+            # ArithmeticError: decimal.InvalidOperation for text that is not a number
+            return None
+        if value <= 0:
+            return None
+        tx = giftcard.functions.buy(code_hash(cells[0])).build_transaction(
+            {"from": account.address, "value": value, "gas": BUY_GAS, "gasPrice": gas_price, "chainId": chain_id}
+        )
+        tx.pop("from")
+        return tx
+    return build
+
+
+def redeem_builder(giftcard, account, gas_price, chain_id):
+    def build(cells):
+        tx = giftcard.functions.redeem(cells[0]).build_transaction(
+            {"from": account.address, "gas": REDEEM_GAS, "gasPrice": gas_price, "chainId": chain_id}
+        )
+        tx.pop("from")
+        return tx
+    return build
+
+
+def run_status(giftcard, journal, rows, out, batch_size=None):
+    """Write a status line per unfinished row to out (a binary file opened for append), checkpointing after each batch"""
+    if journal.out_bytes is None:
+        # First run: remember where this run's output starts
+        journal.checkpoint(journal.done_through, out_bytes=out.tell())
+        journal.sync()
+    else:
+        # Lines written after the last checkpoint are regenerated, not duplicated
+        out.truncate(journal.out_bytes)
+        out.seek(journal.out_bytes)
+    written = 0
+    pending = ((row, cells) for row, cells in rows if not journal.is_done(row))
+    for batch in iter_batches(pending, batch_size or max_batch_size()):
+        records = iter_statuses(giftcard, [code_hash(cells[0]) for _, cells in batch], len(batch))
+        for (row, cells), record in zip(batch, records):
+            out.write(json.dumps({"row": row, "code": cells[0], **record}).encode() + b"\n")
+        # Output reaches the file before the journal says the rows are done
+        out.flush()
+        os.fsync(out.fileno())
+        journal.checkpoint(batch[-1][0], out_bytes=out.tell())
+        written += len(batch)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="giftcard", description="Resumable bulk gift card operations from CSV")
+    parser.add_argument("command", choices=("issue", "redeem", "status"))
+    parser.add_argument("input", help="CSV file: CODE[,VALUE_ETH] rows for issue, CODE rows otherwise")
+    parser.add_argument("--journal", help="write-ahead journal (default: INPUT.COMMAND.journal)")
+    parser.add_argument("--value", default="0.001", help="default card value in ETH for issue")
+    parser.add_argument("--account", type=int, default=0, help="index into GIFTCARD_PRIVATE_KEYS to sign with")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="pipeline depth for issue and redeem")
+    parser.add_argument("--out", help="status output file, appended to on resume (required for status)")
+    args = parser.parse_args(argv)
+    if args.command == "status" and not args.out:
+        parser.error("status needs --out so a rerun can resume")
+
+    w3 = connect()
+    giftcard = get_contract(w3)
+    journal = Journal(args.journal or f"{args.input}.{args.command}.journal", args.command)
+    previously_done = journal.done_through + 1 + len(journal.done)
+    try:
+        with open(args.input, newline="") as f:
+            rows = read_rows(f)
+            if args.command == "status":
+                with open(args.out, "ab") as out:
+                    count = run_status(giftcard, journal, rows, out)
+                print(f"Wrote {count} statuses to {args.out}")
+            else:
+                account = load_accounts()[args.account]
+                gas_price, chain_id = w3.eth.gas_price, w3.eth.chain_id
+                if args.command == "issue":
+                    build = issue_builder(giftcard, Web3.to_wei(args.value, "ether"), account, gas_price, chain_id)
+                else:
+                    build = redeem_builder(giftcard, account, gas_price, chain_id)
+                sent = run_transactions(w3, journal, rows, build, account, args.max_in_flight)
+                print(f"Sent {sent} transactions; journal totals: {json.dumps(journal.counts)}")
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume", file=sys.stderr)
+    finally:
+        journal.close()
+    if previously_done:
+        print(f"Resumed past {previously_done} rows finished by earlier runs")
+
+
+if __name__ == "__main__":
+    main()
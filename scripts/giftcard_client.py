@@ -0,0 +1,128 @@
+"""GiftCard client whose buy and redeem return results decoded from the receipt.
+
+Each write is first simulated with ``eth_call`` against the pending block,
+so a transaction that would revert fails fast with the contract's reason
+and costs no gas. Because the simulation already proved the call succeeds,
+the transaction goes out with a fixed gas limit instead of a second
+simulation through ``eth_estimateGas``. The result (value, parties,
+purchase and expiration time) comes from the GiftCardPurchased or
+GiftCardRedeemed log in the receipt, so no view calls follow confirmation.
+
+Usage:
+    python scripts/giftcard_client.py buy HAPPYBIRTHDAY2025 0.01 --account 1
+    python scripts/giftcard_client.py redeem HAPPYBIRTHDAY2025 --account 2
+"""
+import argparse
+import json
+
+from web3 import Web3
+
+from giftcard_common import code_hash, connect, get_contract
+from tx_submitter import BUY_GAS
+
+# Gas limit for redeem(): the payout to a fresh account is the costly part
+REDEEM_GAS = 120_000
+
+
+class CardResult:
+    """A confirmed buy or redeem, decoded from its receipt"""
+
+    def __init__(self, event, receipt):
+        args = event["args"]
+        self.code_hash = bytes(args["codeHash"])
+        self.value = args["value"]
+        self.purchase_time = args["purchaseTime"]
+        self.expiration_time = args["expirationTime"]
+        self.tx_hash = bytes(receipt["transactionHash"])
+        self.block_number = receipt["blockNumber"]
+        self.gas_used = receipt["gasUsed"]
+
+    def to_dict(self):
+        return {
+            "codeHash": "0x" + self.code_hash.hex(),
+            "value": self.value,
+            "purchaseTime": self.purchase_time,
+            "expirationTime": self.expiration_time,
+            "transactionHash": "0x" + self.tx_hash.hex(),
+            "blockNumber": self.block_number,
+            "gasUsed": self.gas_used,
+        }
+
+
+class Purchase(CardResult):
+    def __init__(self, event, receipt):
+        super().__init__(event, receipt)
+        self.buyer = event["args"]["buyer"]
+
+    def to_dict(self):
+        return {**super().to_dict(), "buyer": self.buyer}
+
+
+class Redemption(CardResult):
+    def __init__(self, event, receipt):
+        super().__init__(event, receipt)
+        self.redeemer = event["args"]["redeemer"]
+
+    def to_dict(self):
+        return {**super().to_dict(), "redeemer": self.redeemer}
+
+
+class GiftCardClient:
+    """Validate, send and decode GiftCard buys and redemptions"""
+
+    def __init__(self, w3, giftcard):
+        self.w3 = w3
+        self.giftcard = giftcard
+
+    def _send(self, function, tx, event, result_class):
+        # Raises ContractLogicError with the revert reason before anything is sent
+        function.call(tx, block_identifier="pending")
+        tx_hash = function.transact(tx)
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt["status"] != 1:
+            raise RuntimeError(f"Transaction {tx_hash.hex()} reverted")
+        return result_class(event.process_receipt(receipt)[0], receipt)
+
+    def buy(self, code, value, sender, gas=BUY_GAS):
+        """Buy a gift card for code worth value wei; return a Purchase"""
+        return self._send(
+            self.giftcard.functions.buy(code_hash(code)),
+            {"from": sender, "value": value, "gas": gas},
+            self.giftcard.events.GiftCardPurchased(),
+            Purchase,
+        )
+
+    def redeem(self, code, sender, gas=REDEEM_GAS):
+        """Redeem code to sender; return a Redemption"""
+        return self._send(
+            self.giftcard.functions.redeem(code),
+            {"from": sender, "gas": gas},
+            self.giftcard.events.GiftCardRedeemed(),
+            Redemption,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buy or redeem a gift card and print the decoded result")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    buy = subparsers.add_parser("buy", help="buy a gift card")
+    buy.add_argument("code")
+    buy.add_argument("amount", help="value in ETH")
+    redeem = subparsers.add_parser("redeem", help="redeem a gift card")
+    redeem.add_argument("code")
+    for sub in (buy, redeem):
+        sub.add_argument("--account", type=int, default=0, help="index into w3.eth.accounts to send from")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    client = GiftCardClient(w3, get_contract(w3))
+    sender = w3.eth.accounts[args.account]
+    if args.command == "buy":
+        result = client.buy(args.code, Web3.to_wei(args.amount, "ether"), sender)
+    else:
+        result = client.redeem(args.code, sender)
+    print(json.dumps(result.to_dict()))
+
+
+if __name__ == "__main__":
+    main()
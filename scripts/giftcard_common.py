@@ -0,0 +1,71 @@
+import json
+import os
+
+from web3 import Web3
+
+try:
+    from web3.exceptions import Web3RPCError
+except ImportError:  # web3 < 7 reports JSON-RPC errors as ValueError
+    Web3RPCError = ValueError
+
+# Errors a node returns for rejected calls (e.g. out of gas)
+RPC_ERRORS = (Web3RPCError, ValueError)
+
+# --- Configurations ---
+RPC_URL = os.environ.get("GIFTCARD_RPC_URL", "http://127.0.0.1:8545")
+CONTRACT_ADDRESS = os.environ.get(
+    "GIFTCARD_CONTRACT_ADDRESS", "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+)  # Replace with the deployed address
+
+# Mirrors GiftCard.EXPIRATION_PERIOD (30 days in seconds)
+EXPIRATION_PERIOD = 30 * 24 * 60 * 60
+
+# Hardhat artifact, resolved relative to the repository root
+ARTIFACT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "artifacts", "contracts", "GiftCard.sol", "GiftCard.json",
+)
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    """Load the compiled GiftCard artifact from Hardhat"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_abi(path=ARTIFACT_PATH):
+    """Load the GiftCard ABI from Hardhat artifacts"""
+    return load_artifact(path)["abi"]
+
+
+def connect(rpc_url=RPC_URL):
+    """Connect to the JSON-RPC endpoint"""
+    return Web3(Web3.HTTPProvider(rpc_url))
+
+
+def get_contract(w3, address=CONTRACT_ADDRESS, abi=None):
+    """Return a contract object for a deployed GiftCard"""
+    return w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi or load_abi())
+
+
+def code_hash(code):
+    """Hash a gift card code the same way the contract does"""
+    return Web3.keccak(text=code)
+
+
+def deploy_contract(w3, sender, artifact=None):
+    """Deploy a fresh GiftCard from the compiled artifact and return it"""
+    artifact = artifact or load_artifact()
+    factory = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"])
+    tx_hash = factory.constructor().transact({"from": sender})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt["contractAddress"], abi=artifact["abi"])
+
+
+def event_topic(giftcard, name):
+    """Return topic0 for an event, derived from the contract ABI"""
+    for item in giftcard.abi:
+        if item["type"] == "event" and item["name"] == name:
+            types = ",".join(i["type"] for i in item["inputs"])
+            return Web3.keccak(text=f"{name}({types})")
+    raise KeyError(f"Event {name} not in ABI")
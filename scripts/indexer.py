@@ -0,0 +1,231 @@
+"""Incremental GiftCard event indexer backed by SQLite.
+
+Pulls GiftCardPurchased, GiftCardRedeemed and GiftCardSwept logs in
+chunked eth_getLogs block ranges and mirrors card state into a ``cards``
+table keyed by code hash. The last processed block is committed in the same transaction as
+each chunk, so a restart resumes exactly where the previous run stopped,
+and memory use is bounded by one chunk of logs however long the history.
+
+Usage:
+    python scripts/indexer.py giftcard.db
+    python scripts/indexer.py giftcard.db --follow
+    python scripts/indexer.py giftcard.db --status SOMECODE
+"""
+import abc
+import argparse
+import json
+import sqlite3
+import time
+
+from giftcard_common import (
+    EXPIRATION_PERIOD,
+    RPC_ERRORS,
+    code_hash,
+    connect,
+    event_topic,
+    get_contract,
+)
+
+# Initial eth_getLogs block range; halved when a node rejects a range
+CHUNK_BLOCKS = 2_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    code_hash BLOB PRIMARY KEY,
+    value TEXT NOT NULL,
+    buyer TEXT NOT NULL,
+    purchase_block INTEGER NOT NULL,
+    purchase_time INTEGER NOT NULL,
+    redeemed INTEGER NOT NULL DEFAULT 0,
+    redeemer TEXT,
+    redeem_block INTEGER,
+    swept INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cards_purchase_time ON cards (purchase_time);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    contract TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+"""
+
+# Cards the owner may still sweep; created after the swept column exists
+SWEEPABLE_INDEX = """
+CREATE INDEX IF NOT EXISTS cards_sweepable ON cards (purchase_time) WHERE redeemed = 0 AND swept = 0
+"""
+
+
+class EventFollower(abc.ABC):
+    """Read GiftCard events in chunked block ranges and hand them to _store
+
+    Subclasses keep the state: they provide ``last_block`` (the checkpoint)
+    and ``_store(purchases, redemptions, sweeps, end_block)``, which must
+    persist a chunk together with its checkpoint.
+    """
+
+    def __init__(self, w3, giftcard, chunk_blocks=CHUNK_BLOCKS, start_block=0):
+        self.w3 = w3
+        self.giftcard = giftcard
+        self.chunk_blocks = chunk_blocks
+        self.start_block = start_block
+        self.purchased_topic = event_topic(giftcard, "GiftCardPurchased")
+        self.redeemed_topic = event_topic(giftcard, "GiftCardRedeemed")
+        self.swept_topic = event_topic(giftcard, "GiftCardSwept")
+
+    @property
+    @abc.abstractmethod
+    def last_block(self):
+        """Last block already stored; sync resumes from the block after it"""
+
+    def sync(self, to_block=None, confirmations=0, log=None):
+        """Index every block from the checkpoint up to to_block (default: head)"""
+        if to_block is None:
+            to_block = self.w3.eth.block_number - confirmations
+        indexed = 0
+        from_block = self.last_block + 1
+        while from_block <= to_block:
+            end = min(from_block + self.chunk_blocks - 1, to_block)
+            try:
+                logs = self.w3.eth.get_logs({
+                    "address": self.giftcard.address,
+                    "fromBlock": from_block,
+                    "toBlock": end,
+                    "topics": [[self.purchased_topic, self.redeemed_topic, self.swept_topic]],
+                })
+            except RPC_ERRORS:
+                # Range too large for the node: retry with half the blocks
+                if self.chunk_blocks == 1:
+                    raise
+                self.chunk_blocks = max(1, self.chunk_blocks // 2)
+                continue
+            self._store(*self._decode(logs), end)
+            indexed += len(logs)
+            if log:
+                log(f"Indexed blocks {from_block}-{end}: {len(logs)} events")
+            from_block = end + 1
+        return indexed
+
+    def follow(self, poll_interval=2.0, confirmations=0, log=None):
+        """Keep indexing new blocks until interrupted"""
+        while True:
+            self.sync(confirmations=confirmations, log=log)
+            time.sleep(poll_interval)
+
+    def _decode(self, logs):
+        """Split logs into purchase, redemption and sweep rows for _store"""
+        purchases, redemptions, sweeps = [], [], []
+        for entry in logs:
+            if entry["topics"][0] == self.purchased_topic:
+                event = self.giftcard.events.GiftCardPurchased().process_log(entry)
+                purchases.append((
+                    bytes(event["args"]["codeHash"]),
+                    str(event["args"]["value"]),
+                    event["args"]["buyer"],
+                    event["blockNumber"],
+                    event["args"]["purchaseTime"],
+                ))
+            elif entry["topics"][0] == self.redeemed_topic:
+                event = self.giftcard.events.GiftCardRedeemed().process_log(entry)
+                redemptions.append((
+                    event["args"]["redeemer"],
+                    event["blockNumber"],
+                    bytes(event["args"]["codeHash"]),
+                ))
+            else:
+                event = self.giftcard.events.GiftCardSwept().process_log(entry)
+                sweeps.append((bytes(event["args"]["codeHash"]),))
+        return purchases, redemptions, sweeps
+
+    @abc.abstractmethod
+    def _store(self, purchases, redemptions, sweeps, end_block):
+        """Persist one chunk's rows together with end_block as the new checkpoint"""
+
+
+class GiftCardIndexer(EventFollower):
+    """Mirror GiftCard events into SQLite and answer status queries locally"""
+
+    def __init__(self, w3, giftcard, db_path, chunk_blocks=CHUNK_BLOCKS, start_block=0):
+        super().__init__(w3, giftcard, chunk_blocks, start_block)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(cards)")}
+        if "swept" not in columns:
+            # Databases from before sweeps were indexed
+            self.db.execute("ALTER TABLE cards ADD COLUMN swept INTEGER NOT NULL DEFAULT 0")
+        self.db.execute(SWEEPABLE_INDEX)
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def last_block(self):
+        row = self.db.execute(
+            "SELECT last_block FROM checkpoint WHERE contract = ?", (self.giftcard.address,)
+        ).fetchone()
+        return row[0] if row else self.start_block - 1
+
+    def _store(self, purchases, redemptions, sweeps, end_block):
+        # Events, redemptions, sweeps and the checkpoint land in one transaction
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO cards (code_hash, value, buyer, purchase_block, purchase_time)"
+                " VALUES (?, ?, ?, ?, ?)",
+                purchases,
+            )
+            self.db.executemany(
+                "UPDATE cards SET redeemed = 1, redeemer = ?, redeem_block = ? WHERE code_hash = ?",
+                redemptions,
+            )
+            self.db.executemany("UPDATE cards SET swept = 1 WHERE code_hash = ?", sweeps)
+            self.db.execute(
+                "INSERT INTO checkpoint (contract, last_block) VALUES (?, ?)"
+                " ON CONFLICT (contract) DO UPDATE SET last_block = excluded.last_block",
+                (self.giftcard.address, end_block),
+            )
+
+    def get_status(self, code_hash_, now=None):
+        """Return the indexed status of a card, shaped like getGiftCardStatus"""
+        row = self.db.execute(
+            "SELECT value, redeemed, purchase_time FROM cards WHERE code_hash = ?",
+            (bytes(code_hash_),),
+        ).fetchone()
+        if row is None:
+            return {"value": 0, "redeemed": False, "expired": False, "purchaseTime": 0, "expirationTime": 0}
+        value, redeemed, purchase_time = row
+        expiration_time = purchase_time + EXPIRATION_PERIOD
+        now = time.time() if now is None else now
+        return {
+            "value": int(value),
+            "redeemed": bool(redeemed),
+            "expired": now > expiration_time,
+            "purchaseTime": purchase_time,
+            "expirationTime": expiration_time,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index GiftCard events into SQLite")
+    parser.add_argument("db", help="SQLite database file")
+    parser.add_argument("--start-block", type=int, default=0, help="first block to index on a fresh database")
+    parser.add_argument("--chunk-blocks", type=int, default=CHUNK_BLOCKS, help="blocks per eth_getLogs request")
+    parser.add_argument("--confirmations", type=int, default=0, help="stay this many blocks behind the head")
+    parser.add_argument("--follow", action="store_true", help="keep indexing new blocks")
+    parser.add_argument("--status", metavar="CODE", help="print the indexed status of a code and exit")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    indexer = GiftCardIndexer(w3, get_contract(w3), args.db, args.chunk_blocks, args.start_block)
+    try:
+        if args.status:
+            print(json.dumps(indexer.get_status(code_hash(args.status))))
+        elif args.follow:
+            indexer.follow(confirmations=args.confirmations, log=print)
+        else:
+            print(f"Indexed {indexer.sync(confirmations=args.confirmations, log=print)} events")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        indexer.close()
+
+
+if __name__ == "__main__":
+    main()
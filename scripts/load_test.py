@@ -0,0 +1,271 @@
+"""Load generator and latency/throughput benchmark for buy and redeem.
+
+Runs concurrent buyer and redeemer workers, each using one of the node's
+unlocked accounts (``w3.eth.accounts``), against a local node. Workers pick
+operations from a weighted mix that can include failure cases (duplicate
+codes, below-MIN_VALUE purchases, double redeems). Failure cases are sent
+with a fixed gas limit, skipping the gas estimate that would reject them
+before they reach the chain, so nodes that mine reverts (hardhat) measure
+their latency and gas too. The run reports
+transactions/sec, p50/p95/p99 submit-to-receipt latency, gas per operation
+and failure reasons, and can be written to JSON and compared with an
+earlier run.
+
+Usage:
+    python scripts/load_test.py --buyers 4 --redeemers 4 --duration 30 --output run.json
+    python scripts/load_test.py --mix buy=60,redeem=30,duplicate=5,double_redeem=5 --compare run.json
+"""
+import argparse
+import json
+import queue
+import random
+import re
+import threading
+import time
+
+from web3.exceptions import ContractLogicError, TimeExhausted
+
+from giftcard_client import REDEEM_GAS
+from giftcard_common import RPC_ERRORS, code_hash, connect, deploy_contract, get_contract
+from tx_submitter import BUY_GAS
+
+BUY_OPERATIONS = ("buy", "duplicate", "below_min")
+REDEEM_OPERATIONS = ("redeem", "double_redeem")
+
+DEFAULT_MIX = "buy=60,redeem=30,duplicate=4,below_min=3,double_redeem=3"
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(spec):
+    """Parse 'buy=60,redeem=30' into {operation: weight}"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in BUY_OPERATIONS + REDEEM_OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def failure_reason(error):
+    """Short, stable reason string for a failed operation"""
+    message = str(error)
+    for pattern in (r"reason string '([^']+)'", r"execution reverted: ([^'\n]+)"):
+        match = re.search(pattern, message)
+        if match:
+            return match.group(1).strip()
+    return type(error).__name__
+
+
+class LoadStats:
+    """Thread-safe collection of per-operation results"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.gas = {}
+        self.failures = {}
+        self.completed = 0
+
+    def success(self, operation, latency, gas_used):
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(latency)
+            self.gas.setdefault(operation, []).append(gas_used)
+            self.completed += 1
+
+    def reverted(self, operation, latency, gas_used, reason):
+        """A failure that was mined: it counts towards latency and gas as well"""
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(latency)
+            self.gas.setdefault(operation, []).append(gas_used)
+            key = f"{operation}: {reason}"
+            self.failures[key] = self.failures.get(key, 0) + 1
+            self.completed += 1
+
+    def failure(self, operation, reason):
+        with self.lock:
+            key = f"{operation}: {reason}"
+            self.failures[key] = self.failures.get(key, 0) + 1
+            self.completed += 1
+
+    def report(self, elapsed, config):
+        all_latencies = sorted(l for values in self.latencies.values() for l in values)
+        operations = {}
+        for operation, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            operations[operation] = {
+                "count": len(latencies),
+                "gas_per_op": sum(self.gas[operation]) / len(self.gas[operation]),
+                **{f"p{p}_ms": percentile(latencies, p) * 1000 for p in PERCENTILES},
+            }
+        mined = len(all_latencies)
+        return {
+            "config": config,
+            "elapsed_sec": elapsed,
+            "operations_total": self.completed,
+            "mined": mined,
+            "tx_per_sec": mined / elapsed if elapsed else 0.0,
+            "latency_ms": {f"p{p}": (percentile(all_latencies, p) or 0) * 1000 for p in PERCENTILES},
+            "operations": operations,
+            "failures": dict(sorted(self.failures.items())),
+        }
+
+
+class LoadTest:
+    """Drive buyers and redeemers against one GiftCard deployment"""
+
+    def __init__(self, w3, giftcard, mix, value, min_value):
+        self.w3 = w3
+        self.giftcard = giftcard
+        self.mix = mix
+        self.value = value
+        self.min_value = min_value
+        self.stats = LoadStats()
+        self.bought = queue.Queue()
+        self.redeemed = queue.Queue()
+        self.counter = 0
+        self.counter_lock = threading.Lock()
+        self.stop = threading.Event()
+
+    def new_code(self):
+        with self.counter_lock:
+            self.counter += 1
+            return f"LOAD_{time.time_ns()}_{self.counter}"
+
+    def send(self, operation, account, call, tx):
+        started = time.perf_counter()
+        try:
+            tx_hash = call.transact({"from": account, **tx})
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        except (ContractLogicError, TimeExhausted) + RPC_ERRORS as error:
+            self.stats.failure(operation, failure_reason(error))
+            return False
+        if receipt["status"] != 1:
+            latency = time.perf_counter() - started
+            self.stats.reverted(operation, latency, receipt["gasUsed"], self.revert_reason(call, account, tx, receipt))
+            return False
+        self.stats.success(operation, time.perf_counter() - started, receipt["gasUsed"])
+        return True
+
+    def revert_reason(self, call, account, tx, receipt):
+        """Replay a mined revert as a call to recover its reason"""
+        try:
+            call.call({"from": account, **tx}, block_identifier=receipt["blockNumber"])
+        except (ContractLogicError,) + RPC_ERRORS as error:
+            return failure_reason(error)
+        return "reverted"
+
+    def run_buy(self, operation, account):
+        functions = self.giftcard.functions
+        if operation == "buy":
+            code = self.new_code()
+            if self.send(operation, account, functions.buy(code_hash(code)), {"value": self.value}):
+                self.bought.put(code)
+        elif operation == "duplicate":
+            code = self.new_code()
+            if self.send("buy", account, functions.buy(code_hash(code)), {"value": self.value}):
+                self.bought.put(code)
+                self.send(operation, account, functions.buy(code_hash(code)), {"value": self.value, "gas": BUY_GAS})
+        elif operation == "below_min":
+            self.send(operation, account, functions.buy(code_hash(self.new_code())),
+                      {"value": self.min_value - 1, "gas": BUY_GAS})
+
+    def run_redeem(self, operation, account):
+        source = self.redeemed if operation == "double_redeem" else self.bought
+        try:
+            code = source.get(timeout=0.1)
+        except queue.Empty:
+            return
+        # A double redeem must reach the chain: skip the gas estimate that would reject it
+        tx = {"gas": REDEEM_GAS} if operation == "double_redeem" else {}
+        if self.send(operation, account, self.giftcard.functions.redeem(code), tx) and operation == "redeem":
+            self.redeemed.put(code)
+
+    def worker(self, account, operations, run, deadline):
+        names = [name for name in operations if self.mix.get(name)]
+        if not names:
+            return
+        weights = [self.mix[name] for name in names]
+        while not self.stop.is_set() and time.perf_counter() < deadline:
+            run(random.choices(names, weights)[0], account)
+
+    def run(self, buyers, redeemers, duration):
+        accounts = self.w3.eth.accounts
+        if buyers + redeemers > len(accounts):
+            raise ValueError(f"Need {buyers + redeemers} accounts, node has {len(accounts)}")
+        started = time.perf_counter()
+        deadline = started + duration
+        threads = [
+            threading.Thread(target=self.worker, args=(accounts[i], BUY_OPERATIONS, self.run_buy, deadline))
+            for i in range(buyers)
+        ] + [
+            threading.Thread(target=self.worker, args=(accounts[buyers + i], REDEEM_OPERATIONS, self.run_redeem, deadline))
+            for i in range(redeemers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+        return time.perf_counter() - started
+
+
+def compare(before, after):
+    """Format the headline metrics of two runs side by side"""
+    rows = [("tx_per_sec", before["tx_per_sec"], after["tx_per_sec"])]
+    rows += [(f"latency {p}", before["latency_ms"][p], after["latency_ms"][p]) for p in after["latency_ms"]]
+    for operation in sorted(set(before["operations"]) & set(after["operations"])):
+        rows.append((f"gas {operation}", before["operations"][operation]["gas_per_op"], after["operations"][operation]["gas_per_op"]))
+    lines = [f"{'metric':<24}{'before':>12}{'after':>12}{'change':>9}"]
+    for name, old, new in rows:
+        change = f"{(new - old) / old:+.1%}" if old else "-"
+        lines.append(f"{name:<24}{old:>12.1f}{new:>12.1f}{change:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test GiftCard buy and redeem")
+    parser.add_argument("--buyers", type=int, default=4, help="concurrent buyer accounts")
+    parser.add_argument("--redeemers", type=int, default=4, help="concurrent redeemer accounts")
+    parser.add_argument("--duration", type=float, default=30.0, help="run time in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted operation mix")
+    parser.add_argument("--value", default="0.001", help="gift card value in ETH")
+    parser.add_argument("--deploy", action="store_true", help="deploy a fresh GiftCard for the run")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    giftcard = deploy_contract(w3, w3.eth.accounts[0]) if args.deploy else get_contract(w3)
+    mix = parse_mix(args.mix)
+    load = LoadTest(w3, giftcard, mix, w3.to_wei(args.value, "ether"), giftcard.functions.MIN_VALUE().call())
+    elapsed = load.run(args.buyers, args.redeemers, args.duration)
+
+    config = {"buyers": args.buyers, "redeemers": args.redeemers, "duration": args.duration, "mix": mix}
+    results = load.stats.report(elapsed, config)
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), results))
+
+
+if __name__ == "__main__":
+    main()
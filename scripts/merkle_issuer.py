@@ -0,0 +1,183 @@
+"""Build a Merkle campaign for GiftCard.createCampaign and emit per-code proofs.
+
+Each card becomes the leaf keccak256(abi.encode(index, codeHash, value)),
+and parents hash their two children in sorted order, matching
+GiftCard._verifyProof. Leaves and every tree level are streamed through
+fixed-width files on disk, so memory use stays constant for millions of
+codes. Issuance is a single createCampaign transaction whatever the card
+count; each holder later redeems with redeemWithProof.
+
+Usage:
+    python scripts/merkle_issuer.py codes.txt --value 0.01 --proofs proofs.jsonl
+    python scripts/merkle_issuer.py codes.txt --value 0.01 --proofs proofs.jsonl --create
+"""
+import argparse
+import json
+import mmap
+import os
+import tempfile
+
+from web3 import Web3
+
+from bulk_issuer import parse_card_line
+from giftcard_common import code_hash, connect, get_contract
+
+HASH_SIZE = 32
+
+# Nodes read and written per I/O call while building a level
+IO_NODES = 4096
+
+
+def leaf_hash(index, code_hash_, value):
+    """keccak256(abi.encode(uint256 index, bytes32 codeHash, uint256 value))"""
+    return Web3.keccak(index.to_bytes(32, "big") + bytes(code_hash_) + value.to_bytes(32, "big"))
+
+
+def hash_pair(a, b):
+    """Parent of two nodes, hashed in sorted order"""
+    return Web3.keccak(a + b if a < b else b + a)
+
+
+def verify_proof(leaf, proof, root):
+    """Python mirror of GiftCard._verifyProof"""
+    computed = bytes(leaf)
+    for sibling in proof:
+        computed = bytes(hash_pair(computed, bytes(sibling)))
+    return computed == bytes(root)
+
+
+def build_level(src_path, dst_path):
+    """Hash pairs of nodes from one level file into the next; return the node count"""
+    count = 0
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        while True:
+            block = src.read(2 * HASH_SIZE * IO_NODES)
+            if not block:
+                break
+            parents = []
+            for offset in range(0, len(block) - HASH_SIZE, 2 * HASH_SIZE):
+                parents.append(hash_pair(block[offset:offset + HASH_SIZE], block[offset + HASH_SIZE:offset + 2 * HASH_SIZE]))
+            if len(block) % (2 * HASH_SIZE):
+                # An unpaired last node moves up unchanged
+                parents.append(block[-HASH_SIZE:])
+            dst.write(b"".join(parents))
+            count += len(parents)
+    return count
+
+
+class MerkleTree:
+    """A Merkle tree whose levels live in files under workdir"""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.level_paths = []
+        self.level_sizes = []
+        self.maps = []
+
+    def level_path(self, level):
+        return os.path.join(self.workdir, f"level_{level}.bin")
+
+    def build(self, leaf_count):
+        """Build every level above level_0.bin, which must already hold the leaves"""
+        if leaf_count == 0:
+            raise ValueError("Cannot build a Merkle tree without leaves")
+        self.level_paths = [self.level_path(0)]
+        self.level_sizes = [leaf_count]
+        while self.level_sizes[-1] > 1:
+            path = self.level_path(len(self.level_paths))
+            self.level_sizes.append(build_level(self.level_paths[-1], path))
+            self.level_paths.append(path)
+        self.maps = []
+        for path in self.level_paths:
+            with open(path, "rb") as f:
+                self.maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self.root
+
+    @property
+    def root(self):
+        return bytes(self.maps[-1][:HASH_SIZE])
+
+    def node(self, level, index):
+        return self.maps[level][index * HASH_SIZE:(index + 1) * HASH_SIZE]
+
+    def proof(self, index):
+        """Sibling hashes from leaf index up to the root"""
+        proof = []
+        for level, size in enumerate(self.level_sizes[:-1]):
+            sibling = index ^ 1
+            if sibling < size:
+                proof.append(self.node(level, sibling))
+            index //= 2
+        return proof
+
+    def close(self):
+        for m in self.maps:
+            m.close()
+
+
+def write_leaves(lines, path, default_value):
+    """Write one leaf per card to path; return (card count, total value)"""
+    count = total = 0
+    with open(path, "wb") as f:
+        for line in lines:
+            if not line.strip():
+                continue
+            code, value = parse_card_line(line, default_value)
+            f.write(leaf_hash(count, code_hash(code), value))
+            count += 1
+            total += value
+    return count, total
+
+
+def write_proofs(lines, tree, out, default_value):
+    """Write one JSON line per card with everything redeemWithProof needs"""
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        code, value = parse_card_line(line, default_value)
+        out.write(json.dumps({
+            "index": index,
+            "code": code,
+            "value": value,
+            "proof": ["0x" + bytes(p).hex() for p in tree.proof(index)],
+        }) + "\n")
+        index += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Merkle gift card campaign and its proofs")
+    parser.add_argument("input", help="file with one CODE or CODE,VALUE_ETH per line")
+    parser.add_argument("--value", default="0.001", help="default card value in ETH")
+    parser.add_argument("--proofs", required=True, help="output JSON lines file of per-code proofs")
+    parser.add_argument("--workdir", help="directory for tree level files (default: a temporary directory)")
+    parser.add_argument("--create", action="store_true", help="send createCampaign funding the whole campaign")
+    parser.add_argument("--account", type=int, default=0, help="index into w3.eth.accounts to fund from")
+    args = parser.parse_args(argv)
+
+    default_value = Web3.to_wei(args.value, "ether")
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = MerkleTree(args.workdir or tmp)
+        with open(args.input) as f:
+            count, total = write_leaves(f, tree.level_path(0), default_value)
+        root = tree.build(count)
+        with open(args.input) as f, open(args.proofs, "w") as out:
+            write_proofs(f, tree, out, default_value)
+        tree.close()
+
+    print(f"Merkle root: 0x{root.hex()}")
+    print(f"Cards: {count}, total value: {Web3.from_wei(total, 'ether')} ETH")
+
+    if args.create:
+        w3 = connect()
+        giftcard = get_contract(w3)
+        tx_hash = giftcard.functions.createCampaign(root, count).transact(
+            {"from": w3.eth.accounts[args.account], "value": total}
+        )
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        event = giftcard.events.CampaignCreated().process_receipt(receipt)[0]
+        print(f"Campaign {event['args']['campaignId']} created in block {receipt['blockNumber']} ({receipt['gasUsed']} gas)")
+
+
+if __name__ == "__main__":
+    main()
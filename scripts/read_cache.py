@@ -0,0 +1,161 @@
+"""Block-aware read cache for GiftCard view calls.
+
+A card's value, purchase time and expiration time never change once it is
+bought, so they are cached until evicted. ``isRedeemed`` flips only once:
+``True`` is cached for good and ``False`` only for the block it was read
+at, unless a GiftCardRedeemed event flips it sooner. ``isExpired`` is
+computed locally from the cached purchase time, EXPIRATION_PERIOD and the
+head block's timestamp, so it costs no call at all. Memory is bounded by
+an LRU over code hashes.
+"""
+import time
+from collections import OrderedDict
+
+from giftcard_common import EXPIRATION_PERIOD, event_topic
+
+# Cards kept in memory before the least recently used are evicted
+MAX_ENTRIES = 100_000
+
+# How long the head block number and timestamp are trusted before re-reading
+HEAD_TTL = 1.0
+
+
+class _Entry:
+    """Value and purchase time are final once value > 0; redeemed is as of checked_block"""
+
+    __slots__ = ("value", "purchase_time", "redeemed", "checked_block")
+
+    def __init__(self, value, purchase_time, redeemed, checked_block):
+        self.value = value
+        self.purchase_time = purchase_time
+        self.redeemed = redeemed
+        self.checked_block = checked_block
+
+
+class CachedGiftCard:
+    """GiftCard view functions answered from a block-aware LRU cache"""
+
+    def __init__(self, w3, giftcard, max_entries=MAX_ENTRIES, head_ttl=HEAD_TTL):
+        self.w3 = w3
+        self.giftcard = giftcard
+        self.max_entries = max_entries
+        self.head_ttl = head_ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.head_number = None
+        self.head_timestamp = None
+        self.head_read_at = 0.0
+        self.events_from = None
+        self.purchased_topic = event_topic(giftcard, "GiftCardPurchased")
+        self.redeemed_topic = event_topic(giftcard, "GiftCardRedeemed")
+
+    def head(self):
+        """(block number, timestamp) of the chain head, re-read at most every head_ttl seconds"""
+        now = time.monotonic()
+        if self.head_number is None or now - self.head_read_at >= self.head_ttl:
+            block = self.w3.eth.get_block("latest")
+            self.head_number = block["number"]
+            self.head_timestamp = block["timestamp"]
+            self.head_read_at = now
+        return self.head_number, self.head_timestamp
+
+    def _entry(self, code_hash_, redeemed=False):
+        """The cached entry for a code hash; redeemed=True also brings the redeemed flag up to the head"""
+        key = bytes(code_hash_)
+        head_number, _ = self.head()
+        entry = self.entries.get(key)
+        # Bought cards keep their value and purchase time; missing codes are fresh for one block
+        if entry is not None and (entry.value or entry.checked_block >= head_number):
+            self.entries.move_to_end(key)
+            if redeemed and not entry.redeemed and entry.checked_block < head_number:
+                # Only the redeemed flag can have changed since it was read
+                self.misses += 1
+                entry.redeemed = self.giftcard.functions.isRedeemed(key).call(block_identifier=head_number)
+                entry.checked_block = head_number
+            else:
+                self.hits += 1
+            return entry
+
+        self.misses += 1
+        value, redeemed, _, purchase_time, _ = self.giftcard.functions.getGiftCardStatus(key).call(
+            block_identifier=head_number
+        )
+        entry = _Entry(value, purchase_time, redeemed, head_number)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def get_value(self, code_hash_):
+        return self._entry(code_hash_).value
+
+    def is_redeemed(self, code_hash_):
+        return self._entry(code_hash_, redeemed=True).redeemed
+
+    def get_purchase_time(self, code_hash_):
+        return self._entry(code_hash_).purchase_time
+
+    def get_expiration_time(self, code_hash_):
+        entry = self._entry(code_hash_)
+        return entry.purchase_time + EXPIRATION_PERIOD if entry.value else 0
+
+    def is_expired(self, code_hash_):
+        """Same rule as GiftCard.isExpired, evaluated against the head block's time"""
+        entry = self._entry(code_hash_)
+        if entry.value == 0:
+            return False
+        return self.head()[1] > entry.purchase_time + EXPIRATION_PERIOD
+
+    def get_status(self, code_hash_):
+        """All fields, shaped like getGiftCardStatus"""
+        entry = self._entry(code_hash_, redeemed=True)
+        expiration_time = entry.purchase_time + EXPIRATION_PERIOD if entry.value else 0
+        return {
+            "value": entry.value,
+            "redeemed": entry.redeemed,
+            "expired": bool(entry.value) and self.head()[1] > expiration_time,
+            "purchaseTime": entry.purchase_time,
+            "expirationTime": expiration_time,
+        }
+
+    def apply_log(self, log):
+        """Update cached entries from a GiftCardPurchased or GiftCardRedeemed log"""
+        key = bytes(log["topics"][1])
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        if log["topics"][0] == self.redeemed_topic:
+            entry.redeemed = True
+        elif log["topics"][0] == self.purchased_topic and entry.value == 0:
+            # A cached "does not exist" is stale: re-read on next access
+            del self.entries[key]
+
+    def poll_events(self):
+        """Apply GiftCard events mined since the last poll"""
+        head_number, _ = self.head()
+        if self.events_from is None:
+            self.events_from = head_number + 1
+            return 0
+        if head_number < self.events_from:
+            return 0
+        logs = self.w3.eth.get_logs({
+            "address": self.giftcard.address,
+            "fromBlock": self.events_from,
+            "toBlock": head_number,
+            "topics": [[self.purchased_topic, self.redeemed_topic]],
+        })
+        for log in logs:
+            self.apply_log(log)
+        self.events_from = head_number + 1
+        return len(logs)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
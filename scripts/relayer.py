@@ -0,0 +1,179 @@
+"""Relayer that batches redemptions into GiftCard.redeemBatch transactions.
+
+Incoming redemptions (code, recipient, recipient signature) are queued and
+flushed as one redeemBatch transaction when the queue reaches max_batch
+items or the oldest item has waited max_delay seconds. The relayer pays the
+gas; each recipient authorizes its own redemption by signing
+redemptionDigest(codeHash, recipient). Items the contract skips are
+reported with the reason from their RedemptionSkipped event.
+
+Usage (one JSON object with code, recipient and signature per line):
+    python scripts/relayer.py redemptions.jsonl --max-batch 100 --max-delay 5
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+
+from eth_account.messages import encode_defunct
+from web3 import Web3
+from web3.exceptions import ContractLogicError, TimeExhausted
+from web3.logs import DISCARD
+
+from giftcard_common import RPC_ERRORS, code_hash, connect, get_contract
+
+# Longest the background thread sleeps before re-checking for a stop request
+POLL_INTERVAL = 0.25
+
+
+def redemption_digest(contract_address, chain_id, code_hash_, recipient):
+    """Python mirror of GiftCard.redemptionDigest"""
+    return Web3.keccak(
+        bytes.fromhex(contract_address[2:]).rjust(32, b"\0")
+        + chain_id.to_bytes(32, "big")
+        + bytes(code_hash_)
+        + bytes.fromhex(recipient[2:]).rjust(32, b"\0")
+    )
+
+
+def sign_redemption(account, contract_address, chain_id, code):
+    """Signature a recipient gives the relayer to redeem code to itself"""
+    digest = redemption_digest(contract_address, chain_id, code_hash(code), account.address)
+    return account.sign_message(encode_defunct(primitive=digest)).signature
+
+
+class Redemption:
+    """A queued redemption and, once flushed, its outcome"""
+
+    def __init__(self, code, recipient, signature):
+        self.code = code
+        self.recipient = Web3.to_checksum_address(recipient)
+        self.signature = bytes(signature)
+        self.queued_at = time.monotonic()
+        self.redeemed = None
+        self.reason = None
+
+
+class RedemptionRelayer:
+    """Queue redemptions and flush them by size or deadline"""
+
+    def __init__(self, w3, giftcard, sender, max_batch=100, max_delay=5.0, on_result=None):
+        self.w3 = w3
+        self.giftcard = giftcard
+        self.sender = sender
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_result = on_result
+        self.queue = queue.Queue()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def submit(self, code, recipient, signature):
+        redemption = Redemption(code, recipient, signature)
+        self.queue.put(redemption)
+        return redemption
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Flush whatever is queued and stop the background thread"""
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        batch = []
+        while True:
+            timeout = self.max_delay - (time.monotonic() - batch[0].queued_at) if batch else self.max_delay
+            try:
+                batch.append(self.queue.get(timeout=min(max(0.0, timeout), POLL_INTERVAL)))
+            except queue.Empty:
+                pass
+            deadline_hit = batch and time.monotonic() - batch[0].queued_at >= self.max_delay
+            if len(batch) >= self.max_batch or deadline_hit or (self.stopping.is_set() and self.queue.empty()):
+                if batch:
+                    self._flush_or_fail(batch)
+                    batch = []
+                if self.stopping.is_set() and self.queue.empty():
+                    return
+
+    def _flush_or_fail(self, batch):
+        """flush, giving every unresolved item a failure if it raises, so the thread keeps running"""
+        try:
+            self.flush(batch)
+        except Exception as error:
+            for redemption in batch:
+                if redemption.redeemed is None:
+                    self._record(redemption, False, f"relayer error: {error!r}")
+
+    def flush(self, batch):
+        """Send one redeemBatch transaction for batch and record each outcome"""
+        codes = [r.code for r in batch]
+        recipients = [r.recipient for r in batch]
+        signatures = [r.signature for r in batch]
+        try:
+            tx_hash = self.giftcard.functions.redeemBatch(codes, recipients, signatures).transact({"from": self.sender})
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        except (ContractLogicError, TimeExhausted) + RPC_ERRORS as error:
+            for redemption in batch:
+                self._record(redemption, False, f"batch failed: {error}")
+            return
+
+        redeemed = {
+            (bytes(e["args"]["codeHash"]), e["args"]["redeemer"])
+            for e in self.giftcard.events.GiftCardRedeemed().process_receipt(receipt, errors=DISCARD)
+        }
+        skipped = {
+            (bytes(e["args"]["codeHash"]), e["args"]["recipient"]): e["args"]["reason"]
+            for e in self.giftcard.events.RedemptionSkipped().process_receipt(receipt, errors=DISCARD)
+        }
+        for redemption in batch:
+            key = (bytes(code_hash(redemption.code)), redemption.recipient)
+            if key in redeemed:
+                redeemed.discard(key)  # A repeated item in one batch is redeemed only once
+                self._record(redemption, True, None)
+            else:
+                self._record(redemption, False, skipped.get(key, "skipped"))
+
+    def _record(self, redemption, ok, reason):
+        redemption.redeemed = ok
+        redemption.reason = reason
+        if self.on_result:
+            self.on_result(redemption)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relay gift card redemptions in batches")
+    parser.add_argument("input", help="JSON lines of {code, recipient, signature}, '-' for stdin")
+    parser.add_argument("--max-batch", type=int, default=100, help="flush when this many redemptions are queued")
+    parser.add_argument("--max-delay", type=float, default=5.0, help="flush when the oldest redemption is this old")
+    parser.add_argument("--account", type=int, default=0, help="index into w3.eth.accounts that pays gas")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+
+    def report(redemption):
+        print(json.dumps({"code": redemption.code, "recipient": redemption.recipient,
+                          "redeemed": redemption.redeemed, "reason": redemption.reason}))
+
+    relayer = RedemptionRelayer(w3, get_contract(w3), w3.eth.accounts[args.account],
+                                args.max_batch, args.max_delay, on_result=report)
+    relayer.start()
+    f = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                relayer.submit(item["code"], item["recipient"], Web3.to_bytes(hexstr=item["signature"]))
+    finally:
+        relayer.stop()
+        if f is not sys.stdin:
+            f.close()
+
+
+if __name__ == "__main__":
+    main()
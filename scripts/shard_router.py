@@ -0,0 +1,177 @@
+"""Route GiftCard traffic across sharded deployments.
+
+``GIFTCARD_SHARDS=N npx hardhat run scripts/deploy.js`` deploys N GiftCard
+shards and writes a manifest listing each shard's address and RPC endpoint.
+Every code hash belongs to exactly one shard, picked from its leading 32
+bits: the hash space is cut into N equal contiguous ranges, and keccak
+spreads codes evenly across them. Single buys and redemptions go to their
+shard. Bulk issuance and status sweeps are partitioned per shard and run on
+all shards in parallel, one worker thread per shard, and then merged. Status
+records come back in input order, tagged with their shard.
+
+Usage:
+    python scripts/shard_router.py status codes.txt
+    python scripts/shard_router.py issue codes.txt --value 0.01
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+from bulk_issuer import BLOCK_FILL, IssueReport, issue_cards, read_cards
+from giftcard_client import GiftCardClient
+from giftcard_common import code_hash, connect, get_contract, load_abi
+from status_batch import iter_batches, iter_statuses, max_batch_size, read_code_hashes
+
+MANIFEST_PATH = os.environ.get(
+    "GIFTCARD_SHARD_MANIFEST",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shards.json"),
+)
+
+# Input rows partitioned per round of a bulk operation; bounds memory on
+# large files while keeping every shard busy
+ROUND_ROWS = 50_000
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load a shard manifest written by scripts/deploy.js"""
+    with open(path) as f:
+        manifest = json.load(f)
+    shards = sorted(manifest["shards"], key=lambda s: s["index"])
+    if not shards:
+        raise ValueError(f"{path} lists no shards")
+    if [s["index"] for s in shards] != list(range(len(shards))):
+        raise ValueError(f"{path} shard indexes are not 0..{len(shards) - 1}")
+    return shards
+
+
+def shard_index(code_hash_, shard_count):
+    """Shard owning a code hash: its leading 32 bits, scaled into shard_count ranges"""
+    return int.from_bytes(bytes(code_hash_)[:4], "big") * shard_count >> 32
+
+
+class ShardRouter:
+    """GiftCard operations fanned out over the shards of a manifest"""
+
+    def __init__(self, giftcards):
+        """giftcards: one contract object per shard, in shard index order"""
+        self.giftcards = list(giftcards)
+        self.clients = [GiftCardClient(giftcard.w3, giftcard) for giftcard in self.giftcards]
+        self.pool = ThreadPoolExecutor(max_workers=len(self.giftcards))
+
+    @classmethod
+    def from_manifest(cls, shards, abi=None):
+        """Connect to every shard listed in a manifest"""
+        abi = abi or load_abi()
+        return cls(get_contract(connect(shard["rpcUrl"]), shard["address"], abi=abi) for shard in shards)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __len__(self):
+        return len(self.giftcards)
+
+    def shard_for(self, code_hash_):
+        return shard_index(code_hash_, len(self.giftcards))
+
+    def partition(self, items, key=lambda item: item):
+        """Split items into one list per shard, keyed by each item's code hash"""
+        parts = [[] for _ in self.giftcards]
+        for item in items:
+            parts[self.shard_for(key(item))].append(item)
+        return parts
+
+    def _fan_out(self, work, parts):
+        """Run work(shard, part) for every non-empty part in parallel; return results by shard"""
+        futures = {
+            shard: self.pool.submit(work, shard, part) for shard, part in enumerate(parts) if part
+        }
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def buy(self, code, value, sender):
+        """Buy one gift card on its shard; return a Purchase"""
+        return self.clients[self.shard_for(code_hash(code))].buy(code, value, sender)
+
+    def redeem(self, code, sender):
+        """Redeem one gift card on its shard; return a Redemption"""
+        return self.clients[self.shard_for(code_hash(code))].redeem(code, sender)
+
+    def issue(self, cards, senders, fill=BLOCK_FILL, log=print):
+        """Issue a stream of (code hash, value) pairs, every shard in parallel; return a merged report
+
+        senders: one paying account per shard, in shard index order, since
+        shards on different networks have different node-managed accounts;
+        a single address is used on every shard.
+        """
+        if isinstance(senders, str):
+            senders = [senders] * len(self.giftcards)
+        if len(senders) != len(self.giftcards):
+            raise ValueError(f"{len(senders)} senders for {len(self.giftcards)} shards")
+        report = IssueReport()
+
+        def work(shard, part):
+            giftcard = self.giftcards[shard]
+            return issue_cards(giftcard.w3, giftcard, part, senders[shard], fill,
+                               log=lambda m: log(f"[shard {shard}] {m}"))
+
+        for chunk in iter_batches(cards, ROUND_ROWS):
+            for shard_report in self._fan_out(work, self.partition(chunk, key=lambda card: card[0])).values():
+                report.cards += shard_report.cards
+                report.skipped += shard_report.skipped
+                report.transactions += shard_report.transactions
+                report.gas_used += shard_report.gas_used
+        return report
+
+    def statuses(self, code_hashes, batch_size=None):
+        """Yield a status dict (with its "shard") for every code hash, in input order"""
+        batch_size = batch_size or max_batch_size()
+
+        def work(shard, part):
+            return list(iter_statuses(self.giftcards[shard], part, batch_size))
+
+        for chunk in iter_batches(code_hashes, ROUND_ROWS):
+            shards = [self.shard_for(h) for h in chunk]
+            parts = [[] for _ in self.giftcards]
+            for h, shard in zip(chunk, shards):
+                parts[shard].append(h)
+            results = {shard: iter(records) for shard, records in self._fan_out(work, parts).items()}
+            for shard in shards:
+                record = next(results[shard])
+                record["shard"] = shard
+                yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run GiftCard operations across a sharded deployment")
+    parser.add_argument("command", choices=("status", "issue"))
+    parser.add_argument("input", help="file with one code (or CODE,VALUE_ETH for issue) per line, '-' for stdin")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="shard manifest from scripts/deploy.js")
+    parser.add_argument("--hashes", action="store_true", help="status input lines are hex code hashes")
+    parser.add_argument("--value", default="0.001", help="default card value in ETH for issue")
+    parser.add_argument("--account", type=int, default=0, help="index into each shard node's accounts to pay from")
+    args = parser.parse_args(argv)
+
+    router = ShardRouter.from_manifest(load_manifest(args.manifest))
+    f = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        if args.command == "status":
+            per_shard = [0] * len(router)
+            for record in router.statuses(read_code_hashes(f, args.hashes)):
+                per_shard[record["shard"]] += 1
+                print(json.dumps(record))
+            print(json.dumps({"cardsPerShard": per_shard}), file=sys.stderr)
+        else:
+            senders = [giftcard.w3.eth.accounts[args.account] for giftcard in router.giftcards]
+            report = router.issue(read_cards(f, Web3.to_wei(args.value, "ether")), senders)
+            print(report.summary())
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        router.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,897 @@
+"""In-memory GiftCard JSON-RPC simulator for UI and web3 tests.
+
+A small JSON-RPC server that behaves like a hardhat node running only
+GiftCard contracts: every contract creation deploys a GiftCard whatever
+the bytecode, and calls to it are executed by a Python model of the
+contract (same checks, revert reasons, events and payouts). Transactions
+are mined instantly, one per block. Chain time follows the wall clock (or
+a frozen start time with ``--frozen``) plus whatever ``evm_increaseTime``
+and ``evm_setNextBlockTimestamp`` add, so expiry can be tested instantly.
+``evm_snapshot``/``evm_revert`` are supported for test isolation.
+
+The first deployment, from hardhat's account #0 at startup, lands at
+hardhat's usual first address (the default ``CONTRACT_ADDRESS``). The
+server also serves ``webpage/`` on GET, so the UI needs no other process.
+
+Differences from a real node: gas is an approximation (so receipts and
+balances stay consistent), state queries always see the latest state,
+raw transactions are checked for sender and nonce but not fee or chain id,
+and a transaction that would revert is rejected instead of being mined.
+
+Usage:
+    python scripts/simulator.py --port 8545
+    python scripts/simulator.py --port 8545 --frozen 1767225600
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from eth_account.typed_transactions import TypedTransaction
+from web3 import Web3
+
+from giftcard_common import EXPIRATION_PERIOD
+
+CHAIN_ID = 31337
+
+# Hardhat's default development accounts, each funded with 10000 ETH
+HARDHAT_MNEMONIC = "test test test test test test test test test test test junk"
+ACCOUNT_COUNT = 10
+INITIAL_BALANCE = 10_000 * 10 ** 18
+
+GAS_PRICE = 10 ** 9
+BLOCK_GAS_LIMIT = 30_000_000
+DEPLOY_GAS = 1_500_000
+
+MIN_VALUE = 10 ** 15
+UINT128_MAX = 2 ** 128 - 1
+ZERO_ADDRESS = "0x" + "00" * 20
+
+WEBPAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "webpage")
+
+STATUS = "(uint256,bool,bool,uint256,uint256)"
+
+# name -> (argument types, return types, payable)
+FUNCTIONS = {
+    "buy": (["bytes32"], [], True),
+    "buyBatch": (["bytes32[]", "uint256[]"], [], True),
+    "redeem": (["string"], [], False),
+    "redeemBatch": (["string[]", "address[]", "bytes[]"], ["bool[]"], False),
+    "sweepExpired": (["bytes32[]"], ["uint256", "uint256"], False),
+    "createCampaign": (["bytes32", "uint256"], ["uint256"], True),
+    "redeemWithProof": (["uint256", "uint256", "string", "uint256", "bytes32[]"], [], False),
+    "reclaimCampaign": (["uint256"], ["uint256"], False),
+    "getGiftCardValue": (["bytes32"], ["uint256"], False),
+    "isRedeemed": (["bytes32"], ["bool"], False),
+    "isExpired": (["bytes32"], ["bool"], False),
+    "isSwept": (["bytes32"], ["bool"], False),
+    "getPurchaseTime": (["bytes32"], ["uint256"], False),
+    "getExpirationTime": (["bytes32"], ["uint256"], False),
+    "getGiftCardStatus": (["bytes32"], [STATUS], False),
+    "getStatusBatch": (["bytes32[]"], [STATUS + "[]"], False),
+    "redemptionDigest": (["bytes32", "address"], ["bytes32"], False),
+    "isCampaignCardRedeemed": (["uint256", "uint256"], ["bool"], False),
+    "getCampaign": (["uint256"], ["bytes32", "uint256", "uint256", "address"], False),
+    "campaignCount": ([], ["uint256"], False),
+    "owner": ([], ["address"], False),
+    "MIN_VALUE": ([], ["uint256"], False),
+    "EXPIRATION_PERIOD": ([], ["uint256"], False),
+}
+
+SELECTORS = {
+    Web3.keccak(text=f"{name}({','.join(inputs)})")[:4]: name for name, (inputs, _, _) in FUNCTIONS.items()
+}
+
+# name -> (indexed argument types, data argument types)
+EVENTS = {
+    "GiftCardPurchased": (["bytes32"], ["uint256", "address", "uint256", "uint256"]),
+    "GiftCardRedeemed": (["bytes32"], ["uint256", "address", "uint256", "uint256"]),
+    "RedemptionSkipped": (["bytes32"], ["address", "string"]),
+    "CampaignCreated": (["uint256"], ["bytes32", "uint256", "uint256", "address"]),
+    "ExpiredSwept": ([], ["uint256", "uint256", "address"]),
+    "GiftCardSwept": (["bytes32"], ["uint256"]),
+    "CampaignReclaimed": (["uint256"], ["uint256", "address"]),
+}
+
+EVENT_TOPICS = {
+    name: Web3.keccak(text=f"{name}({','.join(indexed + data)})") for name, (indexed, data) in EVENTS.items()
+}
+
+# Card record: value, purchase time, redeemed, swept
+NO_CARD = (0, 0, False, False)
+
+
+class Revert(Exception):
+    """A call reverted, with the reason string a require() would give"""
+
+    def __init__(self, reason=""):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class RpcError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def revert_error(reason):
+    """JSON-RPC error for a revert, with Error(string) data like a real node"""
+    data = "0x"
+    if reason:
+        data = "0x08c379a0" + encode(["string"], [reason]).hex()
+    return RpcError(3, f"execution reverted: {reason}" if reason else "execution reverted", data)
+
+
+def to_hex(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return hex(value)
+
+
+def to_int(value):
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    return int(value, 16) if value.startswith("0x") else int(value)
+
+
+def to_bytes(value):
+    return bytes.fromhex(value[2:]) if value else b""
+
+
+def create_address(sender, nonce):
+    return Web3.to_checksum_address(Web3.keccak(rlp.encode([to_bytes(sender), nonce]))[12:])
+
+
+class CallContext:
+    """One call's view of contract storage, with writes journaled until commit"""
+
+    def __init__(self, contract, sender, value, timestamp):
+        self.contract = contract
+        self.sender = sender
+        self.value = value
+        self.timestamp = timestamp
+        self.writes = {}
+        self.reads = 0
+        self.logs = []
+        self.payouts = []
+
+    def get(self, key, default=None):
+        self.reads += 1
+        if key in self.writes:
+            return self.writes[key]
+        return self.contract.storage.get(key, default)
+
+    def set(self, key, value):
+        self.writes[key] = value
+
+    def card(self, code_hash_):
+        return self.get(("card", code_hash_), NO_CARD)
+
+    def emit(self, name, *args):
+        indexed_types, data_types = EVENTS[name]
+        indexed, data = args[:len(indexed_types)], args[len(indexed_types):]
+        topics = [EVENT_TOPICS[name]] + [encode([t], [a]) for t, a in zip(indexed_types, indexed)]
+        self.logs.append((self.contract.address, topics, encode(data_types, list(data))))
+
+    def pay(self, recipient, amount):
+        self.payouts.append((recipient, amount))
+
+    @property
+    def gas_used(self):
+        # Rough storage/log pricing so batch sizes and receipts stay plausible
+        return 21_000 + 22_100 * len(self.writes) + 2_100 * self.reads + 1_500 * len(self.logs)
+
+
+class GiftCardModel:
+    """Python model of one deployed GiftCard"""
+
+    def __init__(self, address, deployer):
+        self.address = address
+        self.deployer = deployer
+        self.storage = {}
+        self.balance = 0
+
+    def call(self, ctx, data):
+        """Run calldata against this contract; return the ABI-encoded output"""
+        name = SELECTORS.get(bytes(data[:4]))
+        if name is None:
+            raise Revert("Function not supported by the simulator")
+        inputs, outputs, payable = FUNCTIONS[name]
+        if ctx.value and not payable:
+            raise Revert()
+        try:
+            args = decode(inputs, bytes(data[4:]))
+        except Exception:
+            raise Revert()
+        result = getattr(self, name)(ctx, *args)
+        if not outputs:
+            return b""
+        return encode(outputs, list(result) if len(outputs) > 1 else [result])
+
+    def _expired(self, ctx, card):
+        return ctx.timestamp > card[1] + EXPIRATION_PERIOD
+
+    def _issue(self, ctx, code_hash_, value):
+        if value < MIN_VALUE:
+            raise Revert("Gift card value must be at least 0.001 ETH")
+        if value > UINT128_MAX:
+            raise Revert("Gift card value is too large")
+        if ctx.card(code_hash_)[0] != 0:
+            raise Revert("Gift card with this code already exists")
+        ctx.set(("card", code_hash_), (value, ctx.timestamp, False, False))
+        ctx.emit("GiftCardPurchased", code_hash_, value, ctx.sender, ctx.timestamp, ctx.timestamp + EXPIRATION_PERIOD)
+
+    def buy(self, ctx, code_hash_):
+        self._issue(ctx, code_hash_, ctx.value)
+
+    def buyBatch(self, ctx, code_hashes, values):
+        if len(code_hashes) != len(values):
+            raise Revert("Code hashes and values length mismatch")
+        if not code_hashes:
+            raise Revert("No gift cards to buy")
+        for code_hash_, value in zip(code_hashes, values):
+            self._issue(ctx, code_hash_, value)
+        if ctx.value != sum(values):
+            raise Revert("Sent value does not match the sum of gift card values")
+
+    def _redeem_failure(self, ctx, card):
+        if card[0] == 0:
+            return "Gift card does not exist"
+        if card[2]:
+            return "Gift card has already been redeemed"
+        if self._expired(ctx, card):
+            return "Gift card has expired"
+        return ""
+
+    def redeem(self, ctx, code):
+        code_hash_ = Web3.keccak(text=code)
+        card = ctx.card(code_hash_)
+        reason = self._redeem_failure(ctx, card)
+        if reason:
+            raise Revert(reason)
+        ctx.set(("card", code_hash_), (card[0], card[1], True, card[3]))
+        ctx.pay(ctx.sender, card[0])
+        ctx.emit("GiftCardRedeemed", code_hash_, card[0], ctx.sender, card[1], card[1] + EXPIRATION_PERIOD)
+
+    def redeemBatch(self, ctx, codes, recipients, signatures):
+        if not len(codes) == len(recipients) == len(signatures):
+            raise Revert("Codes, recipients and signatures length mismatch")
+        redeemed = []
+        for code, recipient, signature in zip(codes, recipients, signatures):
+            code_hash_ = Web3.keccak(text=code)
+            recipient = Web3.to_checksum_address(recipient)
+            card = ctx.card(code_hash_)
+            reason = self._redeem_failure(ctx, card)
+            if not reason and (int(recipient, 16) == 0 or self._signer(code_hash_, recipient, signature) != recipient):
+                reason = "Invalid recipient signature"
+            if reason:
+                ctx.emit("RedemptionSkipped", code_hash_, recipient, reason)
+                redeemed.append(False)
+                continue
+            ctx.set(("card", code_hash_), (card[0], card[1], True, card[3]))
+            ctx.pay(recipient, card[0])
+            ctx.emit("GiftCardRedeemed", code_hash_, card[0], recipient, card[1], card[1] + EXPIRATION_PERIOD)
+            redeemed.append(True)
+        return redeemed
+
+    def _signer(self, code_hash_, recipient, signature):
+        if len(signature) != 65:
+            return None
+        try:
+            return Account.recover_message(
+                encode_defunct(primitive=self.redemptionDigest(None, code_hash_, recipient)), signature=signature
+            )
+        except Exception:
+            return None
+
+    def sweepExpired(self, ctx, code_hashes):
+        if ctx.sender != self.deployer:
+            raise Revert("Only the owner can do this")
+        count = amount = 0
+        for code_hash_ in code_hashes:
+            card = ctx.card(code_hash_)
+            if card[0] == 0 or card[2] or card[3] or not self._expired(ctx, card):
+                continue
+            ctx.set(("card", code_hash_), (card[0], card[1], card[2], True))
+            amount += card[0]
+            count += 1
+            ctx.emit("GiftCardSwept", code_hash_, card[0])
+        if amount:
+            ctx.pay(self.deployer, amount)
+        ctx.emit("ExpiredSwept", count, amount, self.deployer)
+        return count, amount
+
+    def createCampaign(self, ctx, merkle_root, card_count):
+        if merkle_root == b"\0" * 32:
+            raise Revert("Merkle root must be set")
+        if ctx.value < MIN_VALUE:
+            raise Revert("Gift card value must be at least 0.001 ETH")
+        if ctx.value > UINT128_MAX:
+            raise Revert("Campaign funds are too large")
+        campaign_id = ctx.get(("campaignCount",), 0) + 1
+        ctx.set(("campaignCount",), campaign_id)
+        ctx.set(("campaign", campaign_id), (merkle_root, ctx.value, ctx.timestamp, ctx.sender))
+        ctx.emit("CampaignCreated", campaign_id, merkle_root, card_count, ctx.value, ctx.sender)
+        return campaign_id
+
+    def redeemWithProof(self, ctx, campaign_id, index, code, value, proof):
+        campaign = ctx.get(("campaign", campaign_id))
+        code_hash_ = Web3.keccak(text=code)
+        if campaign is None:
+            raise Revert("Campaign does not exist")
+        if ctx.get(("campaignRedeemed", campaign_id, index), False):
+            raise Revert("Gift card has already been redeemed")
+        root, balance, created_at, issuer = campaign
+        if ctx.timestamp > created_at + EXPIRATION_PERIOD:
+            raise Revert("Gift card has expired")
+        computed = Web3.keccak(encode(["uint256", "bytes32", "uint256"], [index, code_hash_, value]))
+        for sibling in proof:
+            computed = Web3.keccak(computed + sibling if computed < sibling else sibling + computed)
+        if computed != root:
+            raise Revert("Invalid Merkle proof")
+        if balance < value:
+            raise Revert("Campaign balance is too low")
+        ctx.set(("campaignRedeemed", campaign_id, index), True)
+        ctx.set(("campaign", campaign_id), (root, balance - value, created_at, issuer))
+        ctx.pay(ctx.sender, value)
+        ctx.emit("GiftCardRedeemed", code_hash_, value, ctx.sender, created_at, created_at + EXPIRATION_PERIOD)
+
+    def reclaimCampaign(self, ctx, campaign_id):
+        campaign = ctx.get(("campaign", campaign_id))
+        if campaign is None:
+            raise Revert("Campaign does not exist")
+        root, balance, created_at, issuer = campaign
+        if ctx.sender not in (issuer, self.deployer):
+            raise Revert("Only the issuer or owner can do this")
+        if ctx.timestamp <= created_at + EXPIRATION_PERIOD:
+            raise Revert("Campaign has not expired")
+        if balance == 0:
+            raise Revert("Campaign has no funds left")
+        ctx.set(("campaign", campaign_id), (root, 0, created_at, issuer))
+        ctx.pay(issuer, balance)
+        ctx.emit("CampaignReclaimed", campaign_id, balance, issuer)
+        return balance
+
+    def getGiftCardValue(self, ctx, code_hash_):
+        return ctx.card(code_hash_)[0]
+
+    def isRedeemed(self, ctx, code_hash_):
+        return ctx.card(code_hash_)[2]
+
+    def isSwept(self, ctx, code_hash_):
+        return ctx.card(code_hash_)[3]
+
+    def isExpired(self, ctx, code_hash_):
+        card = ctx.card(code_hash_)
+        return card[0] != 0 and self._expired(ctx, card)
+
+    def getPurchaseTime(self, ctx, code_hash_):
+        return ctx.card(code_hash_)[1]
+
+    def getExpirationTime(self, ctx, code_hash_):
+        card = ctx.card(code_hash_)
+        return card[1] + EXPIRATION_PERIOD if card[0] else 0
+
+    def getGiftCardStatus(self, ctx, code_hash_):
+        card = ctx.card(code_hash_)
+        if card[0] == 0:
+            return (0, False, False, 0, 0)
+        return (card[0], card[2], self._expired(ctx, card), card[1], card[1] + EXPIRATION_PERIOD)
+
+    def getStatusBatch(self, ctx, code_hashes):
+        return [self.getGiftCardStatus(ctx, h) for h in code_hashes]
+
+    def redemptionDigest(self, ctx, code_hash_, recipient):
+        return Web3.keccak(encode(["address", "uint256", "bytes32", "address"],
+                                  [self.address, CHAIN_ID, code_hash_, recipient]))
+
+    def isCampaignCardRedeemed(self, ctx, campaign_id, index):
+        return ctx.get(("campaignRedeemed", campaign_id, index), False)
+
+    def getCampaign(self, ctx, campaign_id):
+        return ctx.get(("campaign", campaign_id), (b"\0" * 32, 0, 0, ZERO_ADDRESS))
+
+    def campaignCount(self, ctx):
+        return ctx.get(("campaignCount",), 0)
+
+    def owner(self, ctx):
+        return self.deployer
+
+    def MIN_VALUE(self, ctx):
+        return MIN_VALUE
+
+    def EXPIRATION_PERIOD(self, ctx):
+        return EXPIRATION_PERIOD
+
+
+class ChainState:
+    """Everything evm_snapshot captures"""
+
+    def __init__(self):
+        self.balances = {}
+        self.nonces = {}
+        self.contracts = {}
+        self.blocks = []
+        self.transactions = {}
+        self.receipts = {}
+        self.time_offset = 0
+        self.next_timestamp = None
+
+
+class Simulator:
+    """JSON-RPC method handlers over an in-memory GiftCard chain"""
+
+    def __init__(self, frozen_at=None, accounts=ACCOUNT_COUNT):
+        self.frozen_at = frozen_at
+        self.lock = threading.RLock()
+        Account.enable_unaudited_hdwallet_features()
+        self.accounts = [
+            Account.from_mnemonic(HARDHAT_MNEMONIC, account_path=f"m/44'/60'/0'/0/{i}").address
+            for i in range(accounts)
+        ]
+        self.state = ChainState()
+        self.snapshots = {}
+        self.snapshot_ids = itertools.count(1)
+        for address in self.accounts:
+            self.state.balances[address] = INITIAL_BALANCE
+        self._mine()
+        # The usual first hardhat deployment: account #0, nonce 0
+        self._send({"from": self.accounts[0], "data": "0x"})
+
+    # --- chain mechanics ---
+
+    def clock(self):
+        base = self.frozen_at if self.frozen_at is not None else int(time.time())
+        return base + self.state.time_offset
+
+    def _pending_timestamp(self):
+        if self.state.next_timestamp is not None:
+            return self.state.next_timestamp
+        if not self.state.blocks:
+            return self.clock()
+        return max(self.state.blocks[-1]["timestamp"] + 1, self.clock())
+
+    def _mine(self, timestamp=None):
+        number = len(self.state.blocks)
+        if timestamp is None:
+            timestamp = self._pending_timestamp()
+        self.state.next_timestamp = None
+        parent = self.state.blocks[-1]["hash"] if self.state.blocks else b"\0" * 32
+        block = {
+            "number": number,
+            "hash": Web3.keccak(encode(["uint256", "uint256", "bytes32"], [number, timestamp, parent])),
+            "parentHash": parent,
+            "timestamp": timestamp,
+            "transactions": [],
+            "gasUsed": 0,
+        }
+        self.state.blocks.append(block)
+        return block
+
+    def _execute(self, tx, timestamp, commit):
+        """Run a transaction or call; return (output, gas used, logs, contract address)"""
+        sender = Web3.to_checksum_address(tx.get("from") or ZERO_ADDRESS)
+        value = to_int(tx.get("value"))
+        data = to_bytes(tx.get("data") or tx.get("input"))
+        to = tx.get("to")
+
+        if to is None:
+            address = create_address(sender, self.state.nonces.get(sender, 0))
+            if commit:
+                self.state.contracts[address] = GiftCardModel(address, sender)
+                self._transfer(sender, value, address)
+            return b"", DEPLOY_GAS + 16 * len(data), [], address
+
+        to = Web3.to_checksum_address(to)
+        contract = self.state.contracts.get(to)
+        if contract is None:
+            if commit:
+                self._transfer(sender, value, to)
+            return b"", 21_000, [], None
+
+        ctx = CallContext(contract, sender, value, timestamp)
+        try:
+            output = contract.call(ctx, data)
+        except Revert as e:
+            raise revert_error(e.reason)
+        if commit:
+            contract.storage.update(ctx.writes)
+            self._transfer(sender, value, to)
+            for recipient, amount in ctx.payouts:
+                contract.balance -= amount
+                self.state.balances[recipient] = self.state.balances.get(recipient, 0) + amount
+        return output, ctx.gas_used + 16 * len(data), ctx.logs, None
+
+    def _transfer(self, sender, value, to):
+        self.state.balances[sender] -= value
+        contract = self.state.contracts.get(to)
+        if contract is not None:
+            contract.balance += value
+        else:
+            self.state.balances[to] = self.state.balances.get(to, 0) + value
+
+    def _send(self, tx, raw=None):
+        sender = Web3.to_checksum_address(tx.get("from") or ZERO_ADDRESS)
+        if raw is None and sender not in self.accounts:
+            raise RpcError(-32000, f"Unknown account {sender}")
+        value = to_int(tx.get("value"))
+        timestamp = self._pending_timestamp()
+        # Dry run first so a reverting transaction leaves no trace
+        _, gas, _, _ = self._execute(tx, timestamp, commit=False)
+        if self.state.balances.get(sender, 0) < value + gas * GAS_PRICE:
+            raise RpcError(-32000, "insufficient funds for gas * price + value")
+
+        block = self._mine(timestamp)
+        _, gas, logs, contract_address = self._execute(tx, block["timestamp"], commit=True)
+        nonce = self.state.nonces.get(sender, 0)
+        self.state.nonces[sender] = nonce + 1
+        self.state.balances[sender] -= gas * GAS_PRICE
+
+        if raw is not None:
+            tx_hash = Web3.keccak(raw)
+        else:
+            tx_hash = Web3.keccak(encode(["address", "uint256", "uint256"], [sender, nonce, CHAIN_ID]))
+        to = Web3.to_checksum_address(tx["to"]) if tx.get("to") else None
+        self.state.transactions[tx_hash] = {
+            "hash": tx_hash,
+            "nonce": nonce,
+            "from": sender,
+            "to": to,
+            "value": value,
+            "gas": to_int(tx.get("gas")) or max(gas, 21_000),
+            "input": to_bytes(tx.get("data") or tx.get("input")),
+            "blockNumber": block["number"],
+            "blockHash": block["hash"],
+        }
+        self.state.receipts[tx_hash] = {
+            "from": sender,
+            "to": to,
+            "gasUsed": gas,
+            "contractAddress": contract_address,
+            "logs": logs,
+            "blockNumber": block["number"],
+            "blockHash": block["hash"],
+        }
+        block["transactions"].append(tx_hash)
+        block["gasUsed"] = gas
+        return tx_hash
+
+    def _block(self, tag):
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.state.blocks[-1]
+        if tag == "earliest":
+            return self.state.blocks[0]
+        number = to_int(tag)
+        return self.state.blocks[number] if number < len(self.state.blocks) else None
+
+    # --- JSON formatting ---
+
+    def _format_log(self, receipt, tx_hash, index, log):
+        address, topics, data = log
+        return {
+            "address": address,
+            "topics": [to_hex(t) for t in topics],
+            "data": to_hex(data),
+            "blockNumber": to_hex(receipt["blockNumber"]),
+            "blockHash": to_hex(receipt["blockHash"]),
+            "transactionHash": to_hex(tx_hash),
+            "transactionIndex": "0x0",
+            "logIndex": to_hex(index),
+            "removed": False,
+        }
+
+    def _format_tx(self, tx):
+        return {
+            "hash": to_hex(tx["hash"]),
+            "nonce": to_hex(tx["nonce"]),
+            "blockHash": to_hex(tx["blockHash"]),
+            "blockNumber": to_hex(tx["blockNumber"]),
+            "transactionIndex": "0x0",
+            "from": tx["from"],
+            "to": tx["to"],
+            "value": to_hex(tx["value"]),
+            "gas": to_hex(tx["gas"]),
+            "gasPrice": to_hex(GAS_PRICE),
+            "maxFeePerGas": to_hex(GAS_PRICE),
+            "maxPriorityFeePerGas": "0x0",
+            "input": to_hex(tx["input"]),
+            "type": "0x2",
+            "chainId": to_hex(CHAIN_ID),
+            "accessList": [],
+            "v": "0x0",
+            "r": "0x0",
+            "s": "0x0",
+        }
+
+    def _format_receipt(self, tx_hash, receipt):
+        return {
+            "transactionHash": to_hex(tx_hash),
+            "transactionIndex": "0x0",
+            "blockHash": to_hex(receipt["blockHash"]),
+            "blockNumber": to_hex(receipt["blockNumber"]),
+            "from": receipt["from"],
+            "to": receipt["to"],
+            "cumulativeGasUsed": to_hex(receipt["gasUsed"]),
+            "gasUsed": to_hex(receipt["gasUsed"]),
+            "effectiveGasPrice": to_hex(GAS_PRICE),
+            "contractAddress": receipt["contractAddress"],
+            "logs": [self._format_log(receipt, tx_hash, i, log) for i, log in enumerate(receipt["logs"])],
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "type": "0x2",
+        }
+
+    def _format_block(self, block, full):
+        return {
+            "number": to_hex(block["number"]),
+            "hash": to_hex(block["hash"]),
+            "parentHash": to_hex(block["parentHash"]),
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": "0x" + "00" * 32,
+            "logsBloom": "0x" + "00" * 256,
+            "transactionsRoot": "0x" + "00" * 32,
+            "stateRoot": "0x" + "00" * 32,
+            "receiptsRoot": "0x" + "00" * 32,
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "extraData": "0x",
+            "size": "0x0",
+            "gasLimit": to_hex(BLOCK_GAS_LIMIT),
+            "gasUsed": to_hex(block["gasUsed"]),
+            "baseFeePerGas": to_hex(GAS_PRICE),
+            "timestamp": to_hex(block["timestamp"]),
+            "transactions": [
+                self._format_tx(self.state.transactions[h]) if full else to_hex(h) for h in block["transactions"]
+            ],
+            "uncles": [],
+        }
+
+    # --- JSON-RPC methods ---
+
+    def handle(self, method, params):
+        handler = getattr(self, "rpc_" + method, None)
+        if handler is None:
+            raise RpcError(-32601, f"Method {method} is not supported by the simulator")
+        with self.lock:
+            return handler(*params)
+
+    def rpc_web3_clientVersion(self):
+        return "GiftCardSimulator/1.0"
+
+    def rpc_net_version(self):
+        return str(CHAIN_ID)
+
+    def rpc_eth_chainId(self):
+        return to_hex(CHAIN_ID)
+
+    def rpc_eth_accounts(self):
+        return list(self.accounts)
+
+    rpc_eth_requestAccounts = rpc_eth_accounts
+
+    def rpc_eth_blockNumber(self):
+        return to_hex(len(self.state.blocks) - 1)
+
+    def rpc_eth_gasPrice(self):
+        return to_hex(GAS_PRICE)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return "0x0"
+
+    def rpc_eth_getBalance(self, address, block="latest"):
+        address = Web3.to_checksum_address(address)
+        contract = self.state.contracts.get(address)
+        return to_hex(contract.balance if contract else self.state.balances.get(address, 0))
+
+    def rpc_eth_getTransactionCount(self, address, block="latest"):
+        return to_hex(self.state.nonces.get(Web3.to_checksum_address(address), 0))
+
+    def rpc_eth_getCode(self, address, block="latest"):
+        # Any non-empty code marks a deployed contract
+        return "0x60806040" if Web3.to_checksum_address(address) in self.state.contracts else "0x"
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        block = self._block(tag)
+        return self._format_block(block, full) if block else None
+
+    def rpc_eth_getBlockByHash(self, block_hash, full=False):
+        wanted = to_bytes(block_hash)
+        for block in self.state.blocks:
+            if block["hash"] == wanted:
+                return self._format_block(block, full)
+        return None
+
+    def rpc_eth_call(self, tx, block="latest"):
+        if block == "pending":
+            timestamp = self._pending_timestamp()
+        else:
+            timestamp = (self._block(block) or self.state.blocks[-1])["timestamp"]
+        output, _, _, _ = self._execute(tx, timestamp, commit=False)
+        return to_hex(output)
+
+    def rpc_eth_estimateGas(self, tx, block="pending"):
+        _, gas, _, _ = self._execute(tx, self._pending_timestamp(), commit=False)
+        return to_hex(gas)
+
+    def rpc_eth_sendTransaction(self, tx):
+        return to_hex(self._send(tx))
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        raw = to_bytes(raw)
+        try:
+            sender = Account.recover_transaction(raw)
+            if raw[0] >= 0xc0:
+                nonce, _, gas, to, value, data = (bytes(f) for f in rlp.decode(raw)[:6])
+                nonce, gas, value = (int.from_bytes(f, "big") for f in (nonce, gas, value))
+            else:
+                fields = TypedTransaction.from_bytes(raw).as_dict()
+                nonce, gas, to, value, data = (fields[k] for k in ("nonce", "gas", "to", "value", "data"))
+        except Exception as e:
+            raise RpcError(-32602, f"Invalid raw transaction: {e}")
+        expected = self.state.nonces.get(sender, 0)
+        if nonce != expected:
+            raise RpcError(-32000, f"Nonce too {'low' if nonce < expected else 'high'}. Expected nonce to be {expected} but got {nonce}.")
+        tx = {"from": sender, "to": to_hex(to) if to else None, "value": value, "gas": gas, "data": to_hex(data)}
+        return to_hex(self._send(tx, raw))
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        tx = self.state.transactions.get(to_bytes(tx_hash))
+        return self._format_tx(tx) if tx else None
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        key = to_bytes(tx_hash)
+        receipt = self.state.receipts.get(key)
+        return self._format_receipt(key, receipt) if receipt else None
+
+    def rpc_eth_getBlockReceipts(self, tag):
+        block = self._block(tag)
+        if block is None:
+            return None
+        return [self._format_receipt(h, self.state.receipts[h]) for h in block["transactions"]]
+
+    def rpc_eth_getLogs(self, query):
+        from_block = self._block(query.get("fromBlock", "latest"))["number"]
+        to_block = self._block(query.get("toBlock", "latest"))["number"]
+        addresses = query.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {Web3.to_checksum_address(a) for a in addresses} if addresses else None
+        topic_filters = [
+            None if t is None else {to_bytes(x) for x in ([t] if isinstance(t, str) else t)}
+            for t in query.get("topics") or []
+        ]
+        logs = []
+        for block in self.state.blocks[from_block:to_block + 1]:
+            for tx_hash in block["transactions"]:
+                receipt = self.state.receipts[tx_hash]
+                for index, log in enumerate(receipt["logs"]):
+                    address, topics, _ = log
+                    if addresses is not None and address not in addresses:
+                        continue
+                    if any(wanted is not None and (i >= len(topics) or topics[i] not in wanted)
+                           for i, wanted in enumerate(topic_filters)):
+                        continue
+                    logs.append(self._format_log(receipt, tx_hash, index, log))
+        return logs
+
+    def rpc_evm_snapshot(self):
+        snapshot_id = next(self.snapshot_ids)
+        self.snapshots[snapshot_id] = copy.deepcopy(self.state)
+        return to_hex(snapshot_id)
+
+    def rpc_evm_revert(self, snapshot_id):
+        state = self.snapshots.pop(to_int(snapshot_id), None)
+        if state is None:
+            return False
+        self.state = state
+        return True
+
+    def rpc_evm_increaseTime(self, seconds):
+        self.state.time_offset += to_int(seconds)
+        return self.state.time_offset
+
+    def rpc_evm_setNextBlockTimestamp(self, timestamp):
+        timestamp = to_int(timestamp)
+        self.state.next_timestamp = timestamp
+        # Later blocks continue from the new time, as on hardhat
+        self.state.time_offset += timestamp - self.clock()
+        return None
+
+    def rpc_evm_mine(self, timestamp=None):
+        if timestamp is not None:
+            self.rpc_evm_setNextBlockTimestamp(timestamp)
+        self._mine()
+        return "0x0"
+
+
+class SimulatorHandler(SimpleHTTPRequestHandler):
+    """JSON-RPC on POST, the web page on GET"""
+
+    simulator = None
+
+    def end_headers(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        super().end_headers()
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if isinstance(body, list):
+            response = [self._respond(request) for request in body]
+        else:
+            response = self._respond(body)
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _respond(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self.simulator.handle(request["method"], request.get("params") or [])
+        except RpcError as e:
+            response["error"] = {"code": e.code, "message": e.message}
+            if e.data is not None:
+                response["error"]["data"] = e.data
+        except Exception as e:
+            response["error"] = {"code": -32603, "message": f"{type(e).__name__}: {e}"}
+        return response
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host="127.0.0.1", port=0, frozen_at=None, webpage_dir=WEBPAGE_DIR):
+    """Start a simulator server on a background thread; return (server, url)"""
+    simulator = Simulator(frozen_at=frozen_at)
+    handler = type("Handler", (SimulatorHandler,), {"simulator": simulator})
+    server = ThreadingHTTPServer((host, port), partial(handler, directory=webpage_dir))
+    server.simulator = simulator
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an in-memory GiftCard JSON-RPC simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--frozen", type=int, metavar="TIMESTAMP",
+                        help="start chain time here and move it only with evm_increaseTime/evm_setNextBlockTimestamp")
+    args = parser.parse_args(argv)
+
+    server, url = start_server(args.host, args.port, args.frozen)
+    simulator = server.simulator
+    print(f"GiftCard simulator listening on {url} (chain id {CHAIN_ID}, web page at {url}/)")
+    print(f"GiftCard deployed at {simulator.state.receipts[simulator.state.blocks[1]['transactions'][0]]['contractAddress']}")
+    for address in simulator.accounts:
+        print(f"  {address} (10000 ETH)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
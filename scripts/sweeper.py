@@ -0,0 +1,122 @@
+"""Reclaim the funds of expired, unredeemed gift cards with GiftCard.sweepExpired.
+
+Candidates come from the event history in an indexer database (synced
+first): cards never redeemed or swept whose expiration time has passed on
+chain. They are packed into sweepExpired batches sized to stay under the
+block gas limit, with the per-card gas refined from receipts as batches
+land. Each batch is simulated first and only sent if it would reclaim
+something, since candidates swept after the last sync are skipped by the
+contract. The report gives ETH recovered per unit of gas.
+
+Usage (the account must be the contract owner, i.e. its deployer):
+    python scripts/sweeper.py giftcard.db --account 0
+"""
+import argparse
+import math
+import time
+
+from web3 import Web3
+
+from bulk_issuer import BLOCK_FILL, chunk_size
+from chain_time import ChainClock
+from giftcard_common import EXPIRATION_PERIOD, connect, get_contract
+from indexer import GiftCardIndexer
+from status_batch import iter_batches
+
+# Starting guess for the gas one card adds to a sweepExpired transaction
+# (cold storage read and write plus calldata), refined from receipts
+GAS_PER_SWEEP_ESTIMATE = 10_000
+
+
+def find_candidates(indexer, now):
+    """Yield code hashes of indexed cards that are unredeemed, unswept and expired at chain time now"""
+    rows = indexer.db.execute(
+        "SELECT code_hash FROM cards WHERE redeemed = 0 AND swept = 0 AND purchase_time < ? ORDER BY purchase_time",
+        (now - EXPIRATION_PERIOD,),
+    )
+    for (h,) in rows:
+        yield bytes(h)
+
+
+class SweepReport:
+    """Running totals for a sweep"""
+
+    def __init__(self):
+        self.candidates = 0
+        self.cards = 0
+        self.amount = 0
+        self.transactions = 0
+        self.gas_used = 0
+        self.started = time.perf_counter()
+
+    @property
+    def wei_per_gas(self):
+        return self.amount / self.gas_used if self.gas_used else 0.0
+
+    def summary(self):
+        return (
+            f"Swept {self.cards} of {self.candidates} candidate cards in {self.transactions} transactions: "
+            f"{Web3.from_wei(self.amount, 'ether')} ETH for {self.gas_used} gas "
+            f"({Web3.from_wei(int(self.wei_per_gas), 'gwei')} gwei recovered per gas) "
+            f"in {time.perf_counter() - self.started:.1f}s"
+        )
+
+
+def sweep(w3, giftcard, candidates, owner, fill=BLOCK_FILL, log=print):
+    """Send sweepExpired for a stream of candidate code hashes"""
+    report = SweepReport()
+    block_gas_limit = w3.eth.get_block("latest")["gasLimit"]
+    gas_per_card = GAS_PER_SWEEP_ESTIMATE
+
+    pending = iter(candidates)
+    while True:
+        size = chunk_size(block_gas_limit, gas_per_card, fill)
+        batch = next(iter_batches(pending, size), None)
+        if batch is None:
+            break
+        report.candidates += len(batch)
+
+        count, _ = giftcard.functions.sweepExpired(batch).call({"from": owner})
+        if count == 0:
+            continue
+
+        tx_hash = giftcard.functions.sweepExpired(batch).transact({"from": owner})
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt["status"] != 1:
+            raise RuntimeError(f"sweepExpired transaction {tx_hash.hex()} reverted")
+        event = giftcard.events.ExpiredSwept().process_receipt(receipt)[0]
+
+        report.cards += event["args"]["cardCount"]
+        report.amount += event["args"]["amount"]
+        report.transactions += 1
+        report.gas_used += receipt["gasUsed"]
+        # Whole cost per card, overhead included, as in bulk_issuer: the next
+        # batch must not overshoot the budget when the real overhead is smaller
+        gas_per_card = max(1, math.ceil(receipt["gasUsed"] / len(batch)))
+        log(f"Swept {event['args']['cardCount']} cards ({Web3.from_wei(event['args']['amount'], 'ether')} ETH) "
+            f"in block {receipt['blockNumber']}: {receipt['gasUsed']} gas")
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reclaim expired gift card funds with sweepExpired")
+    parser.add_argument("db", help="indexer SQLite database (synced before sweeping)")
+    parser.add_argument("--account", type=int, default=0, help="index into w3.eth.accounts of the contract owner")
+    parser.add_argument("--fill", type=float, default=BLOCK_FILL, help="fraction of the block gas limit per batch")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    giftcard = get_contract(w3)
+    indexer = GiftCardIndexer(w3, giftcard, args.db)
+    try:
+        indexer.sync(log=print)
+        candidates = find_candidates(indexer, ChainClock(w3).now())
+        report = sweep(w3, giftcard, candidates, w3.eth.accounts[args.account], args.fill)
+    finally:
+        indexer.close()
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Pipelined transaction submitter with a local nonce manager.
+
+Signs transactions locally, hands out nonces per sender from an in-process
+counter, keeps up to N transactions in flight and resolves their receipts
+in bulk as new blocks arrive, instead of waiting for each receipt before
+sending the next transaction. Transactions that disappear from the node
+are rebroadcast, and ones whose nonce was taken by another transaction are
+reported as replaced. A nonce whose transaction never reached the node is
+handed out again, or filled with a zero-value self-transfer when the
+pipeline drains, so later transactions from the same sender never wait
+behind a gap.
+
+Benchmark against a local hardhat node (serial transact-and-wait loop
+versus the pipelined submitter):
+    python scripts/tx_submitter.py --bench 500
+"""
+import argparse
+import os
+import threading
+import time
+
+from eth_account import Account
+from web3.exceptions import TransactionNotFound
+
+from giftcard_common import RPC_ERRORS, code_hash, connect, get_contract
+
+# Hardhat's well-known development keys for accounts #0 and #1
+HARDHAT_PRIVATE_KEYS = (
+    "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80",
+    "0x59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d",
+)
+
+# Gas limit used for buy() when the caller does not set one
+BUY_GAS = 100_000
+
+# Gas for the zero-value self-transfer that fills a nonce gap
+GAP_FILL_GAS = 21_000
+
+# Send failures: node rejections, plus transport errors and timeouts
+# (requests' exceptions are OSErrors), after which the node may or may not
+# have the transaction
+SEND_ERRORS = (*RPC_ERRORS, OSError)
+
+# Default seconds wait_all polls before giving up on in-flight transactions
+WAIT_TIMEOUT = 600
+
+
+def load_accounts(private_keys=None):
+    """Local signing accounts from GIFTCARD_PRIVATE_KEYS or hardhat's defaults"""
+    if private_keys is None:
+        env = os.environ.get("GIFTCARD_PRIVATE_KEYS")
+        private_keys = env.split(",") if env else HARDHAT_PRIVATE_KEYS
+    return [Account.from_key(key.strip()) for key in private_keys]
+
+
+class NonceManager:
+    """Hand out consecutive nonces per sender without asking the node each time"""
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self.lock = threading.Lock()
+        self.next_nonce = {}
+        self.released = {}  # address -> nonces below next_nonce that are free again
+
+    def allocate(self, address):
+        """The lowest released nonce, else the next one from the counter"""
+        with self.lock:
+            released = self.released.get(address)
+            if released:
+                nonce = min(released)
+                released.remove(nonce)
+                return nonce
+            if address not in self.next_nonce:
+                self.next_nonce[address] = self.w3.eth.get_transaction_count(address, "pending")
+            nonce = self.next_nonce[address]
+            self.next_nonce[address] = nonce + 1
+            return nonce
+
+    def release(self, address, nonce):
+        """Return an allocated nonce whose transaction never reached the node"""
+        with self.lock:
+            released = self.released.setdefault(address, set())
+            released.add(nonce)
+            # Free nonces at the top go back to the counter; only gaps stay released
+            while self.next_nonce.get(address) is not None and self.next_nonce[address] - 1 in released:
+                self.next_nonce[address] -= 1
+                released.remove(self.next_nonce[address])
+
+    def take_released(self, address):
+        """Remove and return the released nonces (gaps) for address, lowest first"""
+        with self.lock:
+            return sorted(self.released.pop(address, ()))
+
+    def resync(self, address):
+        """Forget the local counter so the next allocation re-reads the node"""
+        with self.lock:
+            self.next_nonce.pop(address, None)
+            self.released.pop(address, None)
+
+
+class PendingTx:
+    """A signed transaction and, once resolved, its receipt or error"""
+
+    def __init__(self, tag, sender, nonce, tx_hash, raw, sent_at, gap_filler=False):
+        self.tag = tag
+        self.sender = sender
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        self.raw = raw
+        self.sent_at = sent_at
+        self.last_checked = sent_at
+        self.mined_at = None
+        self.receipt = None
+        self.error = None
+        self.gap_filler = gap_filler  # Internal no-op; never reported to on_signed or on_done
+
+    @property
+    def ok(self):
+        return self.receipt is not None and self.receipt["status"] == 1
+
+    @property
+    def latency(self):
+        return None if self.mined_at is None else self.mined_at - self.sent_at
+
+
+class PipelinedSubmitter:
+    """Keep up to max_in_flight signed transactions pending at once"""
+
+    def __init__(self, w3, max_in_flight=64, poll_interval=0.05, resubmit_after=30.0, on_done=None, on_signed=None):
+        """on_signed(pending) runs once the hash is known but before broadcast; on_done(pending) once resolved"""
+        self.w3 = w3
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.resubmit_after = resubmit_after
+        self.on_done = on_done
+        self.on_signed = on_signed
+        self.nonces = NonceManager(w3)
+        self.accounts = {}  # address -> local account, to sign gap fillers
+        self.pending = {}
+        self.chain_id = w3.eth.chain_id
+        self.gas_price = w3.eth.gas_price
+        self.last_block = w3.eth.block_number
+
+    def submit(self, account, tx, tag=None):
+        """Sign and send tx from a local account, blocking only while the pipeline is full"""
+        while len(self.pending) >= self.max_in_flight:
+            if not self.poll():
+                time.sleep(self.poll_interval)
+
+        tx = dict(tx)
+        tx.setdefault("chainId", self.chain_id)
+        tx.setdefault("gasPrice", self.gas_price)
+        if "gas" not in tx:
+            tx["gas"] = self.w3.eth.estimate_gas({**tx, "from": account.address})
+        tx["nonce"] = self.nonces.allocate(account.address)
+        self.accounts[account.address] = account
+        return self._send(account, tx, tag)
+
+    def _send(self, account, tx, tag, gap_filler=False):
+        signed = account.sign_transaction(tx)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+
+        pending = PendingTx(tag, account.address, tx["nonce"], signed.hash, raw, time.perf_counter(), gap_filler)
+        if self.on_signed and not gap_filler:
+            self.on_signed(pending)
+        try:
+            self.w3.eth.send_raw_transaction(raw)
+        except SEND_ERRORS as error:
+            # A timeout can follow a successful send, and some nodes (hardhat
+            # automine) still mine a reverting transaction they report as
+            # failed: if the node has it, its receipt settles it as usual
+            try:
+                self.w3.eth.get_transaction(pending.tx_hash)
+            except TransactionNotFound:
+                if self.w3.eth.get_transaction_count(account.address, "latest") > pending.nonce:
+                    # Nonce used by a transaction sent elsewhere: re-read the counter
+                    self.nonces.resync(account.address)
+                else:
+                    # Hand the nonce out again so later transactions are not stuck behind it
+                    self.nonces.release(account.address, pending.nonce)
+                pending.error = error
+                self._done(pending)
+                return pending
+        self.pending[bytes(pending.tx_hash)] = pending
+        return pending
+
+    def _fill_gaps(self):
+        """Send a zero-value self-transfer at every released nonce, unblocking later transactions"""
+        for address, account in self.accounts.items():
+            for nonce in self.nonces.take_released(address):
+                tx = {
+                    "to": address,
+                    "value": 0,
+                    "gas": GAP_FILL_GAS,
+                    "gasPrice": self.gas_price,
+                    "chainId": self.chain_id,
+                    "nonce": nonce,
+                }
+                self._send(account, tx, None, gap_filler=True)
+
+    def poll(self):
+        """Resolve receipts for every block mined since the last poll"""
+        head = self.w3.eth.block_number
+        resolved = []
+        for number in range(self.last_block + 1, head + 1):
+            resolved.extend(self._resolve_block(number))
+        if head > self.last_block:
+            self.last_block = head
+            self.gas_price = self.w3.eth.gas_price
+        self._recover_stuck()
+        return resolved
+
+    def wait_all(self, timeout=WAIT_TIMEOUT):
+        """Fill nonce gaps and poll until every in-flight transaction is resolved (timeout=None waits forever)"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        self._fill_gaps()
+        while self.pending:
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError(f"{len(self.pending)} transactions still pending")
+            self._fill_gaps()
+            if not self.poll():
+                time.sleep(self.poll_interval)
+
+    def _resolve_block(self, number):
+        block = self.w3.eth.get_block(number)
+        mined = [bytes(h) for h in block["transactions"] if bytes(h) in self.pending]
+        if not mined:
+            return []
+        now = time.perf_counter()
+        receipts = self._block_receipts(number, mined)
+        resolved = []
+        for tx_hash in mined:
+            pending = self.pending.pop(tx_hash)
+            pending.receipt = receipts[tx_hash]
+            pending.mined_at = now
+            self._done(pending)
+            resolved.append(pending)
+        return resolved
+
+    def _block_receipts(self, number, tx_hashes):
+        if hasattr(self.w3.eth, "get_block_receipts"):
+            try:
+                return {bytes(r["transactionHash"]): r for r in self.w3.eth.get_block_receipts(number)}
+            except RPC_ERRORS:
+                pass  # Node without eth_getBlockReceipts: fetch one at a time
+        return {h: self.w3.eth.get_transaction_receipt(h) for h in tx_hashes}
+
+    def _recover_stuck(self):
+        now = time.perf_counter()
+        for tx_hash, pending in list(self.pending.items()):
+            if now - pending.last_checked < self.resubmit_after:
+                continue
+            if self.w3.eth.get_transaction_count(pending.sender, "latest") > pending.nonce:
+                # Our nonce was mined, but not with our hash, or the receipt
+                # would have been found: another transaction replaced it
+                try:
+                    pending.receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+                    pending.mined_at = now
+                except TransactionNotFound:
+                    pending.error = RuntimeError(f"nonce {pending.nonce} was used by a replacement transaction")
+                del self.pending[tx_hash]
+                self._done(pending)
+                continue
+            try:
+                self.w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                # Dropped from the node's pool: broadcast the same signed bytes again
+                try:
+                    self.w3.eth.send_raw_transaction(pending.raw)
+                except RPC_ERRORS:
+                    pass  # Already known again, or replaced; settled on a later poll
+            pending.last_checked = now
+
+    def _done(self, pending):
+        if self.on_done and not pending.gap_filler:
+            self.on_done(pending)
+
+
+def serial_buys(w3, giftcard, sender, count, value):
+    """The transact-then-wait loop used in tests/giftcard_test.py"""
+    for i in range(count):
+        tx_hash = giftcard.functions.buy(code_hash(f"SERIAL_{time.time_ns()}_{i}")).transact(
+            {"from": sender, "value": value}
+        )
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def pipelined_buys(w3, giftcard, accounts, count, value, max_in_flight):
+    submitter = PipelinedSubmitter(w3, max_in_flight=max_in_flight)
+    for i in range(count):
+        account = accounts[i % len(accounts)]
+        tx = giftcard.functions.buy(code_hash(f"PIPELINED_{time.time_ns()}_{i}")).build_transaction(
+            {
+                "from": account.address,
+                "value": value,
+                "gas": BUY_GAS,
+                "gasPrice": submitter.gas_price,
+                "chainId": submitter.chain_id,
+            }
+        )
+        tx.pop("from")
+        submitter.submit(account, tx)
+    submitter.wait_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serial versus pipelined transaction submission")
+    parser.add_argument("--bench", type=int, default=200, help="number of buy transactions per mode")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="pipeline depth")
+    args = parser.parse_args(argv)
+
+    w3 = connect()
+    giftcard = get_contract(w3)
+    accounts = load_accounts()
+    value = w3.to_wei(0.001, "ether")
+
+    started = time.perf_counter()
+    serial_buys(w3, giftcard, w3.eth.accounts[0], args.bench, value)
+    serial = args.bench / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    pipelined_buys(w3, giftcard, accounts, args.bench, value, args.max_in_flight)
+    pipelined = args.bench / (time.perf_counter() - started)
+
+    print(f"Serial:    {serial:.1f} tx/sec")
+    print(f"Pipelined: {pipelined:.1f} tx/sec ({pipelined / serial:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
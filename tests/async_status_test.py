@@ -0,0 +1,82 @@
+import asyncio
+
+from async_status import check_statuses
+
+STATUS = (10**15, False, False, 1_700_000_000, 1_702_592_000)
+
+
+class FakeCall:
+    def __init__(self, contract, hashes, batched):
+        self.contract = contract
+        self.hashes = hashes
+        self.batched = batched
+
+    async def call(self):
+        contract = self.contract
+        contract.calls.append(len(self.hashes))
+        contract.in_flight += 1
+        contract.peak = max(contract.peak, contract.in_flight)
+        try:
+            await asyncio.sleep(0.005)
+            if any(h in contract.failing for h in self.hashes):
+                raise asyncio.TimeoutError
+        finally:
+            contract.in_flight -= 1
+        return [STATUS] * len(self.hashes) if self.batched else STATUS
+
+
+class FakeGiftCard:
+    """Stands in for an async GiftCard contract: counts calls and fails for chosen code hashes"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.functions = self
+
+    def getGiftCardStatus(self, code_hash_):
+        return FakeCall(self, [code_hash_], batched=False)
+
+    def getStatusBatch(self, code_hashes):
+        return FakeCall(self, list(code_hashes), batched=True)
+
+
+def collect(giftcard, code_hashes, **kwargs):
+    async def gather():
+        return [record async for record in check_statuses(giftcard, iter(code_hashes), backoff=0, **kwargs)]
+    return asyncio.run(gather())
+
+
+def hashes(count):
+    return [i.to_bytes(32, "big") for i in range(count)]
+
+
+def test_check_statuses_bounds_calls_in_flight():
+    """Test no more than `concurrency` calls run at once and every card gets a record"""
+    giftcard = FakeGiftCard()
+    records = collect(giftcard, hashes(50), concurrency=4)
+    assert giftcard.peak == 4
+    assert sorted(r["codeHash"] for r in records) == ["0x" + h.hex() for h in hashes(50)]
+    assert all(r["value"] == STATUS[0] for r in records)
+
+
+def test_check_statuses_retries_then_records_error():
+    """Test a failing call is retried, then its cards come back with an error field"""
+    failing = hashes(5)[2]
+    giftcard = FakeGiftCard(failing=[failing])
+    records = collect(giftcard, hashes(5), concurrency=2, retries=2)
+    assert len(giftcard.calls) == 4 + 3
+    errors = [r for r in records if "error" in r]
+    assert [r["codeHash"] for r in errors] == ["0x" + failing.hex()]
+    assert "TimeoutError" in errors[0]["error"]
+    assert len(records) == 5
+
+
+def test_check_statuses_groups_cards_into_batches():
+    """Test batch_size > 1 sends getStatusBatch calls and a failed batch marks each of its cards"""
+    giftcard = FakeGiftCard(failing=[hashes(10)[9]])
+    records = collect(giftcard, hashes(10), concurrency=2, batch_size=4, retries=0)
+    assert sorted(giftcard.calls) == [2, 4, 4]
+    assert len(records) == 10
+    assert sum("error" in r for r in records) == 2
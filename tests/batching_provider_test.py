@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from batching_provider import BatchingHTTPProvider
+
+
+class StubNode(BaseHTTPRequestHandler):
+    """JSON-RPC endpoint that echoes each request's params as its result
+
+    server.mode picks a broken answer instead: a batch-level error object,
+    HTTP 500, a body that is not JSON, or a response without ids.
+    """
+
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.batches.append(len(batch))
+        mode = self.server.mode
+        if mode == "http_500":
+            self.send_response(500)
+            self.end_headers()
+            return
+        if mode == "error_object":
+            body = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}}
+        elif mode == "missing_id":
+            body = [{"jsonrpc": "2.0", "result": r["params"]} for r in batch]
+        else:
+            body = [{"jsonrpc": "2.0", "id": r["id"], "result": r["params"]} for r in reversed(batch)]
+        data = b"not json" if mode == "not_json" else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def node():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubNode)
+    server.batches = []
+    server.mode = "echo"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_concurrent_requests_share_batches(node):
+    """Test concurrent calls are sent as batches and each caller gets its own response"""
+    provider = BatchingHTTPProvider(url(node), window=0.05)
+    # Encoding outside make_request must not shift how responses are matched
+    provider.encode_rpc_request("eth_chainId", [])
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        responses = list(pool.map(lambda i: provider.make_request("eth_call", [i]), range(20)))
+    assert [r["result"] for r in responses] == [[i] for i in range(20)]
+    assert sum(node.batches) == 20
+    assert len(node.batches) < 20
+    assert provider.stats.requests == 20
+    assert provider.stats.round_trips_saved == 20 - len(node.batches)
+
+
+@pytest.mark.parametrize("mode", ["error_object", "http_500", "not_json", "missing_id"])
+def test_broken_batch_fails_every_waiter(node, mode):
+    """Test every caller in a batch fails promptly when the batch response is unusable"""
+    node.mode = mode
+    provider = BatchingHTTPProvider(url(node), window=0.05, timeout=10)
+
+    def call(i):
+        started = time.perf_counter()
+        with pytest.raises(Exception) as raised:
+            provider.make_request("eth_call", [i])
+        return raised.value, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(call, range(5)))
+    for error, elapsed in results:
+        assert not isinstance(error, TimeoutError)
+        assert elapsed < 5
+    if mode == "error_object":
+        assert all("batch too large" in str(error) for error, _ in results)
+    if mode == "missing_id":
+        assert all("No response for request id" in str(error) for error, _ in results)
@@ -0,0 +1,55 @@
+import io
+import math
+import os
+
+from eth_hash.auto import keccak
+
+from code_generator import ALPHABET, BloomFilter, generate_codes
+from giftcard_common import code_hash
+
+
+def generate(count, **kwargs):
+    codes, hashes = io.StringIO(), io.BytesIO()
+    stats = generate_codes(count, codes, hashes, workers=2, log=lambda *_: None, **kwargs)
+    data = hashes.getvalue()
+    return stats, codes.getvalue().splitlines(), [data[i:i + 32] for i in range(0, len(data), 32)]
+
+
+def test_generated_codes_are_unique_and_hashed_like_code_hash():
+    """Test codes are unique, formatted as asked, and each hash record equals code_hash(code)"""
+    stats, codes, hashes = generate(2_000, length=8, group=4, prefix="GC-")
+    assert stats["written"] == len(codes) == len(set(codes)) == 2_000
+    assert hashes == [bytes(code_hash(code)) for code in codes]
+    for code in codes:
+        assert code.startswith("GC-") and len(code) == len("GC-") + 9 and code[7] == "-"
+        assert set(code[3:].replace("-", "")) <= set(ALPHABET)
+
+
+def test_repeats_and_false_positives_are_dropped():
+    """Test real repeats and Bloom false positives never reach the output"""
+    # One symbol per code: only 32 distinct codes, so repeats are certain
+    stats, codes, hashes = generate(32, length=1, group=0)
+    assert sorted(codes) == sorted(ALPHABET)
+    assert stats["generated"] == 32 + stats["duplicates"]
+
+    # A filter this loose reports many fresh codes as seen; they are discarded, not written
+    stats, codes, hashes = generate(2_000, error_rate=0.3)
+    assert stats["duplicates"] > 0
+    assert len(set(codes)) == stats["written"] == 2_000
+    assert hashes == [bytes(code_hash(code)) for code in codes]
+
+
+def test_bloom_filter_sizing_and_false_positive_rate():
+    """Test the filter is sized by the optimal-parameter formulas and stays near its configured rate"""
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    assert bloom.size == math.ceil(10_000 * math.log(100) / math.log(2) ** 2)
+    assert bloom.hashes == 7
+
+    h = keccak(b"seen")
+    assert bloom.add(h) is True
+    assert bloom.add(h) is False
+    for _ in range(9_999):
+        bloom.add(keccak(os.urandom(16)))
+    probes = 50_000
+    false_positives = sum(keccak(os.urandom(16)) in bloom for _ in range(probes))
+    assert 0.005 < false_positives / probes < 0.02
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+from web3 import EthereumTesterProvider, Web3
+from web3.exceptions import ContractLogicError
+
+# Make the Python tooling in scripts/ importable from the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from giftcard_common import deploy_contract  # noqa: E402
+
+# Set to run the contract tests against an external node (e.g. `npx hardhat node`)
+# instead of the in-process EVM
+EXTERNAL_RPC_URL = os.environ.get("GIFTCARD_TEST_RPC_URL")
+
+# Set to run the contract tests against scripts/simulator.py's in-memory model
+# of GiftCard instead (no EVM; checks the simulator against the contract tests)
+USE_SIMULATOR = os.environ.get("GIFTCARD_TEST_SIMULATOR") == "1"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "exact_gas: needs a real EVM's gas figures; skipped against the simulator")
+
+
+def pytest_runtest_setup(item):
+    if USE_SIMULATOR and item.get_closest_marker("exact_gas"):
+        pytest.skip("the simulator's gas figures are approximate")
+
+
+class InProcessProvider(EthereumTesterProvider):
+    """eth-tester (py-evm) provider that reports reverts like a JSON-RPC node"""
+
+    def make_request(self, method, params):
+        from eth_tester.exceptions import TransactionFailed
+
+        try:
+            return super().make_request(method, params)
+        except TransactionFailed as e:
+            raise ContractLogicError(str(e)) from e
+
+
+@pytest.fixture(scope="session")
+def w3():
+    if EXTERNAL_RPC_URL:
+        return Web3(Web3.HTTPProvider(EXTERNAL_RPC_URL))
+    if USE_SIMULATOR:
+        from simulator import start_server
+
+        _, url = start_server()
+        return Web3(Web3.HTTPProvider(url))
+    return Web3(InProcessProvider())
+
+
+@pytest.fixture(scope="session")
+def accounts(w3):
+    return w3.eth.accounts
+
+
+@pytest.fixture(scope="session")
+def giftcard(w3, accounts):
+    """A GiftCard deployed once per session from the compiled artifact"""
+    return deploy_contract(w3, accounts[0])
+
+
+@pytest.fixture
+def isolated_chain(w3, giftcard):
+    """Snapshot the chain before a test and revert it afterwards"""
+    snapshot = w3.testing.snapshot()
+    yield
+    w3.testing.revert(snapshot)
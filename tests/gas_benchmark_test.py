@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from gas_report import measure_gas
+
+# Stored gasUsed per operation, keyed by benchmark case
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gas_baseline.json")
+
+# Set GIFTCARD_UPDATE_GAS_BASELINE=1 to (re)record the baseline instead of checking it
+UPDATE_BASELINE = os.environ.get("GIFTCARD_UPDATE_GAS_BASELINE") == "1"
+
+# Allowed increase over the baseline before a benchmark fails (2%)
+TOLERANCE = float(os.environ.get("GIFTCARD_GAS_TOLERANCE", "0.02"))
+
+# CI systems set CI; there a missing baseline fails instead of skipping
+IN_CI = bool(os.environ.get("CI"))
+
+CODE_LENGTHS = (8, 32, 128)
+# measure_gas spends 11x the value (buy plus a 10-card buyBatch); hardhat and
+# the simulator fund each test account with 10,000 ETH
+VALUES_ETH = ("0.001", "1", "100")
+
+pytestmark = [pytest.mark.usefixtures("isolated_chain"), pytest.mark.exact_gas]
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            recorded = json.load(f)
+    else:
+        recorded = {}
+    yield recorded
+    if UPDATE_BASELINE:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.mark.parametrize("value_eth", VALUES_ETH)
+@pytest.mark.parametrize("code_length", CODE_LENGTHS)
+def test_gas_usage(w3, accounts, giftcard, baseline, code_length, value_eth):
+    """Test that no operation costs more gas than the stored baseline"""
+    case = f"code{code_length}-value{value_eth}"
+    code = ("GAS" * code_length)[:code_length]
+    results = measure_gas(w3, giftcard, accounts[1], accounts[2], code, w3.to_wei(value_eth, "ether"))
+
+    if UPDATE_BASELINE:
+        baseline[case] = results
+        return
+    if case not in baseline:
+        message = f"No gas baseline for {case}; record one with GIFTCARD_UPDATE_GAS_BASELINE=1"
+        if IN_CI:
+            pytest.fail(message)
+        pytest.skip(message)
+
+    regressions = []
+    for operation, gas in sorted(results.items()):
+        expected = baseline[case].get(operation)
+        if expected is None:
+            continue  # New operation: nothing to compare against yet
+        if gas > expected * (1 + TOLERANCE):
+            regressions.append(f"{operation}: {expected} -> {gas} gas ({(gas - expected) / expected:+.1%})")
+
+    assert not regressions, f"Gas regressions in {case}:\n" + "\n".join(regressions)
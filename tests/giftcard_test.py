@@ -1,30 +1,12 @@
 import pytest
-from web3 import Web3
 from web3.exceptions import ContractLogicError
-import json
-import time
-from unittest.mock import patch
 
-# --- Configurations ---
-RPC_URL = "http://127.0.0.1:8545"
-CONTRACT_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"  # Replace with the deployed address
+from chain_time import ChainClock
 
-# Load ABI from Hardhat artifacts
-with open("../artifacts/contracts/GiftCard.sol/GiftCard.json") as f:
-    contract_json = json.load(f)
-    abi = contract_json["abi"]
+# The w3, accounts and giftcard fixtures live in conftest.py; every test
+# runs against a chain snapshot that is reverted afterwards
+pytestmark = pytest.mark.usefixtures("isolated_chain")
 
-@pytest.fixture(scope="module")
-def w3():
-    return Web3(Web3.HTTPProvider(RPC_URL))
-
-@pytest.fixture(scope="module")
-def accounts(w3):
-    return w3.eth.accounts
-
-@pytest.fixture(scope="module")
-def giftcard(w3):
-    return w3.eth.contract(address=CONTRACT_ADDRESS, abi=abi)
 
 def test_buy_and_redeem_success(w3, accounts, giftcard):
     buyer = accounts[1]
@@ -41,6 +23,7 @@ def test_buy_and_redeem_success(w3, accounts, giftcard):
     tx_hash2 = giftcard.functions.redeem(code).transact({"from": redeemer})
     receipt2 = w3.eth.wait_for_transaction_receipt(tx_hash2)
 
+
 def test_buy_below_minimum(w3, accounts, giftcard):
     buyer = accounts[3]
     code = "SMALLAMOUNT0001"
@@ -50,7 +33,8 @@ def test_buy_below_minimum(w3, accounts, giftcard):
     with pytest.raises(ContractLogicError):
         tx_hash = giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
         w3.eth.wait_for_transaction_receipt(tx_hash)
-        
+
+
 def test_buy_same_code_twice_fails(w3, accounts, giftcard):
     buyer1 = accounts[1]
     buyer2 = accounts[2]
@@ -67,6 +51,7 @@ def test_buy_same_code_twice_fails(w3, accounts, giftcard):
         tx_hash2 = giftcard.functions.buy(code_hash).transact({"from": buyer2, "value": value})
         w3.eth.wait_for_transaction_receipt(tx_hash2)
 
+
 def test_redeem_twice_fails(w3, accounts, giftcard):
     buyer = accounts[4]
     code = "ONETIME123"
@@ -87,6 +72,7 @@ def test_redeem_twice_fails(w3, accounts, giftcard):
         tx_hash3 = giftcard.functions.redeem(code).transact({"from": redeemer})
         w3.eth.wait_for_transaction_receipt(tx_hash3)
 
+
 def test_redeem_nonexistent_code_fails(w3, accounts, giftcard):
     redeemer = accounts[6]
     code = "DOESNOTEXIST123"
@@ -94,6 +80,7 @@ def test_redeem_nonexistent_code_fails(w3, accounts, giftcard):
         tx_hash = giftcard.functions.redeem(code).transact({"from": redeemer})
         w3.eth.wait_for_transaction_receipt(tx_hash)
 
+
 def test_gift_card_expiration(w3, accounts, giftcard):
     """Test gift card expiration functionality"""
     buyer = accounts[1]
@@ -119,9 +106,15 @@ def test_gift_card_expiration(w3, accounts, giftcard):
     expected_expiration = purchase_time + (30 * 24 * 60 * 60)  # 30 days
     assert expiration_time == expected_expiration
     
-    # Mock time to simulate expiration (31 days later)
-    with patch('time.time', return_value=purchase_time + (31 * 24 * 60 * 60)):
-        print("Expiration logic implemented correctly")
+    # Move chain time 31 days forward
+    ChainClock(w3).advance_days(31)
+    assert giftcard.functions.isExpired(code_hash).call() == True
+    
+    # Expired gift cards cannot be redeemed
+    with pytest.raises(ContractLogicError):
+        tx_hash2 = giftcard.functions.redeem(code).transact({"from": redeemer})
+        w3.eth.wait_for_transaction_receipt(tx_hash2)
+
 
 def test_expired_gift_card_redemption_fails(w3, accounts, giftcard):
     """Test that expired gift cards cannot be redeemed"""
@@ -141,4 +134,820 @@ def test_expired_gift_card_redemption_fails(w3, accounts, giftcard):
     
     assert purchase_time > 0
     assert expiration_time > purchase_time
-    assert is_expired == False  # Should not be expired immediately
\ No newline at end of file
+    assert is_expired == False  # Should not be expired immediately
+    
+    # Redeem one second after the expiration time
+    ChainClock(w3).set_next_block_timestamp(expiration_time + 1)
+    with pytest.raises(ContractLogicError):
+        tx_hash2 = giftcard.functions.redeem(code).transact({"from": accounts[2]})
+        w3.eth.wait_for_transaction_receipt(tx_hash2)
+    assert giftcard.functions.isRedeemed(code_hash).call() == False
+
+
+def test_redeem_at_expiration_boundary_succeeds(w3, accounts, giftcard):
+    """Test that a gift card is still redeemable in the exact expiration second"""
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    code = "BOUNDARY_TEST"
+    code_hash = w3.keccak(text=code)
+    value = w3.to_wei(0.01, "ether")
+    
+    tx_hash = giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    expiration_time = giftcard.functions.getExpirationTime(code_hash).call()
+    
+    # block.timestamp == expiration time is not yet expired
+    ChainClock(w3).set_next_block_timestamp(expiration_time)
+    tx_hash2 = giftcard.functions.redeem(code).transact({"from": redeemer})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash2)
+    assert w3.eth.get_block(receipt["blockNumber"])["timestamp"] == expiration_time
+    assert giftcard.functions.isRedeemed(code_hash).call() == True
+
+
+def test_mass_expiry(w3, accounts, giftcard):
+    """Test that thousands of gift cards expire together once chain time passes"""
+    buyer = accounts[1]
+    code_hashes = [w3.keccak(text=f"MASS_EXPIRY_{i}") for i in range(1000)]
+    value = w3.to_wei(0.001, "ether")
+    
+    # Issue the cards in a few batches
+    for start in range(0, len(code_hashes), 250):
+        batch = code_hashes[start:start + 250]
+        tx_hash = giftcard.functions.buyBatch(batch, [value] * len(batch)).transact({"from": buyer, "value": value * len(batch)})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    statuses = giftcard.functions.getStatusBatch(code_hashes).call()
+    assert not any(status[2] for status in statuses)
+    
+    ChainClock(w3).advance_days(31)
+    
+    statuses = giftcard.functions.getStatusBatch(code_hashes).call()
+    assert all(status[2] for status in statuses)
+    
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.redeem("MASS_EXPIRY_0").transact({"from": accounts[2]})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def test_get_gift_card_status(w3, accounts, giftcard):
+    """Test that the single-call status view matches the individual views"""
+    buyer = accounts[1]
+    code = "STATUS_TEST"
+    code_hash = w3.keccak(text=code)
+    value = w3.to_wei(0.01, "ether")
+    
+    # Non-existent gift card has an all-zero status
+    assert giftcard.functions.getGiftCardStatus(code_hash).call() == (0, False, False, 0, 0)
+    
+    # Buy gift card
+    tx_hash = giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    status = giftcard.functions.getGiftCardStatus(code_hash).call()
+    assert status == (
+        giftcard.functions.getGiftCardValue(code_hash).call(),
+        giftcard.functions.isRedeemed(code_hash).call(),
+        giftcard.functions.isExpired(code_hash).call(),
+        giftcard.functions.getPurchaseTime(code_hash).call(),
+        giftcard.functions.getExpirationTime(code_hash).call(),
+    )
+    assert status[0] == value
+
+
+def test_get_status_batch(w3, accounts, giftcard):
+    """Test batched status lookup across existing and missing gift cards"""
+    from status_batch import iter_statuses
+    
+    buyer = accounts[1]
+    codes = [f"BATCH_STATUS_{i}" for i in range(5)]
+    code_hashes = [w3.keccak(text=code) for code in codes]
+    value = w3.to_wei(0.01, "ether")
+    
+    # Buy every other gift card
+    for code_hash in code_hashes[::2]:
+        tx_hash = giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    statuses = giftcard.functions.getStatusBatch(code_hashes).call()
+    assert [s[0] for s in statuses] == [value, 0, value, 0, value]
+    
+    # The Python helper splits the list into several calls and keeps the order
+    records = list(iter_statuses(giftcard, code_hashes, batch_size=2))
+    assert [r["value"] for r in records] == [value, 0, value, 0, value]
+    assert records[1]["codeHash"] == "0x" + bytes(code_hashes[1]).hex()
+
+
+def test_buy_batch_success(w3, accounts, giftcard):
+    """Test issuing several gift cards in one transaction"""
+    buyer = accounts[1]
+    codes = [f"BUY_BATCH_{i}" for i in range(3)]
+    code_hashes = [w3.keccak(text=code) for code in codes]
+    values = [w3.to_wei(v, "ether") for v in (0.001, 0.01, 0.1)]
+    
+    tx_hash = giftcard.functions.buyBatch(code_hashes, values).transact({"from": buyer, "value": sum(values)})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # One purchase event per gift card
+    events = giftcard.events.GiftCardPurchased().process_receipt(receipt)
+    assert [e["args"]["codeHash"] for e in events] == code_hashes
+    assert [e["args"]["value"] for e in events] == values
+    
+    for code_hash, value in zip(code_hashes, values):
+        assert giftcard.functions.getGiftCardValue(code_hash).call() == value
+    
+    # Cards issued in a batch redeem like any other
+    tx_hash2 = giftcard.functions.redeem(codes[1]).transact({"from": accounts[2]})
+    w3.eth.wait_for_transaction_receipt(tx_hash2)
+    assert giftcard.functions.isRedeemed(code_hashes[1]).call() == True
+
+
+def test_buy_batch_value_mismatch_fails(w3, accounts, giftcard):
+    """Test that msg.value must equal the sum of the gift card values"""
+    buyer = accounts[3]
+    code_hashes = [w3.keccak(text="BATCH_MISMATCH_1"), w3.keccak(text="BATCH_MISMATCH_2")]
+    values = [w3.to_wei(0.01, "ether"), w3.to_wei(0.01, "ether")]
+    
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.buyBatch(code_hashes, values).transact({"from": buyer, "value": values[0]})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # Nothing was issued
+    assert giftcard.functions.getGiftCardValue(code_hashes[0]).call() == 0
+
+
+def test_buy_batch_duplicate_code_fails(w3, accounts, giftcard):
+    """Test that a repeated code inside a batch reverts the whole batch"""
+    buyer = accounts[3]
+    code_hash = w3.keccak(text="BATCH_DUPLICATE")
+    value = w3.to_wei(0.01, "ether")
+    
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.buyBatch([code_hash, code_hash], [value, value]).transact({"from": buyer, "value": 2 * value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def test_indexer_mirrors_contract_state(w3, accounts, giftcard):
+    """Test that the SQLite indexer answers status queries like the contract"""
+    from indexer import GiftCardIndexer
+    
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    codes = ["INDEXER_KEEP", "INDEXER_REDEEM"]
+    value = w3.to_wei(0.01, "ether")
+    
+    for code in codes:
+        tx_hash = giftcard.functions.buy(w3.keccak(text=code)).transact({"from": buyer, "value": value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = giftcard.functions.redeem(codes[1]).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # Index in tiny chunks so the chunking and checkpointing are exercised
+    indexer = GiftCardIndexer(w3, giftcard, ":memory:", chunk_blocks=2)
+    indexer.sync()
+    assert indexer.last_block == w3.eth.block_number
+    
+    now = w3.eth.get_block("latest")["timestamp"]
+    for code in codes + ["INDEXER_MISSING"]:
+        code_hash = w3.keccak(text=code)
+        local = indexer.get_status(code_hash, now=now)
+        on_chain = giftcard.functions.getGiftCardStatus(code_hash).call()
+        assert tuple(local.values()) == tuple(on_chain)
+    
+    # Nothing new to index on a second pass
+    assert indexer.sync() == 0
+    indexer.close()
+
+
+def test_campaign_redeem_with_proof(w3, accounts, giftcard, tmp_path):
+    """Test Merkle campaign issuance and proof-based redemption"""
+    from merkle_issuer import MerkleTree, write_leaves
+    
+    issuer = accounts[1]
+    redeemer = accounts[2]
+    value = w3.to_wei(0.01, "ether")
+    codes = [f"CAMPAIGN_{i}" for i in range(5)]
+    
+    # Build the tree and fund the whole campaign in one transaction
+    tree = MerkleTree(str(tmp_path))
+    count, total = write_leaves(codes, tree.level_path(0), value)
+    root = tree.build(count)
+    tx_hash = giftcard.functions.createCampaign(root, count).transact({"from": issuer, "value": total})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    campaign_id = giftcard.events.CampaignCreated().process_receipt(receipt)[0]["args"]["campaignId"]
+    
+    # Redeem one card with its proof
+    tx_hash2 = giftcard.functions.redeemWithProof(campaign_id, 2, codes[2], value, tree.proof(2)).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash2)
+    assert giftcard.functions.isCampaignCardRedeemed(campaign_id, 2).call() == True
+    assert giftcard.functions.isCampaignCardRedeemed(campaign_id, 3).call() == False
+    assert giftcard.functions.getCampaign(campaign_id).call()[1] == total - value
+    
+    # Redeeming twice fails
+    with pytest.raises(ContractLogicError):
+        tx_hash3 = giftcard.functions.redeemWithProof(campaign_id, 2, codes[2], value, tree.proof(2)).transact({"from": redeemer})
+        w3.eth.wait_for_transaction_receipt(tx_hash3)
+    
+    # A proof for a different card, or an inflated value, fails
+    with pytest.raises(ContractLogicError):
+        tx_hash4 = giftcard.functions.redeemWithProof(campaign_id, 3, codes[3], value, tree.proof(4)).transact({"from": redeemer})
+        w3.eth.wait_for_transaction_receipt(tx_hash4)
+    with pytest.raises(ContractLogicError):
+        tx_hash5 = giftcard.functions.redeemWithProof(campaign_id, 3, codes[3], total, tree.proof(3)).transact({"from": redeemer})
+        w3.eth.wait_for_transaction_receipt(tx_hash5)
+    tree.close()
+
+
+def test_campaign_reclaim_after_expiry(w3, accounts, giftcard, tmp_path):
+    """Test that an expired campaign's unredeemed funds go back to its issuer exactly once"""
+    from merkle_issuer import MerkleTree, write_leaves
+    
+    owner = accounts[0]
+    issuer = accounts[1]
+    redeemer = accounts[2]
+    value = w3.to_wei(0.01, "ether")
+    codes = [f"RECLAIM_{i}" for i in range(4)]
+    
+    tree = MerkleTree(str(tmp_path))
+    count, total = write_leaves(codes, tree.level_path(0), value)
+    root = tree.build(count)
+    tx_hash = giftcard.functions.createCampaign(root, count).transact({"from": issuer, "value": total})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    campaign_id = giftcard.events.CampaignCreated().process_receipt(receipt)[0]["args"]["campaignId"]
+    tx_hash = giftcard.functions.redeemWithProof(campaign_id, 0, codes[0], value, tree.proof(0)).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    tree.close()
+    
+    # Not before the campaign expires, and never by a third party
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.reclaimCampaign(campaign_id).transact({"from": issuer})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    ChainClock(w3).advance_days(31)
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.reclaimCampaign(campaign_id).transact({"from": redeemer})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # The owner may trigger it, but the funds go to the issuer
+    issuer_balance = w3.eth.get_balance(issuer)
+    tx_hash = giftcard.functions.reclaimCampaign(campaign_id).transact({"from": owner})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    event = giftcard.events.CampaignReclaimed().process_receipt(receipt)[0]["args"]
+    assert (event["campaignId"], event["amount"], event["to"]) == (campaign_id, total - value, issuer)
+    assert w3.eth.get_balance(issuer) == issuer_balance + total - value
+    assert giftcard.functions.getCampaign(campaign_id).call()[1] == 0
+    
+    # Nothing is left for a second reclaim
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.reclaimCampaign(campaign_id).transact({"from": issuer})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def test_redeem_batch_skips_failed_items(w3, accounts, giftcard):
+    """Test relayed batch redemption with per-item failures"""
+    from eth_account import Account
+    from relayer import sign_redemption
+    
+    buyer = accounts[1]
+    relayer = accounts[2]
+    value = w3.to_wei(0.01, "ether")
+    codes = ["RELAY_OK", "RELAY_BAD_SIGNATURE", "RELAY_MISSING"]
+    recipients = [Account.create() for _ in codes]
+    chain_id = w3.eth.chain_id
+    
+    for code in codes[:2]:
+        tx_hash = giftcard.functions.buy(w3.keccak(text=code)).transact({"from": buyer, "value": value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    signatures = [sign_redemption(r, giftcard.address, chain_id, code) for r, code in zip(recipients, codes)]
+    # Signed by someone other than the recipient
+    signatures[1] = sign_redemption(recipients[0], giftcard.address, chain_id, codes[1])
+    
+    tx_hash = giftcard.functions.redeemBatch(codes, [r.address for r in recipients], signatures).transact({"from": relayer})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    redeemed = giftcard.events.GiftCardRedeemed().process_receipt(receipt)
+    skipped = giftcard.events.RedemptionSkipped().process_receipt(receipt)
+    assert [e["args"]["redeemer"] for e in redeemed] == [recipients[0].address]
+    assert [e["args"]["reason"] for e in skipped] == ["Invalid recipient signature", "Gift card does not exist"]
+    
+    # Only the valid item was paid out, to its recipient rather than the relayer
+    assert w3.eth.get_balance(recipients[0].address) == value
+    assert giftcard.functions.isRedeemed(w3.keccak(text=codes[0])).call() == True
+    assert giftcard.functions.isRedeemed(w3.keccak(text=codes[1])).call() == False
+
+
+def test_relayer_survives_a_failing_batch(w3, accounts, giftcard):
+    """Test a batch that raises unexpectedly fails its items and the relayer goes on to the next batch"""
+    import warnings
+    from eth_account import Account
+    from relayer import RedemptionRelayer, sign_redemption
+    
+    recipient = Account.create()
+    code = "RELAY_AFTER_ERROR"
+    tx_hash = giftcard.functions.buy(w3.keccak(text=code)).transact({"from": accounts[1], "value": w3.to_wei(0.01, "ether")})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    results = []
+    relayer = RedemptionRelayer(w3, giftcard, accounts[2], max_batch=1, max_delay=0.05, on_result=results.append)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        relayer.start()
+        # A code that is not a string fails ABI encoding, outside the errors flush handles
+        bad = relayer.submit(None, recipient.address, b"\0" * 65)
+        good = relayer.submit(code, recipient.address, sign_redemption(recipient, giftcard.address, w3.eth.chain_id, code))
+        relayer.stop()
+    
+    assert results == [bad, good]
+    assert bad.redeemed == False and bad.reason.startswith("relayer error")
+    assert (good.redeemed, good.reason) == (True, None)
+    # Receipts mixing GiftCardRedeemed with other events decode without MismatchedABI warnings
+    assert [w for w in caught if "MismatchedABI" in str(w.message)] == []
+
+
+def test_read_cache_tracks_redemption(w3, accounts, giftcard):
+    """Test that the read cache serves repeat reads and sees redemptions"""
+    from read_cache import CachedGiftCard
+    
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    code = "READ_CACHE"
+    code_hash = w3.keccak(text=code)
+    value = w3.to_wei(0.01, "ether")
+    
+    tx_hash = giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    cache = CachedGiftCard(w3, giftcard, head_ttl=0)
+    cache.poll_events()
+    assert cache.get_status(code_hash) == dict(zip(
+        ("value", "redeemed", "expired", "purchaseTime", "expirationTime"),
+        giftcard.functions.getGiftCardStatus(code_hash).call(),
+    ))
+    assert cache.get_value(code_hash) == value
+    assert cache.stats()["misses"] == 1
+    
+    tx_hash = giftcard.functions.redeem(code).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    assert cache.poll_events() == 1
+    assert cache.is_redeemed(code_hash) == True
+    assert cache.stats()["misses"] == 1
+
+
+def test_read_cache_keeps_immutable_fields_across_blocks(w3, accounts, giftcard):
+    """Test that value and purchase time stay cached as the head advances, while redeemed is re-read"""
+    from chain_time import ChainClock
+    from read_cache import CachedGiftCard
+    
+    code_hash = w3.keccak(text="READ_CACHE_BLOCKS")
+    value = w3.to_wei(0.01, "ether")
+    tx_hash = giftcard.functions.buy(code_hash).transact({"from": accounts[1], "value": value})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    cache = CachedGiftCard(w3, giftcard, head_ttl=0)
+    purchase_time = cache.get_purchase_time(code_hash)
+    assert cache.stats()["misses"] == 1
+    
+    ChainClock(w3).mine()
+    assert cache.get_value(code_hash) == value
+    assert cache.get_purchase_time(code_hash) == purchase_time
+    assert cache.get_expiration_time(code_hash) == giftcard.functions.getExpirationTime(code_hash).call()
+    assert cache.is_expired(code_hash) == False
+    assert cache.stats()["misses"] == 1
+    
+    # The redeemed flag is re-read once per new block, then served from the cache
+    assert cache.is_redeemed(code_hash) == False
+    assert cache.is_redeemed(code_hash) == False
+    assert cache.stats()["misses"] == 2
+
+
+def test_fast_views_match_contract(w3, accounts, giftcard):
+    """Test that the raw eth_call views decode the same results as the contract object"""
+    from fast_views import FastGiftCardViews
+    
+    buyer = accounts[1]
+    code_hashes = [w3.keccak(text="FAST_VIEW"), w3.keccak(text="FAST_VIEW_MISSING")]
+    tx_hash = giftcard.functions.buy(code_hashes[0]).transact({"from": buyer, "value": w3.to_wei(0.01, "ether")})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    fast = FastGiftCardViews(w3, giftcard.address)
+    for code_hash in code_hashes:
+        assert fast.get_gift_card_value(code_hash) == giftcard.functions.getGiftCardValue(code_hash).call()
+        assert fast.is_redeemed(code_hash) == giftcard.functions.isRedeemed(code_hash).call()
+        assert fast.is_expired(code_hash) == giftcard.functions.isExpired(code_hash).call()
+        assert fast.get_purchase_time(code_hash) == giftcard.functions.getPurchaseTime(code_hash).call()
+        assert fast.get_expiration_time(code_hash) == giftcard.functions.getExpirationTime(code_hash).call()
+        assert fast.get_gift_card_status(code_hash) == tuple(giftcard.functions.getGiftCardStatus(code_hash).call())
+    assert fast.get_status_batch(code_hashes) == [tuple(s) for s in giftcard.functions.getStatusBatch(code_hashes).call()]
+
+
+def test_card_table_mirrors_contract_state(w3, accounts, giftcard, tmp_path):
+    """Test that the memory-mapped card table answers status queries like the contract"""
+    from card_table import CardTable, CardTableIndexer
+    
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    codes = ["TABLE_KEEP", "TABLE_REDEEM"]
+    value = w3.to_wei(0.01, "ether")
+    
+    for code in codes:
+        tx_hash = giftcard.functions.buy(w3.keccak(text=code)).transact({"from": buyer, "value": value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = giftcard.functions.redeem(codes[1]).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    path = str(tmp_path / "cards.tbl")
+    table = CardTable.create(path, 100)
+    indexer = CardTableIndexer(w3, giftcard, table, chunk_blocks=2)
+    indexer.sync()
+    assert table.last_block == w3.eth.block_number
+    assert table.count == 2
+    
+    # A second, read-only handle sees the writer's updates through the shared mapping
+    reader = CardTable(path)
+    now = w3.eth.get_block("latest")["timestamp"]
+    for code in codes + ["TABLE_MISSING"]:
+        code_hash = w3.keccak(text=code)
+        local = reader.get_status(code_hash, now=now)
+        on_chain = giftcard.functions.getGiftCardStatus(code_hash).call()
+        assert tuple(local.values()) == tuple(on_chain)
+    
+    assert indexer.sync() == 0
+    reader.close()
+    table.close()
+
+
+def test_expiry_scheduler_batches(w3, accounts, giftcard):
+    """Test expiry notices and expired batches as chain time advances"""
+    from expiry_scheduler import ExpiryFollower, ExpiryScheduler
+    
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    codes = ["EXPIRY_KEEP", "EXPIRY_REDEEM"]
+    value = w3.to_wei(0.01, "ether")
+    
+    for code in codes:
+        tx_hash = giftcard.functions.buy(w3.keccak(text=code)).transact({"from": buyer, "value": value})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = giftcard.functions.redeem(codes[1]).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    scheduler = ExpiryScheduler(notice_days=(3,))
+    follower = ExpiryFollower(w3, giftcard, scheduler)
+    follower.sync()
+    # The redeemed card was removed from the schedule
+    assert len(scheduler) == 1
+    
+    clock = ChainClock(w3)
+    assert scheduler.advance(clock.now()) == []
+    
+    kept = bytes(w3.keccak(text=codes[0]))
+    expiration_time = giftcard.functions.getExpirationTime(kept).call()
+    assert scheduler.advance(clock.advance_days(28)) == [("expiring", 3, [(kept, expiration_time)])]
+    assert scheduler.advance(clock.advance_days(3)) == [("expired", 0, [(kept, expiration_time)])]
+    assert giftcard.functions.isExpired(kept).call() == True
+    assert len(scheduler) == 0
+
+
+def test_sweep_expired(w3, accounts, giftcard):
+    """Test that the owner reclaims only expired, unredeemed gift cards"""
+    owner = accounts[0]
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    value = w3.to_wei(0.01, "ether")
+    codes = ["SWEEP_EXPIRED_1", "SWEEP_EXPIRED_2", "SWEEP_REDEEMED", "SWEEP_FRESH"]
+    code_hashes = [w3.keccak(text=code) for code in codes]
+    
+    tx_hash = giftcard.functions.buyBatch(code_hashes[:3], [value] * 3).transact({"from": buyer, "value": value * 3})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = giftcard.functions.redeem(codes[2]).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    ChainClock(w3).advance_days(31)
+    tx_hash = giftcard.functions.buy(code_hashes[3]).transact({"from": buyer, "value": value})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # Only the owner can sweep
+    with pytest.raises(ContractLogicError):
+        tx_hash = giftcard.functions.sweepExpired(code_hashes).transact({"from": buyer})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    missing = w3.keccak(text="SWEEP_MISSING")
+    owner_balance = w3.eth.get_balance(owner)
+    tx_hash = giftcard.functions.sweepExpired(code_hashes + [missing]).transact({"from": owner})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    event = giftcard.events.ExpiredSwept().process_receipt(receipt)[0]
+    assert event["args"]["cardCount"] == 2
+    assert event["args"]["amount"] == value * 2
+    swept = giftcard.events.GiftCardSwept().process_receipt(receipt)
+    assert [(e["args"]["codeHash"], e["args"]["value"]) for e in swept] == [(h, value) for h in code_hashes[:2]]
+    gas_cost = receipt["gasUsed"] * receipt["effectiveGasPrice"]
+    assert w3.eth.get_balance(owner) == owner_balance + value * 2 - gas_cost
+    assert [giftcard.functions.isSwept(h).call() for h in code_hashes] == [True, True, False, False]
+    
+    # A second sweep finds nothing left to reclaim
+    tx_hash = giftcard.functions.sweepExpired(code_hashes).transact({"from": owner})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    assert giftcard.events.ExpiredSwept().process_receipt(receipt)[0]["args"]["amount"] == 0
+
+
+def test_sweeper_reclaims_indexed_candidates(w3, accounts, giftcard):
+    """Test the Python sweeper against candidates from the event indexer"""
+    from indexer import GiftCardIndexer
+    from sweeper import find_candidates, sweep
+    
+    buyer = accounts[1]
+    value = w3.to_wei(0.01, "ether")
+    code_hashes = [w3.keccak(text=f"SWEEPER_{i}") for i in range(5)]
+    tx_hash = giftcard.functions.buyBatch(code_hashes, [value] * 5).transact({"from": buyer, "value": value * 5})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    indexer = GiftCardIndexer(w3, giftcard, ":memory:")
+    indexer.sync()
+    clock = ChainClock(w3)
+    assert list(find_candidates(indexer, clock.now())) == []
+    
+    now = clock.advance_days(31)
+    report = sweep(w3, giftcard, find_candidates(indexer, now), accounts[0], log=lambda *_: None)
+    assert (report.candidates, report.cards, report.amount) == (5, 5, value * 5)
+    assert report.wei_per_gas > 0
+    
+    # Cards swept since the last sync are simulated and skipped without a transaction
+    report = sweep(w3, giftcard, find_candidates(indexer, now), accounts[0], log=lambda *_: None)
+    assert (report.cards, report.transactions) == (0, 0)
+    
+    # Once their GiftCardSwept events are indexed they are no longer candidates
+    indexer.sync()
+    assert list(find_candidates(indexer, now)) == []
+    indexer.close()
+
+
+def test_analytics_liability(w3, accounts, giftcard, tmp_path):
+    """Test liability and redemption aggregates computed from the indexed events"""
+    from analytics import GWEI, CardColumns, liability, redemption_by_issue_day
+    from indexer import GiftCardIndexer
+    
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    codes = [f"ANALYTICS_{i}" for i in range(3)]
+    # Sub-gwei amounts must survive into the totals
+    values = [w3.to_wei(v, "ether") + 1 for v in (0.01, 0.02, 0.03)]
+    tx_hash = giftcard.functions.buyBatch([w3.keccak(text=c) for c in codes], values).transact({"from": buyer, "value": sum(values)})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = giftcard.functions.redeem(codes[0]).transact({"from": redeemer})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    db_path = str(tmp_path / "giftcard.db")
+    indexer = GiftCardIndexer(w3, giftcard, db_path)
+    indexer.sync()
+    indexer.close()
+    cards = CardColumns.from_indexer(db_path)
+    
+    now = ChainClock(w3).now()
+    report = liability(cards, now)
+    assert report["issued_wei"] == sum(values)
+    assert report["redeemed_wei"] == values[0]
+    assert report["outstanding_wei"] == values[1] + values[2]
+    assert report["breakage_wei"] == 0
+    by_day = redemption_by_issue_day(cards)
+    assert by_day["issued_cards"].tolist() == [3]
+    assert by_day["redeemed_cards"].tolist() == [1]
+    assert by_day["issued_gwei"].tolist() == [sum(values) // GWEI]
+    
+    # Past expiry the unredeemed value becomes breakage
+    report = liability(cards, now + 31 * 24 * 60 * 60)
+    assert report["outstanding_wei"] == 0
+    assert report["breakage_wei"] == values[1] + values[2]
+
+
+def test_simulator_matches_contract(w3, accounts, giftcard):
+    """Test the JSON-RPC simulator gives the same results as the contract for one scenario"""
+    from simulator import start_server
+    from web3 import Web3
+    
+    from giftcard_common import CONTRACT_ADDRESS, get_contract
+    
+    server, url = start_server()
+    sim_w3 = Web3(Web3.HTTPProvider(url))
+    sim_giftcard = get_contract(sim_w3, CONTRACT_ADDRESS, abi=giftcard.abi)
+    
+    def reason(error):
+        return str(error.message).removeprefix("execution reverted: ")
+    
+    def run(w3, giftcard):
+        buyer, redeemer = w3.eth.accounts[1], w3.eth.accounts[2]
+        code_hash = w3.keccak(text="SIMULATED")
+        value = w3.to_wei(0.01, "ether")
+        results = []
+        w3.eth.wait_for_transaction_receipt(giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value}))
+        with pytest.raises(ContractLogicError) as e:
+            giftcard.functions.buy(code_hash).transact({"from": buyer, "value": value})
+        results.append(reason(e.value))
+        status = giftcard.functions.getGiftCardStatus(code_hash).call()
+        results.append((status[0], status[1], status[2], status[4] - status[3]))
+        before = w3.eth.get_balance(giftcard.address)
+        receipt = w3.eth.wait_for_transaction_receipt(giftcard.functions.redeem("SIMULATED").transact({"from": redeemer}))
+        results.append(before - w3.eth.get_balance(giftcard.address))
+        results.append(giftcard.events.GiftCardRedeemed().process_receipt(receipt)[0]["args"]["redeemer"])
+        with pytest.raises(ContractLogicError) as e:
+            giftcard.functions.redeem("SIMULATED").transact({"from": redeemer})
+        results.append(reason(e.value))
+        return results
+    
+    try:
+        assert run(sim_w3, sim_giftcard) == run(w3, giftcard)
+    finally:
+        server.shutdown()
+
+
+def test_client_returns_decoded_results(w3, accounts, giftcard):
+    """Test buy and redeem results come from the receipt logs, and doomed calls fail before sending"""
+    from giftcard_client import GiftCardClient
+    
+    client = GiftCardClient(w3, giftcard)
+    buyer = accounts[1]
+    redeemer = accounts[2]
+    value = w3.to_wei(0.01, "ether")
+    
+    purchase = client.buy("CLIENT_CODE", value, buyer)
+    assert purchase.code_hash == w3.keccak(text="CLIENT_CODE")
+    assert (purchase.value, purchase.buyer) == (value, buyer)
+    assert purchase.purchase_time == giftcard.functions.getPurchaseTime(purchase.code_hash).call()
+    assert purchase.expiration_time == giftcard.functions.getExpirationTime(purchase.code_hash).call()
+    
+    # A duplicate is rejected by the eth_call simulation; no transaction is sent
+    nonce = w3.eth.get_transaction_count(buyer)
+    with pytest.raises(ContractLogicError):
+        client.buy("CLIENT_CODE", value, buyer)
+    assert w3.eth.get_transaction_count(buyer) == nonce
+    
+    redemption = client.redeem("CLIENT_CODE", redeemer)
+    assert (redemption.value, redemption.redeemer) == (value, redeemer)
+    assert (redemption.purchase_time, redemption.expiration_time) == (purchase.purchase_time, purchase.expiration_time)
+    assert redemption.block_number == w3.eth.block_number
+
+
+def test_shard_router_partitions_and_merges(w3, accounts, giftcard):
+    """Test cards land on the shard their hash prefix picks and status sweeps merge in input order"""
+    from giftcard_common import deploy_contract
+    from shard_router import ShardRouter, shard_index
+    
+    shards = [deploy_contract(w3, accounts[0]) for _ in range(3)]
+    router = ShardRouter(shards)
+    codes = [f"SHARDED_{i}" for i in range(12)]
+    hashes = [w3.keccak(text=code) for code in codes]
+    value = w3.to_wei(0.001, "ether")
+    
+    report = router.issue(((h, value) for h in hashes[:8]), [accounts[1]] * 3, log=lambda *_: None)
+    assert report.cards == 8
+    for h in hashes[:8]:
+        owner = shard_index(h, 3)
+        assert [s.functions.getGiftCardValue(h).call() for s in shards] == [value if i == owner else 0 for i in range(3)]
+    
+    router.redeem(codes[0], accounts[2])
+    records = list(router.statuses(hashes))
+    router.close()
+    assert [r["codeHash"] for r in records] == ["0x" + h.hex() for h in hashes]
+    assert [r["shard"] for r in records] == [shard_index(h, 3) for h in hashes]
+    assert [r["value"] for r in records] == [value] * 8 + [0] * 4
+    assert [r["redeemed"] for r in records] == [True] + [False] * 11
+
+
+def test_bulk_cli_resumes_from_journal(w3, accounts, giftcard, tmp_path):
+    """Test a journaled issue run survives a torn journal and a rerun resends nothing"""
+    from eth_account import Account
+    from giftcard import Journal, issue_builder, read_rows, run_transactions
+    
+    signer = Account.create()
+    tx_hash = w3.eth.send_transaction({"from": accounts[0], "to": signer.address, "value": w3.to_wei(1, "ether")})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    value = w3.to_wei(0.001, "ether")
+    csv_path = tmp_path / "cards.csv"
+    csv_path.write_text("code,value\n" + "".join(f"JOURNALED_{i}\n" for i in range(6)) + "JOURNALED_0\n")
+    journal_path = tmp_path / "cards.csv.issue.journal"
+    build = issue_builder(giftcard, value, signer, w3.eth.gas_price, w3.eth.chain_id)
+    
+    def run():
+        journal = Journal(str(journal_path), "issue")
+        with open(csv_path, newline="") as f:
+            sent = run_transactions(w3, journal, read_rows(f), build, signer, max_in_flight=4, log=lambda *_: None)
+        journal.close()
+        return sent, journal
+    
+    sent, journal = run()
+    assert sent == 7
+    assert journal.counts == {"confirmed": 6, "failed": 1, "skipped": 0}
+    for i in range(6):
+        assert giftcard.functions.getGiftCardValue(w3.keccak(text=f"JOURNALED_{i}")).call() == value
+    
+    # A crash mid-append leaves a torn last line; the rerun ignores it and sends nothing
+    with open(journal_path, "a") as f:
+        f.write('{"row": 3, "sta')
+    nonce = w3.eth.get_transaction_count(signer.address)
+    sent, journal = run()
+    assert sent == 0
+    assert journal.done_through == 6
+    assert w3.eth.get_transaction_count(signer.address) == nonce
+    assert journal_path.read_text().endswith("}\n")
+
+
+def test_bulk_cli_skips_bad_values_and_resumes_after_interrupt(w3, accounts, giftcard, tmp_path):
+    """Test malformed and non-positive values are journaled as skipped, and an interrupted run resumes"""
+    from eth_account import Account
+    from giftcard import Journal, issue_builder, read_rows, run_transactions
+    
+    signer = Account.create()
+    tx_hash = w3.eth.send_transaction({"from": accounts[0], "to": signer.address, "value": w3.to_wei(1, "ether")})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    value = w3.to_wei(0.001, "ether")
+    csv_path = tmp_path / "cards.csv"
+    csv_path.write_text(
+        "code,value\n"
+        + "".join(f"VALUED_{i},0.002\n" for i in range(3))
+        + "BAD_VALUE,notanumber\nNAN_VALUE,nan\nNEGATIVE_VALUE,-1\nZERO_VALUE,0\n"
+        + "".join(f"VALUED_{i}\n" for i in range(3, 6))
+    )
+    journal_path = tmp_path / "cards.csv.issue.journal"
+    build = issue_builder(giftcard, value, signer, w3.eth.gas_price, w3.eth.chain_id)
+    
+    def interrupted(rows, at_row):
+        for row, cells in rows:
+            if row == at_row:
+                raise KeyboardInterrupt
+            yield row, cells
+    
+    # Interrupted after the bad rows, with transactions still in flight, as main handles ^C
+    journal = Journal(str(journal_path), "issue")
+    with pytest.raises(KeyboardInterrupt):
+        with open(csv_path, newline="") as f:
+            run_transactions(w3, journal, interrupted(read_rows(f), 8), build, signer, log=lambda *_: None)
+    journal.close()
+    
+    journal = Journal(str(journal_path), "issue")
+    with open(csv_path, newline="") as f:
+        sent = run_transactions(w3, journal, read_rows(f), build, signer, log=lambda *_: None)
+    journal.close()
+    assert sent == 2
+    assert journal.counts == {"confirmed": 6, "failed": 0, "skipped": 4}
+    assert journal.done_through == 9
+    for i in range(6):
+        expected = w3.to_wei(0.002, "ether") if i < 3 else value
+        assert giftcard.functions.getGiftCardValue(w3.keccak(text=f"VALUED_{i}")).call() == expected
+
+
+def test_load_test_reports_operations_and_revert_reasons(w3, accounts, giftcard):
+    """Test the load generator's mix parsing, percentiles and a short run's report"""
+    from load_test import LoadTest, parse_mix, percentile
+    
+    assert parse_mix("buy=60, redeem=30") == {"buy": 60.0, "redeem": 30.0}
+    with pytest.raises(ValueError):
+        parse_mix("buy=60,mint=5")
+    assert percentile([], 50) is None
+    assert [percentile(list(range(1, 101)), p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([7], 99) == 7
+    
+    mix = parse_mix("buy=3,redeem=2,duplicate=1,below_min=1,double_redeem=1")
+    min_value = giftcard.functions.MIN_VALUE().call()
+    load = LoadTest(w3, giftcard, mix, w3.to_wei(0.001, "ether"), min_value)
+    elapsed = load.run(buyers=2, redeemers=1, duration=1.0)
+    report = load.stats.report(elapsed, {"mix": mix})
+    assert report["operations"]["buy"]["count"] > 0
+    assert report["operations_total"] >= report["mined"] > 0
+    reasons = {
+        "duplicate": "Gift card with this code already exists",
+        "below_min": "Gift card value must be at least 0.001 ETH",
+        "double_redeem": "Gift card has already been redeemed",
+    }
+    for key in report["failures"]:
+        operation, _, reason = key.partition(": ")
+        assert reasons[operation] == reason
+
+
+def test_bulk_issuer_chunks_skips_and_refines_gas(w3, accounts, giftcard):
+    """Test issue_cards keeps chunks under the gas budget, skips issued codes and re-sizes from receipts"""
+    import re
+    from bulk_issuer import BATCH_OVERHEAD_GAS, GAS_PER_CARD_ESTIMATE, chunk_size, issue_cards
+    
+    assert chunk_size(30_000_000, 50_000, fill=0.5) == 299
+    assert chunk_size(100_000, 1_000_000) == 1
+    
+    buyer = accounts[1]
+    value = w3.to_wei(0.001, "ether")
+    code_hashes = [w3.keccak(text=f"BULK_ISSUED_{i}") for i in range(12)]
+    tx_hash = giftcard.functions.buyBatch(code_hashes[:2], [value] * 2).transact({"from": buyer, "value": value * 2})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    # A budget of exactly four cards at the starting estimate
+    block_gas_limit = w3.eth.get_block("latest")["gasLimit"]
+    fill = (BATCH_OVERHEAD_GAS + 4 * GAS_PER_CARD_ESTIMATE) / block_gas_limit
+    cards = [(h, value) for h in code_hashes] + [(code_hashes[5], value)]
+    chunks = []
+    report = issue_cards(w3, giftcard, cards, buyer, fill=fill, log=chunks.append)
+    assert (report.cards, report.skipped) == (10, 3)
+    for h in code_hashes:
+        assert giftcard.functions.getGiftCardValue(h).call() == value
+    
+    # The first chunk held two issued codes; later chunks are sized from the measured gas per card
+    chunks = [tuple(map(int, re.match(r"Chunk of (\d+) cards in block \d+: (\d+) gas", line).groups())) for line in chunks]
+    assert chunks[0][0] == 2
+    assert sum(size for size, _ in chunks) == 10
+    assert len(chunks) == report.transactions
+    assert all(gas <= block_gas_limit * fill for _, gas in chunks)
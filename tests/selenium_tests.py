@@ -1,19 +1,64 @@
-import pytest
-import time
 import os
+import sys
+import time
+
+import pytest
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from simulator import start_server  # noqa: E402
+
 
 class TestGiftCardUI:
     
-    CONTRACT_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"  # Replace with the deployed address
-    WEB_APP_URL = "http://localhost:8005"
+    CONTRACT_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"  # The simulator's first deployment
+    ACCOUNT = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"  # The simulator's account #0
+    WEB_APP_URL = None  # Set by the simulator fixture
+    TIMEOUT = 10  # Seconds to wait for any single UI action
+    
+    timings = []
+    
+    @pytest.fixture(scope="class", autouse=True)
+    def timing_report(self, request):
+        """Print how long each test took once the class is done"""
+        yield
+        reporter = request.config.pluginmanager.get_plugin("terminalreporter")
+        if reporter is None:
+            return
+        reporter.write_line("")
+        reporter.write_line("UI test timings:")
+        for name, seconds in self.timings:
+            reporter.write_line(f"  {seconds:7.3f}s  {name}")
+        reporter.write_line(f"  {sum(s for _, s in self.timings):7.3f}s  total")
+    
+    @pytest.fixture(autouse=True)
+    def timed(self, request):
+        started = time.perf_counter()
+        yield
+        self.timings.append((request.node.name, time.perf_counter() - started))
+    
+    @pytest.fixture(scope="class", autouse=True)
+    def simulator(self, request):
+        """Serve the page and an in-memory GiftCard chain from one local server"""
+        server, url = start_server()
+        request.cls.WEB_APP_URL = url
+        request.cls.chain = server.simulator
+        yield server
+        server.shutdown()
+    
+    def get_balance(self):
+        """The wallet account's balance on the simulated chain, in ETH"""
+        balance = int(self.chain.handle("eth_getBalance", [self.ACCOUNT]), 16)
+        return float(Web3.from_wei(balance, "ether"))
     
     @pytest.fixture(scope="class")
     def driver(self):
@@ -28,15 +73,16 @@ class TestGiftCardUI:
         chrome_options.add_argument("--disable-web-security")
         chrome_options.add_argument("--allow-running-insecure-content")
         
-        # For headless testing (comment out to see browser)
-        # chrome_options.add_argument("--headless")
+        # Headless unless GIFTCARD_UI_HEADED=1 (to watch the browser)
+        if os.environ.get("GIFTCARD_UI_HEADED") != "1":
+            chrome_options.add_argument("--headless=new")
         
         # Set up WebDriver
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
-        # Set implicit wait
-        driver.implicitly_wait(10)
+        # No implicit wait: tests wait on explicit completion signals instead
+        driver.set_script_timeout(self.TIMEOUT)
         
         yield driver
         
@@ -64,42 +110,59 @@ class TestGiftCardUI:
             pytest.fail(f"Element not clickable: {by}={value}")
     
     def inject_metamask_mock(self, driver):
-        """Inject comprehensive MetaMask mock into the page"""
+        """Inject a MetaMask mock that forwards every request to the simulator"""
         print("Injecting MetaMask mock...")
         
         mock_script = f"""
         // Set contract address globally for the mock
         window.MOCK_CONTRACT_ADDRESS = '{self.CONTRACT_ADDRESS}';
         
-        // Comprehensive MetaMask mock
+        let mockRequestId = 0;
+        
+        // MetaMask mock: the wallet is the simulator's unlocked account #0, and
+        // every JSON-RPC call goes to the simulator that also serves this page.
+        // pending counts requests in flight so tests can wait for the page to go idle.
         window.ethereum = {{
             isMetaMask: true,
-            selectedAddress: '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266',
+            selectedAddress: '{self.ACCOUNT}',
+            pending: 0,
             
             request: async function(params) {{
                 console.log('MetaMask request:', params);
                 
                 switch(params.method) {{
                     case 'eth_requestAccounts':
-                        return ['0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'];
-                    
                     case 'eth_accounts':
-                        return ['0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'];
+                        return ['{self.ACCOUNT}'];
                     
-                    case 'eth_chainId':
-                        return '0x539'; // 1337 in hex
-                    
-                    case 'eth_sendTransaction':
-                        // Simulate transaction approval
-                        await new Promise(resolve => setTimeout(resolve, 1000));
-                        return '0x' + Math.random().toString(16).substr(2, 64);
-                    
-                    case 'eth_getBalance':
-                        return '0x21e19e0c9bab2400000'; // 10000 ETH in hex
-                    
-                    default:
-                        return null;
+                    case 'wallet_requestPermissions':
+                        return [{{ parentCapability: 'eth_accounts' }}];
+                }}
+                
+                window.ethereum.pending++;
+                let payload;
+                try {{
+                    const response = await fetch('/', {{
+                        method: 'POST',
+                        headers: {{ 'Content-Type': 'application/json' }},
+                        body: JSON.stringify({{
+                            jsonrpc: '2.0',
+                            id: ++mockRequestId,
+                            method: params.method,
+                            params: params.params || []
+                        }})
+                    }});
+                    payload = await response.json();
+                }} finally {{
+                    window.ethereum.pending--;
+                }}
+                if (payload.error) {{
+                    const error = new Error(payload.error.message);
+                    error.code = payload.error.code;
+                    error.data = payload.error.data;
+                    throw error;
                 }}
+                return payload.result;
             }},
             
             on: function(event, callback) {{
@@ -108,116 +171,34 @@ class TestGiftCardUI:
             }}
         }};
         
-        // Mock ethers provider integration
-        if (typeof ethers !== 'undefined') {{
-            // Store original provider
-            const originalWeb3Provider = ethers.providers.Web3Provider;
-            
-            // Mock Web3Provider
-            ethers.providers.Web3Provider = function(ethereum) {{
-                this.getNetwork = async function() {{
-                    return {{ chainId: 1337, name: 'hardhat' }};
-                }};
-                
-                this.getSigner = function() {{
-                    return {{
-                        getAddress: async function() {{
-                            return '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266';
-                        }},
-                        sendTransaction: async function(tx) {{
-                            console.log('Sending transaction:', tx);
-                            
-                            // Simulate balance changes
-                            if (tx.value) {{
-                                const currentBalance = window.mockBalance || ethers.utils.parseEther('10000');
-                                window.mockBalance = currentBalance.sub(tx.value);
-                                console.log('Balance after transaction:', ethers.utils.formatEther(window.mockBalance));
-                            }}
-                            
-                            return {{
-                                hash: '0x' + Math.random().toString(16).substr(2, 64),
-                                wait: async function() {{
-                                    await new Promise(resolve => setTimeout(resolve, 2000));
-                                    return {{
-                                        blockNumber: Math.floor(Math.random() * 1000) + 1,
-                                        status: 1,
-                                        transactionHash: this.hash
-                                    }};
-                                }}
-                            }};
-                        }}
-                    }};
-                }};
-                
-                this.getBalance = async function(address) {{
-                    return window.mockBalance || ethers.utils.parseEther('9999.5');
-                }};
-            }};
-            
-            // Mock Contract class
-            const originalContract = ethers.Contract;
-            ethers.Contract = function(address, abi, signerOrProvider) {{
-                this.address = address;
-                this.abi = abi;
-                
-                // Mock contract methods
-                this.buy = async function(codeHash, options) {{
-                    console.log('Mock buy called with:', codeHash, options);
-                    
-                    // Simulate transaction
-                    if (signerOrProvider && signerOrProvider.sendTransaction) {{
-                        return await signerOrProvider.sendTransaction({{
-                            to: address,
-                            value: options.value,
-                            data: '0x' + Math.random().toString(16).substr(2, 64)
-                        }});
-                    }}
-                    
-                    return {{
-                        hash: '0x' + Math.random().toString(16).substr(2, 64),
-                        wait: async function() {{
-                            return {{ blockNumber: 1, status: 1 }};
-                        }}
-                    }};
-                }};
-                
-                this.redeem = async function(code) {{
-                    console.log('Mock redeem called with:', code);
-                    
-                    // Simulate balance increase for redemption
-                    const currentBalance = window.mockBalance || ethers.utils.parseEther('9999.5');
-                    window.mockBalance = currentBalance.add(ethers.utils.parseEther('0.001'));
-                    
-                    return {{
-                        hash: '0x' + Math.random().toString(16).substr(2, 64),
-                        wait: async function() {{
-                            return {{ blockNumber: 1, status: 1 }};
-                        }}
-                    }};
-                }};
-                
-                this.getGiftCardValue = async function(codeHash) {{
-                    // Mock: return 0 for non-existent cards, value for existing ones
-                    return ethers.BigNumber.from('0');
-                }};
-                
-                this.isRedeemed = async function(codeHash) {{
-                    // Mock: return false for testing
-                    return false;
-                }};
-            }};
-        }}
-        
-        // Initialize mock balance
-        if (typeof ethers !== 'undefined') {{
-            window.mockBalance = ethers.utils.parseEther('10000');
-        }}
-        
         console.log('Complete MetaMask mock injected');
         """
         
         driver.execute_script(mock_script)
-        time.sleep(2)  # Allow mock to initialize
+    
+    def click_and_settle(self, driver, element_id):
+        """Click a button and wait for the success or error status it ends with
+        
+        Returns the status as {"message": ..., "type": ...}, once the wallet
+        mock also has no requests in flight.
+        """
+        driver.execute_script("window.settledStatus = window.giftCardUI.nextSettledStatus();")
+        self.wait_for_clickable(driver, By.ID, element_id).click()
+        return driver.execute_async_script("""
+            const done = arguments[arguments.length - 1];
+            window.settledStatus.then(status => {
+                const idle = () => !window.ethereum || window.ethereum.pending === 0 ? done(status) : setTimeout(idle, 10);
+                idle();
+            });
+        """)
+    
+    def connect_wallet(self, driver):
+        """Load the page with the wallet mock and connect it"""
+        driver.get(self.WEB_APP_URL)
+        self.inject_metamask_mock(driver)
+        status = self.click_and_settle(driver, "connect-wallet")
+        assert status["type"] == "success", status["message"]
+        return status
     
     def test_page_loads_correctly(self, driver):
         """Test 1: Verify the web application loads correctly"""
@@ -251,55 +232,38 @@ class TestGiftCardUI:
         self.inject_metamask_mock(driver)
         
         # Find and click connect wallet button
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        initial_text = connect_button.text
+        initial_text = self.wait_for_clickable(driver, By.ID, "connect-wallet").text
         print(f"Initial button text: {initial_text}")
         
-        connect_button.click()
-        
-        # Wait for connection to complete
-        time.sleep(3)
-        
-        # Verify connection success
-        try:
-            # Check if button text changed
-            WebDriverWait(driver, 10).until(
-                lambda d: "Connected" in d.find_element(By.ID, "connect-wallet").text
-            )
-            
-            # Check if account info is displayed
-            account_info = self.wait_for_element(driver, By.ID, "account-info")
-            assert "hidden" not in account_info.get_attribute("class")
-            
-            # Verify account address is displayed
-            account_address = self.wait_for_element(driver, By.ID, "account-address")
-            assert len(account_address.text) > 0
-            
-            print("✅ MetaMask connection simulation successful")
-            
-        except TimeoutException:
+        status = self.click_and_settle(driver, "connect-wallet")
+        if status["type"] != "success":
             # Take screenshot for debugging
             driver.save_screenshot("connection_failure.png")
-            pytest.fail("MetaMask connection simulation failed")
+            pytest.fail(f"MetaMask connection simulation failed: {status['message']}")
+        
+        # Check if button text changed
+        assert "Connected" in driver.find_element(By.ID, "connect-wallet").text
+        
+        # Check if account info is displayed
+        account_info = self.wait_for_element(driver, By.ID, "account-info")
+        assert "hidden" not in account_info.get_attribute("class")
+        
+        # Verify account address is displayed
+        account_address = self.wait_for_element(driver, By.ID, "account-address")
+        assert len(account_address.text) > 0
+        
+        print("✅ MetaMask connection simulation successful")
 
     def test_buy_gift_card_ui(self, driver):
         """Test 3: Test buying gift card through UI"""
         print("Testing gift card purchase through UI...")
         
-        driver.get(self.WEB_APP_URL)
-        
-        # Set up mocks
-        self.inject_metamask_mock(driver)
-        
-        # Connect wallet first
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        connect_button.click()
-        time.sleep(3)
+        # Set up mocks and connect wallet first
+        self.connect_wallet(driver)
         
         # Fill in buy form
         code_input = self.wait_for_element(driver, By.ID, "buy-code")
         amount_input = self.wait_for_element(driver, By.ID, "buy-amount")
-        buy_button = self.wait_for_element(driver, By.ID, "buy-btn")
         
         # Enter test data
         test_code = "SELENIUM_BUY_TEST"
@@ -312,129 +276,69 @@ class TestGiftCardUI:
         amount_input.send_keys(test_amount)
         
         # Record initial balance
-        initial_balance = driver.execute_script("return window.mockBalance ? ethers.utils.formatEther(window.mockBalance) : '10000';")
+        initial_balance = self.get_balance()
         print(f"Initial balance: {initial_balance} ETH")
         
-        # Click buy button
-        buy_button.click()
-        
-        # Wait for transaction processing
-        time.sleep(4)
+        # Click buy button and wait for the transaction to settle
+        status = self.click_and_settle(driver, "buy-btn")
+        print(f"Status message: {status['message']}")
         
-        # Check for success message or any status message
-        try:
-            status_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status"))
-            )
-            
-            status_text = status_element.text.lower()
-            status_class = status_element.get_attribute("class")
-            
-            print(f"Status message: {status_element.text}")
-            print(f"Status class: {status_class}")
-            
-            # Accept success or reasonable error messages
-            if "success" in status_class or "successfully" in status_text:
-                print("✅ Gift card purchase successful")
-            elif "processing" in status_text:
-                print("✅ Transaction processing detected")
-            else:
-                print(f"✅ Status message displayed: {status_element.text}")
-                
-        except TimeoutException:
-            pytest.fail("No status message found after purchase attempt")
+        assert status["type"] == "success", status["message"]
+        assert "purchased successfully" in status["message"]
+        assert initial_balance - self.get_balance() >= float(test_amount)
+        print("✅ Gift card purchase successful")
         
-        # Verify form was cleared (if successful)
-        if code_input.get_attribute("value") == "":
-            print("✅ Form cleared after transaction")
+        # Verify form was cleared
+        assert code_input.get_attribute("value") == ""
+        print("✅ Form cleared after transaction")
 
     def test_redeem_gift_card_ui(self, driver):
         """Test 4: Test redeeming gift card through UI"""
         print("Testing gift card redemption through UI...")
         
-        driver.get(self.WEB_APP_URL)
-        
-        # Set up mocks
-        self.inject_metamask_mock(driver)
-        
-        # Connect wallet
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        connect_button.click()
-        time.sleep(3)
+        # Set up mocks and connect wallet
+        self.connect_wallet(driver)
         
         # Fill in redeem form
         redeem_code_input = self.wait_for_element(driver, By.ID, "redeem-code")
-        redeem_button = self.wait_for_element(driver, By.ID, "redeem-btn")
         
-        # Use a test code
+        # Use the code bought by the previous test
         test_code = "SELENIUM_BUY_TEST"
         
         redeem_code_input.clear()
         redeem_code_input.send_keys(test_code)
         
         # Record initial balance
-        initial_balance = driver.execute_script("return window.mockBalance ? ethers.utils.formatEther(window.mockBalance) : '10000';")
+        initial_balance = self.get_balance()
         print(f"Initial balance: {initial_balance} ETH")
         
-        # Click redeem button
-        redeem_button.click()
-        
-        # Wait for transaction processing
-        time.sleep(4)
-        
-        # Check for status message
-        try:
-            status_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status"))
-            )
-            
-            status_text = status_element.text.lower()
-            status_class = status_element.get_attribute("class")
-            
-            print(f"Status message: {status_element.text}")
-            
-            # Accept various outcomes
-            if "success" in status_class or "redeemed" in status_text:
-                print("✅ Gift card redemption successful")
-            elif "does not exist" in status_text or "not exist" in status_text:
-                print("✅ Gift card redemption properly rejected (code doesn't exist)")
-            elif "already been redeemed" in status_text:
-                print("✅ Gift card redemption properly rejected (already redeemed)")
-            else:
-                print(f"✅ Status message displayed: {status_element.text}")
-                
-        except TimeoutException:
-            pytest.fail("No status message found after redemption attempt")
+        # Click redeem button and wait for the transaction to settle
+        status = self.click_and_settle(driver, "redeem-btn")
+        print(f"Status message: {status['message']}")
+        
+        # Accept various outcomes
+        if status["type"] == "success":
+            assert self.get_balance() > initial_balance
+            print("✅ Gift card redemption successful")
+        elif "does not exist" in status["message"]:
+            print("✅ Gift card redemption properly rejected (code doesn't exist)")
+        elif "already been redeemed" in status["message"]:
+            print("✅ Gift card redemption properly rejected (already redeemed)")
+        else:
+            pytest.fail(f"Unexpected redemption status: {status['message']}")
 
     def test_form_validation(self, driver):
         """Test 5: Test form validation and error handling"""
         print("Testing form validation...")
         
-        driver.get(self.WEB_APP_URL)
-        
-        # Set up mocks
-        self.inject_metamask_mock(driver)
-        
-        # Connect wallet
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        connect_button.click()
-        time.sleep(3)
+        # Set up mocks and connect wallet
+        self.connect_wallet(driver)
         
         # Test 1: Empty code validation
-        buy_button = self.wait_for_element(driver, By.ID, "buy-btn")
-        buy_button.click()
-        
-        time.sleep(2)
-        
-        # Check for error message
-        try:
-            error_message = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status.error"))
-            )
-            assert "code" in error_message.text.lower()
-            print("✅ Empty code validation working")
-        except TimeoutException:
-            print("⚠️ Empty code validation not triggered")
+        status = self.click_and_settle(driver, "buy-btn")
+        assert status["type"] == "error"
+        assert "code" in status["message"].lower()
+        print("✅ Empty code validation working")
         
         # Test 2: Invalid amount validation
         code_input = self.wait_for_element(driver, By.ID, "buy-code")
@@ -445,44 +349,28 @@ class TestGiftCardUI:
         amount_input.clear()
         amount_input.send_keys("0.0001")  # Below minimum
         
-        buy_button.click()
-        time.sleep(2)
-        
         # Check for minimum amount error
-        try:
-            error_message = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status.error"))
-            )
-            assert "0.001" in error_message.text
-            print("✅ Minimum amount validation working")
-        except TimeoutException:
-            print("⚠️ Minimum amount validation not triggered")
+        status = self.click_and_settle(driver, "buy-btn")
+        assert status["type"] == "error"
+        assert "0.001" in status["message"]
+        print("✅ Minimum amount validation working")
         
         print("✅ Form validation tests completed")
 
     def test_balance_changes_simulation(self, driver):
-        """Test 6: Simulate and verify ETH balance changes"""
+        """Test 6: Verify ETH balance changes on the simulated chain"""
         print("Testing balance change simulation...")
         
-        driver.get(self.WEB_APP_URL)
-        
-        # Inject enhanced mock with balance tracking
-        self.inject_metamask_mock(driver)
-        
         # Connect wallet
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        connect_button.click()
-        time.sleep(3)
+        self.connect_wallet(driver)
         
         # Record initial balance
-        initial_balance_str = driver.execute_script("return window.mockBalance ? ethers.utils.formatEther(window.mockBalance) : '10000';")
-        initial_balance = float(initial_balance_str)
+        initial_balance = self.get_balance()
         print(f"Initial balance: {initial_balance} ETH")
         
         # Perform purchase transaction
         code_input = self.wait_for_element(driver, By.ID, "buy-code")
         amount_input = self.wait_for_element(driver, By.ID, "buy-amount")
-        buy_button = self.wait_for_element(driver, By.ID, "buy-btn")
         
         purchase_amount = "0.001"
         code_input.clear()
@@ -490,41 +378,33 @@ class TestGiftCardUI:
         amount_input.clear()
         amount_input.send_keys(purchase_amount)
         
-        buy_button.click()
-        time.sleep(4)
+        status = self.click_and_settle(driver, "buy-btn")
+        assert status["type"] == "success", status["message"]
         
         # Check balance after purchase
-        final_balance_str = driver.execute_script("return window.mockBalance ? ethers.utils.formatEther(window.mockBalance) : '10000';")
-        final_balance = float(final_balance_str)
+        final_balance = self.get_balance()
         print(f"Balance after purchase: {final_balance} ETH")
         
-        # Verify balance decreased (allowing for gas fees simulation)
+        # Verify balance decreased by the purchase plus gas
         expected_decrease = float(purchase_amount)
         actual_decrease = initial_balance - final_balance
-        
-        if actual_decrease >= expected_decrease * 0.9:  # Allow 10% tolerance for gas simulation
-            print(f"✅ Balance decreased by {actual_decrease} ETH (expected ~{expected_decrease} ETH)")
-        else:
-            print(f"⚠️ Balance change: {actual_decrease} ETH (expected ~{expected_decrease} ETH)")
+        assert actual_decrease >= expected_decrease
+        print(f"✅ Balance decreased by {actual_decrease} ETH (expected ~{expected_decrease} ETH)")
         
         # Test redemption balance increase
         redeem_input = self.wait_for_element(driver, By.ID, "redeem-code")
-        redeem_button = self.wait_for_element(driver, By.ID, "redeem-btn")
         
         pre_redeem_balance = final_balance
         redeem_input.clear()
         redeem_input.send_keys("BALANCE_TEST")
-        redeem_button.click()
-        time.sleep(4)
+        status = self.click_and_settle(driver, "redeem-btn")
+        assert status["type"] == "success", status["message"]
         
-        post_redeem_balance_str = driver.execute_script("return window.mockBalance ? ethers.utils.formatEther(window.mockBalance) : '10000';")
-        post_redeem_balance = float(post_redeem_balance_str)
+        post_redeem_balance = self.get_balance()
         print(f"Balance after redemption: {post_redeem_balance} ETH")
         
-        if post_redeem_balance > pre_redeem_balance:
-            print("✅ Balance increased after redemption")
-        else:
-            print("⚠️ Balance did not increase after redemption (may be expected if code doesn't exist)")
+        assert post_redeem_balance > pre_redeem_balance
+        print("✅ Balance increased after redemption")
         
         print("✅ Balance change simulation completed")
 
@@ -569,50 +449,33 @@ class TestGiftCardUI:
         """Test 8: Complete end-to-end user flow"""
         print("Testing complete user flow...")
         
-        driver.get(self.WEB_APP_URL)
-        
         # Step 1: Setup and connect
-        self.inject_metamask_mock(driver)
-        connect_button = self.wait_for_clickable(driver, By.ID, "connect-wallet")
-        connect_button.click()
-        time.sleep(3)
+        self.connect_wallet(driver)
         
         # Step 2: Buy a gift card
         code_input = self.wait_for_element(driver, By.ID, "buy-code")
         amount_input = self.wait_for_element(driver, By.ID, "buy-amount")
-        buy_button = self.wait_for_element(driver, By.ID, "buy-btn")
         
-        unique_code = f"FLOW_TEST_{int(time.time())}"
+        unique_code = f"FLOW_TEST_{time.time_ns()}"
         code_input.send_keys(unique_code)
         amount_input.send_keys("0.002")
-        buy_button.click()
-        time.sleep(4)
         
         # Verify purchase status
-        try:
-            purchase_status = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status"))
-            )
-            print(f"Purchase status: {purchase_status.text}")
-        except TimeoutException:
-            print("⚠️ No purchase status message")
+        purchase_status = self.click_and_settle(driver, "buy-btn")
+        print(f"Purchase status: {purchase_status['message']}")
+        assert purchase_status["type"] == "success"
         
-        # Step 3: Attempt to redeem the same gift card
+        # Step 3: Redeem the same gift card
         redeem_input = self.wait_for_element(driver, By.ID, "redeem-code")
-        redeem_button = self.wait_for_element(driver, By.ID, "redeem-btn")
-        
         redeem_input.clear()
         redeem_input.send_keys(unique_code)
-        redeem_button.click()
-        time.sleep(4)
         
         # Verify redemption status
-        try:
-            redeem_status = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".status"))
-            )
-            print(f"Redemption status: {redeem_status.text}")
-        except TimeoutException:
-            print("⚠️ No redemption status message")
+        redeem_status = self.click_and_settle(driver, "redeem-btn")
+        print(f"Redemption status: {redeem_status['message']}")
+        assert redeem_status["type"] == "success"
         
-        print("✅ Complete user flow test finished")
\ No newline at end of file
+        # Step 4: A second redemption is rejected
+        redeem_input.send_keys(unique_code)
+        redeem_status = self.click_and_settle(driver, "redeem-btn")
+        assert "already been redeemed" in redeem_status["message"]
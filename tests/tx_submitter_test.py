@@ -0,0 +1,164 @@
+import pytest
+import rlp
+import requests
+from eth_account import Account
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import EthereumTesterProvider, Web3
+
+from tx_submitter import NonceManager, PipelinedSubmitter
+
+
+def nonce_of(raw):
+    """Nonce of a signed legacy transaction"""
+    return int.from_bytes(rlp.decode(raw)[0], "big")
+
+
+class PoolProvider(EthereumTesterProvider):
+    """eth-tester behind a minimal transaction pool
+
+    eth-tester mines every transaction on arrival and rejects nonce gaps, so
+    sends are queued per sender and passed on in nonce order, like a node's
+    pool. hooks[nonce] replaces the next send of that nonce, to drop it or
+    to fail before or after it reaches the pool.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queued = {}  # (sender, nonce) -> raw transaction
+        self.hooks = {}
+
+    def make_request(self, method, params):
+        if method != "eth_sendRawTransaction":
+            return super().make_request(method, params)
+        raw = HexBytes(params[0])
+        hook = self.hooks.pop(nonce_of(raw), None)
+        if hook:
+            hook(raw)
+        else:
+            self.send(raw)
+        return {"jsonrpc": "2.0", "id": 0, "result": "0x" + keccak(raw).hex()}
+
+    def send(self, raw):
+        sender = Account.recover_transaction(raw)
+        self.queued[(sender, nonce_of(raw))] = raw
+        nonce = self.ethereum_tester.get_nonce(sender)
+        while (sender, nonce) in self.queued:
+            super().make_request("eth_sendRawTransaction", ["0x" + self.queued.pop((sender, nonce)).hex()])
+            nonce += 1
+
+
+@pytest.fixture
+def chain():
+    provider = PoolProvider()
+    w3 = Web3(provider)
+    account = Account.create()
+    tx_hash = w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": w3.to_wei(1, "ether")})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3, provider, account
+
+
+def transfer(w3):
+    return {"to": w3.eth.accounts[1], "value": 1, "gas": 21_000}
+
+
+def test_nonce_manager_allocates_and_releases(chain):
+    """Test nonces are consecutive, a released top nonce is reused and a released gap is handed out first"""
+    w3, _, account = chain
+    nonces = NonceManager(w3)
+
+    assert [nonces.allocate(account.address) for _ in range(3)] == [0, 1, 2]
+    nonces.release(account.address, 2)
+    assert nonces.allocate(account.address) == 2
+    nonces.release(account.address, 0)
+    assert nonces.take_released(account.address) == [0]
+    nonces.release(account.address, 0)
+    assert [nonces.allocate(account.address) for _ in range(2)] == [0, 3]
+
+    nonces.resync(account.address)
+    assert nonces.allocate(account.address) == w3.eth.get_transaction_count(account.address, "pending")
+
+
+def test_submitter_pipelines_and_reports_each_transaction(chain):
+    """Test every submitted transaction is signed, reported and resolved with its receipt"""
+    w3, _, account = chain
+    signed, done = [], []
+    submitter = PipelinedSubmitter(w3, max_in_flight=2, on_signed=signed.append, on_done=done.append)
+
+    results = [submitter.submit(account, transfer(w3), tag=i) for i in range(5)]
+    submitter.wait_all(timeout=10)
+    assert [p.nonce for p in results] == [0, 1, 2, 3, 4]
+    assert all(p.ok for p in results)
+    assert [p.tag for p in signed] == [0, 1, 2, 3, 4]
+    assert sorted(p.tag for p in done) == [0, 1, 2, 3, 4]
+
+
+def test_submitter_rebroadcasts_dropped_transaction(chain):
+    """Test a transaction the node acknowledged but dropped is broadcast again and confirmed"""
+    w3, provider, account = chain
+    provider.hooks[0] = lambda raw: None
+    submitter = PipelinedSubmitter(w3, resubmit_after=0)
+
+    pending = submitter.submit(account, transfer(w3))
+    assert w3.eth.get_transaction_count(account.address) == 0
+    submitter.wait_all(timeout=10)
+    assert pending.ok
+    assert w3.eth.get_transaction_count(account.address) == 1
+
+
+def test_submitter_reports_replaced_transaction(chain):
+    """Test a transaction whose nonce was mined with another transaction is reported as replaced"""
+    w3, provider, account = chain
+    provider.hooks[0] = lambda raw: None
+    submitter = PipelinedSubmitter(w3, resubmit_after=0)
+
+    pending = submitter.submit(account, transfer(w3))
+    replacement = account.sign_transaction({
+        **transfer(w3), "value": 2, "nonce": 0, "gasPrice": w3.eth.gas_price, "chainId": w3.eth.chain_id,
+    })
+    w3.eth.send_raw_transaction(replacement.raw_transaction)
+    submitter.wait_all(timeout=10)
+    assert pending.receipt is None
+    assert "replacement" in str(pending.error)
+
+
+def test_submitter_fills_nonce_gap_after_send_error(chain):
+    """Test a failed send's nonce is filled so a later transaction from the same sender confirms"""
+    w3, provider, account = chain
+    done = []
+    submitter = PipelinedSubmitter(w3, on_done=done.append)
+    later = []
+
+    def reject(raw):
+        # Another caller takes the next nonce while this send is failing
+        later.append(submitter.submit(account, transfer(w3), tag="later"))
+        raise ValueError("rejected")
+
+    provider.hooks[1] = reject
+    first = submitter.submit(account, transfer(w3), tag="first")
+    failed = submitter.submit(account, transfer(w3), tag="failed")
+    assert isinstance(failed.error, ValueError)
+    assert later[0].nonce == 2
+    assert w3.eth.get_transaction_count(account.address) == 1
+
+    submitter.wait_all(timeout=10)
+    assert first.ok and later[0].ok
+    assert w3.eth.get_transaction_count(account.address) == 3
+    assert sorted(p.tag for p in done) == ["failed", "first", "later"]
+
+
+def test_submitter_tracks_transaction_sent_before_timeout(chain):
+    """Test a send that times out after reaching the node is still resolved from its receipt"""
+    w3, provider, account = chain
+
+    def timeout(raw):
+        provider.send(raw)
+        raise requests.exceptions.ReadTimeout("read timed out")
+
+    provider.hooks[0] = timeout
+    submitter = PipelinedSubmitter(w3)
+    pending = submitter.submit(account, transfer(w3))
+    assert pending.error is None
+    submitter.wait_all(timeout=10)
+    assert pending.ok
+    assert submitter.submit(account, transfer(w3)).nonce == 1
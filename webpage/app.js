@@ -1,17 +1,17 @@
 // Contract configuration
 const CONTRACT_ADDRESS = '0x5FbDB2315678afecb367f032d93F642f64180aa3'; // Replace with the deployed contract address
+// Only what the page calls; ethers needs the events to decode receipt logs
 const CONTRACT_ABI = [
     "function buy(bytes32 codeHash) public payable",
     "function redeem(string memory code) public",
-    "function getGiftCardValue(bytes32 codeHash) public view returns (uint256)",
-    "function isRedeemed(bytes32 codeHash) public view returns (bool)",
-    "function isExpired(bytes32 codeHash) public view returns (bool)", // Bonus: Gift card expiration
-    "function getPurchaseTime(bytes32 codeHash) public view returns (uint256)", // Bonus: Gift card expiration
-    "function getExpirationTime(bytes32 codeHash) public view returns (uint256)", // Bonus: Gift card expiration
-    "event GiftCardPurchased(bytes32 indexed codeHash, uint256 value, address buyer)",
-    "event GiftCardRedeemed(bytes32 indexed codeHash, uint256 value, address redeemer)"
+    "function getGiftCardStatus(bytes32 codeHash) public view returns (tuple(uint256 value, bool redeemed, bool expired, uint256 purchaseTime, uint256 expirationTime))", // Bonus: Gift card expiration
+    "event GiftCardPurchased(bytes32 indexed codeHash, uint256 value, address buyer, uint256 purchaseTime, uint256 expirationTime)",
+    "event GiftCardRedeemed(bytes32 indexed codeHash, uint256 value, address redeemer, uint256 purchaseTime, uint256 expirationTime)"
 ];
 
+// Error(string) selector, the prefix of revert data from a require message
+const ERROR_STRING_SELECTOR = '0x08c379a0';
+
 // Global variables
 let provider;
 let signer;
@@ -107,7 +107,25 @@ function getTimeUntilExpiration(expirationTimestamp) {
 }
 
 // Existing utility functions
+// Completion signals for automated tests: every status shown so far, and
+// promises for the next final (success or error) status
+const statusHistory = [];
+let settledWaiters = [];
+
+function nextSettledStatus() {
+    return new Promise(resolve => settledWaiters.push(resolve));
+}
+
+window.giftCardUI = { statusHistory, nextSettledStatus };
+
 function showStatus(message, type = 'info') {
+    const status = { message, type };
+    statusHistory.push(status);
+    if (type !== 'info') {
+        settledWaiters.forEach(resolve => resolve(status));
+        settledWaiters = [];
+    }
+    
     const statusDiv = document.createElement('div');
     statusDiv.className = `status ${type}`;
     statusDiv.textContent = message;
@@ -235,6 +253,23 @@ function resetWalletConnection() {
     showStatus('Wallet disconnected', 'info');
 }
 
+// The contract's require message from a failed call or gas estimate, or null.
+// ethers sets error.reason for JSON-RPC nodes; through MetaMask the revert data
+// is nested in error.error.data (or error.data), either as a message or ABI-encoded.
+function revertReason(error) {
+    if (error.reason) {
+        return error.reason.replace(/^execution reverted: /, '');
+    }
+    const nested = error.error || error;
+    const data = nested.data && nested.data.data !== undefined ? nested.data.data : nested.data;
+    if (typeof data === 'string' && data.startsWith(ERROR_STRING_SELECTOR)) {
+        return ethers.utils.defaultAbiCoder.decode(['string'], '0x' + data.slice(10))[0];
+    }
+    const message = (nested.data && nested.data.message) || nested.message;
+    const match = message && message.match(/reverted with reason string '(.*)'|execution reverted: (.*)/);
+    return match ? (match[1] || match[2]) : null;
+}
+
 // Gift card functions
 async function buyGiftCard() {
     try {
@@ -258,25 +293,16 @@ async function buyGiftCard() {
         const codeHash = hashCode(code);
         const value = ethers.utils.parseEther(amount);
 
-        // Check if gift card already exists
-        const existingValue = await contract.getGiftCardValue(codeHash);
-        if (existingValue.gt(0)) {
-            showStatus('A gift card with this code already exists', 'error');
-            buyBtn.disabled = false;
-            buyBtn.textContent = 'Buy Gift Card';
-            return;
-        }
-
-        // Send transaction
+        // Send transaction (a duplicate code already fails its gas estimate)
         const tx = await contract.buy(codeHash, { value: value });
         showStatus(`Transaction sent! Hash: ${tx.hash}`, 'info');
 
         // Wait for confirmation
         const receipt = await tx.wait();
         
-        // Bonus: Show expiration information in success message
-        const expirationTime = await contract.getExpirationTime(codeHash);
-        const expirationDate = formatExpirationDate(expirationTime);
+        // Bonus: Show expiration information in success message, straight from the purchase event
+        const purchased = receipt.events.find(event => event.event === 'GiftCardPurchased');
+        const expirationDate = formatExpirationDate(purchased.args.expirationTime);
         
         showStatus(`Gift card purchased successfully! Transaction confirmed in block ${receipt.blockNumber}. Expires on: ${expirationDate}`, 'success');
 
@@ -291,6 +317,8 @@ async function buyGiftCard() {
         console.error('Error buying gift card:', error);
         if (error.code === 4001) {
             showStatus('Transaction cancelled by user', 'error');
+        } else if (revertReason(error) === 'Gift card with this code already exists') {
+            showStatus('A gift card with this code already exists', 'error');
         } else if (error.message.includes('insufficient funds')) {
             showStatus('Insufficient funds for this transaction', 'error');
         } else {
@@ -321,31 +349,28 @@ async function redeemGiftCard() {
         
         const codeHash = hashCode(code);
 
-        // Check if gift card exists
-        const giftCardValue = await contract.getGiftCardValue(codeHash);
-        if (giftCardValue.eq(0)) {
+        // One read covers existence, redemption, expiry and the expiration time
+        const status = await contract.getGiftCardStatus(codeHash);
+        if (status.value.eq(0)) {
             showStatus('Gift card does not exist', 'error');
             return;
         }
 
         // Check if already redeemed
-        const isRedeemed = await contract.isRedeemed(codeHash);
-        if (isRedeemed) {
+        if (status.redeemed) {
             showStatus('This gift card has already been redeemed', 'error');
             return;
         }
 
         // Bonus: Check if expired
-        const isExpired = await contract.isExpired(codeHash);
-        if (isExpired) {
-            const expirationTime = await contract.getExpirationTime(codeHash);
+        const expirationTime = status.expirationTime;
+        if (status.expired) {
             const expirationDate = formatExpirationDate(expirationTime);
             showStatus(`This gift card expired on ${expirationDate}`, 'error');
             return;
         }
 
         // Bonus: Show expiration warning if close to expiring
-        const expirationTime = await contract.getExpirationTime(codeHash);
         const daysUntilExpiration = getDaysUntilExpiration(expirationTime);
         
         if (daysUntilExpiration <= 3 && daysUntilExpiration > 0) {
@@ -363,7 +388,8 @@ async function redeemGiftCard() {
 
         // Wait for confirmation
         const receipt = await tx.wait();
-        const valueInEth = ethers.utils.formatEther(giftCardValue);
+        const redeemed = receipt.events.find(event => event.event === 'GiftCardRedeemed');
+        const valueInEth = ethers.utils.formatEther(redeemed.args.value);
         showStatus(`Gift card redeemed successfully! You received ${valueInEth} ETH. Transaction confirmed in block ${receipt.blockNumber}`, 'success');
 
         // Clear form
@@ -404,12 +430,13 @@ async function checkGiftCardStatus() {
 
         const codeHash = hashCode(code);
 
-        // Get gift card info
-        const giftCardValue = await contract.getGiftCardValue(codeHash);
-        const isRedeemed = await contract.isRedeemed(codeHash);
-        const isExpired = await contract.isExpired(codeHash);
-        const purchaseTime = await contract.getPurchaseTime(codeHash);
-        const expirationTime = await contract.getExpirationTime(codeHash);
+        // Get gift card info in a single call
+        const status = await contract.getGiftCardStatus(codeHash);
+        const giftCardValue = status.value;
+        const isRedeemed = status.redeemed;
+        const isExpired = status.expired;
+        const purchaseTime = status.purchaseTime;
+        const expirationTime = status.expirationTime;
 
         // Display status
         if (cardStatus) {